@@ -11,12 +11,16 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import datetime
 import hashlib
 
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_serialization import jsonutils as json
+from oslo_utils import encodeutils
 from oslo_utils import importutils
+from oslo_utils import timeutils
 import requests
 import webob
 
@@ -39,17 +43,76 @@ opts = [
                 default=[],
                 help=_('Allowed keystone endpoints for auth_uri when '
                        'multi_cloud is enabled. At least one endpoint needs '
-                       'to be specified.'))
+                       'to be specified.')),
+    cfg.IntOpt('cache_ttl',
+               default=60,
+               help=_('Number of seconds for which the result of validating '
+                      'a request signature with keystone is reused for '
+                      'identical signed requests, such as repeated calls to '
+                      'a pre-signed URL. A revoked credential may still be '
+                      'accepted for this long. Set to 0 to disable.')),
+    cfg.IntOpt('cache_size',
+               default=1000,
+               help=_('Maximum number of validated request signatures to '
+                      'cache.'))
 ]
 cfg.CONF.register_opts(opts, group='ec2authtoken')
 
 
+class SignatureCache(object):
+    """
+    A size-bounded cache of recent successful signature validations.
+
+    Entries are keyed on a hash of everything that was signed, so a cached
+    result is only ever reused for a request carrying exactly the same
+    signature over exactly the same material; any other request is still
+    validated by keystone.
+    """
+
+    def __init__(self, ttl, size):
+        self.ttl = ttl
+        self.size = size
+        self._entries = collections.OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+
+        expires, value = entry
+        if timeutils.utcnow() >= expires:
+            return None
+
+        # Keep the most recently used entries at the end
+        self._entries[key] = entry
+        return value
+
+    def put(self, key, value, token_expires=None):
+        expires = timeutils.utcnow() + datetime.timedelta(seconds=self.ttl)
+        if token_expires is not None:
+            expires = min(expires, token_expires)
+
+        self._entries.pop(key, None)
+        self._entries[key] = (expires, value)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+
 class EC2Token(wsgi.Middleware):
     """Authenticate an EC2 request with keystone and convert to token."""
 
     def __init__(self, app, conf):
         self.conf = conf
         self.application = app
+        # Reuse connections to keystone between requests
+        self._session = requests.Session()
+
+        ttl = int(self._conf_get('cache_ttl'))
+        if ttl > 0:
+            self._cache = SignatureCache(ttl,
+                                         int(self._conf_get('cache_size')))
+        else:
+            self._cache = None
 
     def _conf_get(self, name):
         # try config from paste-deploy first
@@ -180,12 +243,45 @@ class EC2Token(wsgi.Middleware):
                                     'body_hash': body_hash
                                     }}
         creds_json = json.dumps(creds)
+        keystone_ec2_uri = self._conf_get_keystone_ec2_uri(auth_uri)
+
+        cache_key = None
+        token_info = None
+        if self._cache is not None:
+            cache_key = hashlib.sha256(encodeutils.safe_encode(
+                keystone_ec2_uri + creds_json)).hexdigest()
+            token_info = self._cache.get(cache_key)
+
+        if token_info is None:
+            token_info, token_expires = self._validate(keystone_ec2_uri,
+                                                       creds_json)
+            if cache_key is not None:
+                self._cache.put(cache_key, token_info, token_expires)
+        else:
+            LOG.info(_LI("AWS authentication successful (cached)."))
+
+        # Authenticated!
+        ec2_creds = {'ec2Credentials': {'access': access,
+                                        'signature': signature}}
+        req.headers['X-Auth-EC2-Creds'] = json.dumps(ec2_creds)
+        req.headers['X-Auth-Token'] = token_info['id']
+        req.headers['X-Tenant-Name'] = token_info['tenant']
+        req.headers['X-Tenant-Id'] = token_info['tenant_id']
+        req.headers['X-Auth-URL'] = auth_uri
+        req.headers['X-Roles'] = ','.join(token_info['roles'])
+
+        return self.application
+
+    def _validate(self, keystone_ec2_uri, creds_json):
+        '''
+        Validate the signed request with keystone, and return the token
+        details along with the expiry time of the token, if known.
+        '''
         headers = {'Content-Type': 'application/json'}
 
-        keystone_ec2_uri = self._conf_get_keystone_ec2_uri(auth_uri)
         LOG.info(_LI('Authenticating with %s'), keystone_ec2_uri)
-        response = requests.post(keystone_ec2_uri, data=creds_json,
-                                 headers=headers)
+        response = self._session.post(keystone_ec2_uri, data=creds_json,
+                                      headers=headers)
         result = response.json()
         try:
             token_id = result['access']['token']['id']
@@ -208,20 +304,22 @@ class EC2Token(wsgi.Middleware):
             else:
                 raise exception.HeatAccessDeniedError()
 
-        # Authenticated!
-        ec2_creds = {'ec2Credentials': {'access': access,
-                                        'signature': signature}}
-        req.headers['X-Auth-EC2-Creds'] = json.dumps(ec2_creds)
-        req.headers['X-Auth-Token'] = token_id
-        req.headers['X-Tenant-Name'] = tenant
-        req.headers['X-Tenant-Id'] = tenant_id
-        req.headers['X-Auth-URL'] = auth_uri
-
         metadata = result['access'].get('metadata', {})
-        roles = metadata.get('roles', [])
-        req.headers['X-Roles'] = ','.join(roles)
+        token_info = {'id': token_id,
+                      'tenant': tenant,
+                      'tenant_id': tenant_id,
+                      'roles': metadata.get('roles', [])}
+
+        token_expires = None
+        expires = result['access']['token'].get('expires')
+        if expires:
+            try:
+                token_expires = timeutils.normalize_time(
+                    timeutils.parse_isotime(expires))
+            except ValueError:
+                pass
 
-        return self.application
+        return token_info, token_expires
 
 
 def EC2Token_filter_factory(global_conf, **local_conf):
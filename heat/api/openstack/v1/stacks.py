@@ -15,6 +15,7 @@
 Stack endpoint for Heat v1 ReST API.
 """
 
+from oslo_config import cfg
 from oslo_log import log as logging
 import six
 from six.moves.urllib import parse
@@ -511,6 +512,25 @@ class StackSerializer(serializers.JSONResponseSerializer):
         response.body = self.to_json(result)
         return response
 
+    def _cacheable(self, response, result):
+        # Resource types only change when the engines are reconfigured, so
+        # let clients keep them and revalidate with the ETag.
+        self.default(response, result)
+        response.cache_control = 'private, max-age=%d' % (
+            cfg.CONF.heat_api.resource_type_cache_max_age)
+        response.md5_etag()
+        response.conditional_response = True
+        return response
+
+    def list_resource_types(self, response, result):
+        return self._cacheable(response, result)
+
+    def resource_schema(self, response, result):
+        return self._cacheable(response, result)
+
+    def generate_template(self, response, result):
+        return self._cacheable(response, result)
+
 
 def create_resource(options):
     """
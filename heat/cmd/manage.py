@@ -83,7 +83,8 @@ def purge_deleted():
     """
     Remove database records that have been previously soft deleted
     """
-    utils.purge_deleted(CONF.command.age, CONF.command.granularity)
+    utils.purge_deleted(CONF.command.age, CONF.command.granularity,
+                        CONF.command.batch_size, CONF.command.throttle)
 
 
 def add_command_parsers(subparsers):
@@ -103,6 +104,13 @@ def add_command_parsers(subparsers):
         '-g', '--granularity', default='days',
         choices=['days', 'hours', 'minutes', 'seconds'],
         help=_('Granularity to use for age argument, defaults to days.'))
+    parser.add_argument(
+        '-b', '--batch_size', type=int, default=20,
+        help=_('Number of stacks to delete in each transaction, '
+               'defaults to 20.'))
+    parser.add_argument(
+        '-t', '--throttle', type=float, default=0,
+        help=_('Seconds to pause between transactions, defaults to 0.'))
 
     ServiceManageCommand.add_service_parsers(subparsers)
 
@@ -138,10 +138,39 @@ engine_opts = [
                default=240,
                help=_('Error wait time in seconds for stack action (ie. create'
                       ' or update).')),
+    cfg.IntOpt('max_concurrent_validations',
+               default=10,
+               help=_('Maximum number of resources in a stack that are'
+                      ' validated concurrently. Set to 1 to validate'
+                      ' resources one at a time.')),
+    cfg.BoolOpt('distribute_nested_stacks',
+                default=False,
+                help=_('Dispatch the creation and update of nested stacks'
+                       ' to any heat-engine over RPC, instead of running'
+                       ' them in the engine that handles the parent stack.')),
+    cfg.BoolOpt('partition_stacks',
+                default=False,
+                help=_('Assign each stack to one of the running heat-engine'
+                       ' workers by consistent hashing on the stack ID, and'
+                       ' forward actions on the stack to that worker. This'
+                       ' spreads the stacks evenly over all of the worker'
+                       ' processes, which is most useful together with'
+                       ' num_engine_workers.')),
     cfg.IntOpt('engine_life_check_timeout',
                default=2,
-               help=_('RPC timeout for the engine liveness check that is used'
-                      ' for stack locking.')),
+               help=_('RPC timeout for the engine liveness check. It is used'
+                      ' when stopping or cancelling an action that another'
+                      ' engine is running, and when a stack lock without a'
+                      ' lease is found, as written by engines that predate'
+                      ' stack_lock_lease.')),
+    cfg.IntOpt('stack_lock_lease',
+               default=60,
+               help=_('Number of seconds a stack lock is leased to the engine'
+                      ' that holds it. Engines renew the leases on all of'
+                      ' their locks well before they run out, so a lock'
+                      ' whose lease has expired was left behind by an engine'
+                      ' that has stopped and may be taken over. The clocks'
+                      ' of the engine hosts must be kept in sync.')),
     cfg.BoolOpt('enable_cloud_watch_lite',
                 default=True,
                 help=_('Enable the legacy OS::Heat::CWLiteAlarm resource.')),
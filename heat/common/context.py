@@ -108,6 +108,7 @@ class RequestContext(context.RequestContext):
         if overwrite or not hasattr(local.store, 'context'):
             self.update_store()
         self._session = None
+        self._slave_session = None
         self._clients = None
         self.trust_id = trust_id
         self.trustor_user_id = trustor_user_id
@@ -128,6 +129,12 @@ class RequestContext(context.RequestContext):
             self._session = db_api.get_session()
         return self._session
 
+    @property
+    def slave_session(self):
+        if self._slave_session is None:
+            self._slave_session = db_api.get_session(use_slave=True)
+        return self._slave_session
+
     @property
     def clients(self):
         if self._clients is None:
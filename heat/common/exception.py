@@ -418,6 +418,10 @@ class ActionInProgress(HeatException):
                 "in progress.")
 
 
+class ConcurrentTransaction(HeatException):
+    msg_fmt = _("Concurrent update of %(resource)s failed.")
+
+
 class StopActionFailed(HeatException):
     msg_fmt = _("Failed to stop stack (%(stack_name)s) on other engine "
                 "(%(engine_id)s)")
@@ -0,0 +1,49 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""A consistent hash ring for assigning keys to a changing set of nodes.
+
+Each node is placed on the ring at a number of points, and a key belongs to
+the node owning the first point at or after the key's own hash. Adding or
+removing a node therefore only moves the keys adjacent to that node's points.
+"""
+
+import bisect
+import hashlib
+
+from oslo_utils import encodeutils
+
+
+class HashRing(object):
+
+    def __init__(self, nodes, replicas=64):
+        self.nodes = frozenset(nodes)
+        self._ring = sorted((self._hash('%s-%d' % (node, i)), node)
+                            for node in self.nodes
+                            for i in range(replicas))
+        self._points = [point for point, node in self._ring]
+
+    @staticmethod
+    def _hash(key):
+        return int(hashlib.md5(encodeutils.safe_encode(key)).hexdigest(), 16)
+
+    def get_node(self, key):
+        '''Return the node that the given key belongs to.'''
+        if not self._ring:
+            return None
+
+        index = bisect.bisect_left(self._points, self._hash(key))
+        return self._ring[index % len(self._ring)][1]
+
+    def __len__(self):
+        return len(self.nodes)
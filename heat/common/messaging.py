@@ -26,6 +26,7 @@ from heat.common import context
 
 TRANSPORT = None
 NOTIFIER = None
+_NOTIFIERS = {}
 
 _ALIASES = {
     'heat.openstack.common.rpc.impl_kombu': 'rabbit',
@@ -108,6 +109,7 @@ def cleanup():
     if TRANSPORT:
         TRANSPORT.cleanup()
         TRANSPORT = NOTIFIER = None
+    _NOTIFIERS.clear()
 
 
 def get_rpc_server(target, endpoint):
@@ -127,5 +129,13 @@ def get_rpc_client(**kwargs):
 
 
 def get_notifier(publisher_id):
-    """Return a configured oslo_messaging notifier."""
-    return NOTIFIER.prepare(publisher_id=publisher_id)
+    """Return a configured oslo_messaging notifier.
+
+    Notifiers are cached per publisher_id, so that repeated notifications do
+    not each prepare a new one.
+    """
+    notifier = _NOTIFIERS.get(publisher_id)
+    if notifier is None:
+        notifier = NOTIFIER.prepare(publisher_id=publisher_id)
+        _NOTIFIERS[publisher_id] = notifier
+    return notifier
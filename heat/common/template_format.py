@@ -11,11 +11,15 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import copy
+import hashlib
 import itertools
 import re
 
 from oslo_config import cfg
 from oslo_serialization import jsonutils
+from oslo_utils import encodeutils
 import six
 import yaml
 
@@ -48,19 +52,43 @@ yaml_loader.add_constructor(u'tag:yaml.org,2002:timestamp',
                             _construct_yaml_str)
 
 
-def simple_parse(tmpl_str):
-    try:
-        tpl = jsonutils.loads(tmpl_str)
-    except ValueError:
+# Parsing YAML is much slower than copying the result, and the same nested
+# and provider templates are parsed again for every resource that uses them.
+YAML_CACHE_SIZE = 32
+_yaml_cache = collections.OrderedDict()
+
+
+def _yaml_parse(tmpl_str):
+    key = hashlib.sha256(encodeutils.safe_encode(tmpl_str)).hexdigest()
+    tpl = _yaml_cache.pop(key, None)
+    if tpl is None:
         try:
             tpl = yaml.load(tmpl_str, Loader=yaml_loader)
         except yaml.YAMLError as yea:
             yea = six.text_type(yea)
             msg = _('Error parsing template: %s') % yea
             raise ValueError(msg)
-        else:
-            if tpl is None:
-                tpl = {}
+        if tpl is None:
+            tpl = {}
+        if not isinstance(tpl, dict):
+            return tpl
+
+    _yaml_cache[key] = tpl
+    while len(_yaml_cache) > YAML_CACHE_SIZE:
+        _yaml_cache.popitem(last=False)
+    return copy.deepcopy(tpl)
+
+
+def simple_parse(tmpl_str):
+    # Only JSON objects are accepted, so don't bother trying to parse
+    # anything else as JSON.
+    if tmpl_str.lstrip()[:1] == '{':
+        try:
+            tpl = jsonutils.loads(tmpl_str)
+        except ValueError:
+            tpl = _yaml_parse(tmpl_str)
+    else:
+        tpl = _yaml_parse(tmpl_str)
 
     if not isinstance(tpl, dict):
         raise ValueError(_('The template is not a JSON object '
@@ -13,10 +13,14 @@
 
 """Utility for fetching a resource (e.g. a template) from a URL."""
 
+import collections
+import contextlib
+
 from oslo_config import cfg
 from oslo_log import log as logging
 import requests
 from requests import exceptions
+from six.moves import http_cookiejar
 from six.moves import urllib
 
 from heat.common import exception
@@ -28,10 +32,52 @@ cfg.CONF.import_opt('max_template_size', 'heat.common.config')
 LOG = logging.getLogger(__name__)
 
 
+# The largest chunk to read at a time while streaming a response
+CHUNK_SIZE = 65536
+
+# The number of URLs for which to remember the last content and validators
+CACHE_SIZE = 32
+
+_session = None
+_cache = collections.OrderedDict()
+
+
 class URLFetchError(exception.Error, IOError):
     pass
 
 
+def _get_session():
+    """Return the session shared by all fetches, to reuse connections."""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        # Never carry cookies over from one user's fetch to another's
+        _session.cookies.set_policy(
+            http_cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+    return _session
+
+
+def _conditional_headers(cached):
+    headers = {}
+    if cached is not None:
+        if cached['etag']:
+            headers['If-None-Match'] = cached['etag']
+        if cached['last_modified']:
+            headers['If-Modified-Since'] = cached['last_modified']
+    return headers
+
+
+def _store(url, resp, content):
+    etag = resp.headers.get('ETag')
+    last_modified = resp.headers.get('Last-Modified')
+    if etag or last_modified:
+        _cache[url] = {'etag': etag,
+                       'last_modified': last_modified,
+                       'content': content}
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
 def get(url, allowed_schemes=('http', 'https')):
     """Get the data at the specified URL.
 
@@ -53,26 +99,45 @@ def get(url, allowed_schemes=('http', 'https')):
         except urllib.error.URLError as uex:
             raise URLFetchError(_('Failed to retrieve template: %s') % uex)
 
+    cached = _cache.pop(url, None)
     try:
-        resp = requests.get(url, stream=True)
-        resp.raise_for_status()
-
-        # We cannot use resp.text here because it would download the
-        # entire file, and a large enough file would bring down the
-        # engine.  The 'Content-Length' header could be faked, so it's
-        # necessary to download the content in chunks to until
-        # max_template_size is reached.  The chunk_size we use needs
-        # to balance CPU-intensive string concatenation with accuracy
-        # (eg. it's possible to fetch 1000 bytes greater than
-        # max_template_size with a chunk_size of 1000).
-        reader = resp.iter_content(chunk_size=1000)
-        result = ""
-        for chunk in reader:
-            result += chunk
-            if len(result) > cfg.CONF.max_template_size:
-                raise URLFetchError("Template exceeds maximum allowed size (%s"
-                                    " bytes)" % cfg.CONF.max_template_size)
-        return result
+        resp = _get_session().get(url, stream=True,
+                                  headers=_conditional_headers(cached))
+        # Closing the response returns its connection to the shared pool,
+        # even if the body was not read to the end.
+        with contextlib.closing(resp):
+            resp.raise_for_status()
+
+            if resp.status_code == requests.codes.not_modified:
+                if cached is None:
+                    raise URLFetchError(_('Failed to retrieve template: '
+                                          'unexpected response "304 Not '
+                                          'Modified"'))
+                LOG.debug('Data at %s is unchanged', url)
+                _cache[url] = cached
+                return cached['content']
+
+            # We cannot use resp.text here because it would download the
+            # entire file, and a large enough file would bring down the
+            # engine.  The 'Content-Length' header could be faked, so it's
+            # necessary to download the content in chunks until
+            # max_template_size is reached.  The chunks are only joined at
+            # the end, and no chunk is larger than the size limit itself, so
+            # at most one chunk past the limit is ever held.
+            max_size = cfg.CONF.max_template_size
+            reader = resp.iter_content(
+                chunk_size=min(CHUNK_SIZE, max_size + 1))
+            chunks = []
+            size = 0
+            for chunk in reader:
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > max_size:
+                    raise URLFetchError("Template exceeds maximum allowed "
+                                        "size (%s bytes)" % max_size)
+            result = "".join(chunks)
+            _store(url, resp, result)
+            return result
 
     except exceptions.RequestException as ex:
         raise URLFetchError(_('Failed to retrieve template: %s') % ex)
@@ -83,6 +83,9 @@ api_opts = [
                       'max_header_line may need to be increased when using '
                       'large tokens (typically those generated by the '
                       'Keystone v3 API with big service catalogs).')),
+    cfg.IntOpt('resource_type_cache_max_age', default=300,
+               help=_('Number of seconds for which clients may cache the '
+                      'resource type list, schemas and templates.')),
 ]
 api_group = cfg.OptGroup('heat_api')
 cfg.CONF.register_group(api_group)
@@ -39,8 +39,8 @@ def get_engine():
     return IMPL.get_engine()
 
 
-def get_session():
-    return IMPL.get_session()
+def get_session(use_slave=False):
+    return IMPL.get_session(use_slave=use_slave)
 
 
 def raw_template_get(context, template_id):
@@ -55,6 +55,10 @@ def raw_template_update(context, template_id, values):
     return IMPL.raw_template_update(context, template_id, values)
 
 
+def raw_template_delete(context, template_id):
+    return IMPL.raw_template_delete(context, template_id)
+
+
 def resource_data_get_all(resource, data=None):
     return IMPL.resource_data_get_all(resource, data)
 
@@ -98,8 +102,9 @@ def resource_exchange_stacks(context, resource_id1, resource_id2):
     return IMPL.resource_exchange_stacks(context, resource_id1, resource_id2)
 
 
-def resource_get_all_by_stack(context, stack_id):
-    return IMPL.resource_get_all_by_stack(context, stack_id)
+def resource_get_all_by_stack(context, stack_id, use_slave=False):
+    return IMPL.resource_get_all_by_stack(context, stack_id,
+                                          use_slave=use_slave)
 
 
 def resource_get_by_name_and_stack(context, resource_name, stack_id):
@@ -113,10 +118,11 @@ def resource_get_by_physical_resource_id(context, physical_resource_id):
 
 
 def stack_get(context, stack_id, show_deleted=False, tenant_safe=True,
-              eager_load=False):
+              eager_load=False, use_slave=False):
     return IMPL.stack_get(context, stack_id, show_deleted=show_deleted,
                           tenant_safe=tenant_safe,
-                          eager_load=eager_load)
+                          eager_load=eager_load,
+                          use_slave=use_slave)
 
 
 def stack_get_by_name_and_owner_id(context, stack_name, owner_id):
@@ -130,22 +136,28 @@ def stack_get_by_name(context, stack_name):
 
 def stack_get_all(context, limit=None, sort_keys=None, marker=None,
                   sort_dir=None, filters=None, tenant_safe=True,
-                  show_deleted=False, show_nested=False):
+                  show_deleted=False, show_nested=False, use_slave=False):
     return IMPL.stack_get_all(context, limit, sort_keys,
                               marker, sort_dir, filters, tenant_safe,
-                              show_deleted, show_nested)
+                              show_deleted, show_nested, use_slave)
 
 
-def stack_get_all_by_owner_id(context, owner_id):
-    return IMPL.stack_get_all_by_owner_id(context, owner_id)
+def stack_get_all_by_owner_id(context, owner_id, eager_load=False):
+    return IMPL.stack_get_all_by_owner_id(context, owner_id,
+                                          eager_load=eager_load)
 
 
 def stack_count_all(context, filters=None, tenant_safe=True,
-                    show_deleted=False, show_nested=False):
+                    show_deleted=False, show_nested=False, use_slave=False):
     return IMPL.stack_count_all(context, filters=filters,
                                 tenant_safe=tenant_safe,
                                 show_deleted=show_deleted,
-                                show_nested=show_nested)
+                                show_nested=show_nested,
+                                use_slave=use_slave)
+
+
+def stack_get_nested_templates(context, stack_id):
+    return IMPL.stack_get_nested_templates(context, stack_id)
 
 
 def stack_create(context, values):
@@ -168,6 +180,22 @@ def stack_lock_steal(stack_id, old_engine_id, new_engine_id):
     return IMPL.stack_lock_steal(stack_id, old_engine_id, new_engine_id)
 
 
+def stack_lock_steal_expired(stack_id, engine_id):
+    return IMPL.stack_lock_steal_expired(stack_id, engine_id)
+
+
+def stack_lock_has_lease(stack_id):
+    return IMPL.stack_lock_has_lease(stack_id)
+
+
+def stack_lock_held(stack_id):
+    return IMPL.stack_lock_held(stack_id)
+
+
+def stack_lock_renew(engine_id):
+    return IMPL.stack_lock_renew(engine_id)
+
+
 def stack_lock_release(stack_id, engine_id):
     return IMPL.stack_lock_release(stack_id, engine_id)
 
@@ -193,27 +221,32 @@ def event_get_all(context):
 
 
 def event_get_all_by_tenant(context, limit=None, marker=None,
-                            sort_keys=None, sort_dir=None, filters=None):
+                            sort_keys=None, sort_dir=None, filters=None,
+                            use_slave=False):
     return IMPL.event_get_all_by_tenant(context,
                                         limit=limit,
                                         marker=marker,
                                         sort_keys=sort_keys,
                                         sort_dir=sort_dir,
-                                        filters=filters)
+                                        filters=filters,
+                                        use_slave=use_slave)
 
 
 def event_get_all_by_stack(context, stack_id, limit=None, marker=None,
-                           sort_keys=None, sort_dir=None, filters=None):
+                           sort_keys=None, sort_dir=None, filters=None,
+                           use_slave=False):
     return IMPL.event_get_all_by_stack(context, stack_id,
                                        limit=limit,
                                        marker=marker,
                                        sort_keys=sort_keys,
                                        sort_dir=sort_dir,
-                                       filters=filters)
+                                       filters=filters,
+                                       use_slave=use_slave)
 
 
-def event_count_all_by_stack(context, stack_id):
-    return IMPL.event_count_all_by_stack(context, stack_id)
+def event_count_all_by_stack(context, stack_id, use_slave=False):
+    return IMPL.event_count_all_by_stack(context, stack_id,
+                                         use_slave=use_slave)
 
 
 def event_create(context, values):
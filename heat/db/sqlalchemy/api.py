@@ -14,10 +14,12 @@
 '''Implementation of SQLAlchemy backend.'''
 import datetime
 import sys
+import time
 
 from oslo_config import cfg
 from oslo_db.sqlalchemy import session as db_session
 from oslo_db.sqlalchemy import utils
+from oslo_log import log as logging
 from oslo_utils import timeutils
 import osprofiler.sqlalchemy
 import six
@@ -28,6 +30,7 @@ from sqlalchemy.orm import session as orm_session
 from heat.common import crypt
 from heat.common import exception
 from heat.common.i18n import _
+from heat.common.i18n import _LI
 from heat.db.sqlalchemy import filters as db_filters
 from heat.db.sqlalchemy import migration
 from heat.db.sqlalchemy import models
@@ -35,8 +38,11 @@ from heat.rpc import api as rpc_api
 
 CONF = cfg.CONF
 CONF.import_opt('max_events_per_stack', 'heat.common.config')
+CONF.import_opt('stack_lock_lease', 'heat.common.config')
 CONF.import_group('profiler', 'heat.common.config')
 
+LOG = logging.getLogger(__name__)
+
 _facade = None
 
 
@@ -50,11 +56,15 @@ def get_facade():
                 osprofiler.sqlalchemy.add_tracing(sqlalchemy,
                                                   _facade.get_engine(),
                                                   "db")
+                if CONF.database.slave_connection:
+                    osprofiler.sqlalchemy.add_tracing(
+                        sqlalchemy, _facade.get_engine(use_slave=True), "db")
 
     return _facade
 
 get_engine = lambda: get_facade().get_engine()
-get_session = lambda: get_facade().get_session()
+get_session = lambda use_slave=False: get_facade().get_session(
+    use_slave=use_slave)
 
 
 def get_backend():
@@ -62,8 +72,20 @@ def get_backend():
     return sys.modules[__name__]
 
 
-def model_query(context, *args):
-    session = _session(context)
+def model_query(context, *args, **kwargs):
+    """Query helper.
+
+    :param use_slave: if True, run the query against the read replica
+        configured as the slave_connection in the [database] section, if
+        there is one. The results may lag behind the primary database by the
+        replication delay, so only use it for data that is displayed and
+        never for data that is about to be written back. Heat does not
+        measure the lag, so there is no bound on it other than the one the
+        replica itself provides. The objects returned stay attached to a
+        replica session held by the context, so any relationships that they
+        load lazily are also read from the replica.
+    """
+    session = _session(context, kwargs.get('use_slave', False))
     query = session.query(*args)
     return query
 
@@ -72,9 +94,11 @@ def soft_delete_aware_query(context, *args, **kwargs):
     """Stack query helper that accounts for context's `show_deleted` field.
 
     :param show_deleted: if True, overrides context's show_deleted field.
+    :param use_slave: if True, read from the read replica, if there is one.
     """
 
-    query = model_query(context, *args)
+    query = model_query(context, *args,
+                        use_slave=kwargs.get('use_slave', False))
     show_deleted = kwargs.get('show_deleted') or context.show_deleted
 
     if not show_deleted:
@@ -82,7 +106,12 @@ def soft_delete_aware_query(context, *args, **kwargs):
     return query
 
 
-def _session(context):
+def _session(context, use_slave=False):
+    if use_slave and CONF.database.slave_connection:
+        # The context's session is bound to the primary database, which
+        # must continue to handle every write.
+        return (context and context.slave_session) or get_session(
+            use_slave=True)
     return (context and context.session) or get_session()
 
 
@@ -114,6 +143,11 @@ def raw_template_update(context, template_id, values):
     return raw_template_ref
 
 
+def raw_template_delete(context, template_id):
+    raw_template = raw_template_get(context, template_id)
+    raw_template.delete()
+
+
 def resource_get(context, resource_id):
     result = model_query(context, models.Resource).get(resource_id)
 
@@ -158,10 +192,13 @@ def resource_update(context, resource_id, values, atomic_key,
                     expected_engine_id=None):
     session = _session(context)
     with session.begin():
-        values['atomic_key'] = atomic_key + 1
-        rows_updated = session.query(models.Resource).filter_by(
-            id=resource_id, engine_id=expected_engine_id,
-            atomic_key=atomic_key).update(values)
+        values['atomic_key'] = (atomic_key or 0) + 1
+        query = session.query(models.Resource).filter_by(
+            id=resource_id, atomic_key=atomic_key)
+        # Only match the engine holding the resource if the caller says which
+        if expected_engine_id is not None:
+            query = query.filter_by(engine_id=expected_engine_id)
+        rows_updated = query.update(values)
 
         return bool(rows_updated)
 
@@ -273,13 +310,16 @@ def resource_create(context, values):
     return resource_ref
 
 
-def resource_get_all_by_stack(context, stack_id):
+def resource_get_all_by_stack(context, stack_id, use_slave=False):
     results = model_query(
-        context, models.Resource
+        context, models.Resource, use_slave=use_slave
     ).filter_by(
         stack_id=stack_id
-    ).options(orm.joinedload("data")).all()
+    ).options(orm.subqueryload("data")).all()
 
+    if not results and use_slave and CONF.database.slave_connection:
+        # The resources of a new stack may not have been replicated yet
+        return resource_get_all_by_stack(context, stack_id)
     if not results:
         raise exception.NotFound(_("no resources for stack_id %s were found")
                                  % stack_id)
@@ -307,11 +347,15 @@ def stack_get_by_name(context, stack_name):
 
 
 def stack_get(context, stack_id, show_deleted=False, tenant_safe=True,
-              eager_load=False):
-    query = model_query(context, models.Stack)
+              eager_load=False, use_slave=False):
+    query = model_query(context, models.Stack, use_slave=use_slave)
     if eager_load:
         query = query.options(orm.joinedload("raw_template"))
     result = query.get(stack_id)
+    if result is None and use_slave and CONF.database.slave_connection:
+        # A stack that was only just created may not have been replicated
+        return stack_get(context, stack_id, show_deleted=show_deleted,
+                         tenant_safe=tenant_safe, eager_load=eager_load)
 
     deleted_ok = show_deleted or context.show_deleted
     if result is None or result.deleted_at is not None and not deleted_ok:
@@ -326,10 +370,12 @@ def stack_get(context, stack_id, show_deleted=False, tenant_safe=True,
     return result
 
 
-def stack_get_all_by_owner_id(context, owner_id):
-    results = soft_delete_aware_query(
-        context, models.Stack).filter_by(owner_id=owner_id).all()
-    return results
+def stack_get_all_by_owner_id(context, owner_id, eager_load=False):
+    query = soft_delete_aware_query(
+        context, models.Stack).filter_by(owner_id=owner_id)
+    if eager_load:
+        query = query.options(orm.joinedload("raw_template"))
+    return query.all()
 
 
 def _get_sort_keys(sort_keys, mapping):
@@ -358,7 +404,7 @@ def _paginate_query(context, query, model, limit=None, sort_keys=None,
 
     model_marker = None
     if marker:
-        model_marker = model_query(context, model).get(marker)
+        model_marker = query.session.query(model).get(marker)
     try:
         query = utils.paginate_query(query, model, limit, sort_keys,
                                      model_marker, sort_dir)
@@ -368,14 +414,16 @@ def _paginate_query(context, query, model, limit=None, sort_keys=None,
 
 
 def _query_stack_get_all(context, tenant_safe=True, show_deleted=False,
-                         show_nested=False):
+                         show_nested=False, use_slave=False):
     if show_nested:
         query = soft_delete_aware_query(
-            context, models.Stack, show_deleted=show_deleted
+            context, models.Stack, show_deleted=show_deleted,
+            use_slave=use_slave
         ).filter_by(backup=False)
     else:
         query = soft_delete_aware_query(
-            context, models.Stack, show_deleted=show_deleted
+            context, models.Stack, show_deleted=show_deleted,
+            use_slave=use_slave
         ).filter_by(owner_id=None)
 
     if tenant_safe:
@@ -385,10 +433,11 @@ def _query_stack_get_all(context, tenant_safe=True, show_deleted=False,
 
 def stack_get_all(context, limit=None, sort_keys=None, marker=None,
                   sort_dir=None, filters=None, tenant_safe=True,
-                  show_deleted=False, show_nested=False):
+                  show_deleted=False, show_nested=False, use_slave=False):
     query = _query_stack_get_all(context, tenant_safe,
                                  show_deleted=show_deleted,
-                                 show_nested=show_nested)
+                                 show_nested=show_nested,
+                                 use_slave=use_slave)
     return _filter_and_page_query(context, query, limit, sort_keys,
                                   marker, sort_dir, filters).all()
 
@@ -410,14 +459,38 @@ def _filter_and_page_query(context, query, limit=None, sort_keys=None,
 
 
 def stack_count_all(context, filters=None, tenant_safe=True,
-                    show_deleted=False, show_nested=False):
+                    show_deleted=False, show_nested=False, use_slave=False):
     query = _query_stack_get_all(context, tenant_safe=tenant_safe,
                                  show_deleted=show_deleted,
-                                 show_nested=show_nested)
+                                 show_nested=show_nested,
+                                 use_slave=use_slave)
     query = db_filters.exact_filter(query, models.Stack, filters)
     return query.count()
 
 
+def stack_get_nested_templates(context, stack_id):
+    '''Return the templates of all the stacks nested below a stack.
+
+    The stack hierarchy is walked one level of nesting at a time, so the
+    number of queries depends on the nesting depth rather than on the number
+    of nested stacks. Backup stacks are not included.
+    '''
+    templates = []
+    parent_ids = [stack_id]
+    while parent_ids:
+        query = soft_delete_aware_query(
+            context, models.Stack.id, models.RawTemplate.template
+        ).filter(models.Stack.owner_id.in_(parent_ids)).filter(
+            sqlalchemy.or_(models.Stack.backup == sqlalchemy.false(),
+                           models.Stack.backup.is_(None))
+        ).join(models.RawTemplate,
+               models.Stack.raw_template_id == models.RawTemplate.id)
+        children = query.all()
+        parent_ids = [child.id for child in children]
+        templates.extend(child.template for child in children)
+    return templates
+
+
 def stack_create(context, values):
     stack_ref = models.Stack()
     stack_ref.update(values)
@@ -461,13 +534,19 @@ def stack_delete(context, stack_id):
     session.flush()
 
 
+def _stack_lock_expiry():
+    return timeutils.utcnow() + datetime.timedelta(
+        seconds=cfg.CONF.stack_lock_lease)
+
+
 def stack_lock_create(stack_id, engine_id):
     session = get_session()
     with session.begin():
         lock = session.query(models.StackLock).get(stack_id)
         if lock is not None:
             return lock.engine_id
-        session.add(models.StackLock(stack_id=stack_id, engine_id=engine_id))
+        session.add(models.StackLock(stack_id=stack_id, engine_id=engine_id,
+                                     expires_at=_stack_lock_expiry()))
 
 
 def stack_lock_steal(stack_id, old_engine_id, new_engine_id):
@@ -477,11 +556,60 @@ def stack_lock_steal(stack_id, old_engine_id, new_engine_id):
         rows_affected = session.query(
             models.StackLock
         ).filter_by(stack_id=stack_id, engine_id=old_engine_id
-                    ).update({"engine_id": new_engine_id})
+                    ).update({"engine_id": new_engine_id,
+                              "expires_at": _stack_lock_expiry()})
     if not rows_affected:
         return lock.engine_id if lock is not None else True
 
 
+def stack_lock_steal_expired(stack_id, engine_id):
+    '''
+    Take over a lock whose lease has run out, in a single UPDATE.
+
+    Locks written by engines that predate leases have no expiry, and are
+    never taken over here.
+    '''
+    session = get_session()
+    with session.begin():
+        rows_affected = session.query(
+            models.StackLock
+        ).filter_by(stack_id=stack_id).filter(
+            models.StackLock.expires_at < timeutils.utcnow()
+        ).update({"engine_id": engine_id,
+                  "expires_at": _stack_lock_expiry()},
+                 synchronize_session=False)
+        if not rows_affected:
+            lock = session.query(models.StackLock).get(stack_id)
+            return lock.engine_id if lock is not None else True
+
+
+def stack_lock_has_lease(stack_id):
+    lock = get_session().query(models.StackLock).get(stack_id)
+    return lock is not None and lock.expires_at is not None
+
+
+def stack_lock_held(stack_id):
+    '''
+    Return True if a stack is locked by an engine whose lease is current.
+
+    Locks without a lease are always treated as held.
+    '''
+    lock = get_session().query(models.StackLock).get(stack_id)
+    if lock is None:
+        return False
+    return lock.expires_at is None or lock.expires_at >= timeutils.utcnow()
+
+
+def stack_lock_renew(engine_id):
+    session = get_session()
+    with session.begin():
+        return session.query(
+            models.StackLock
+        ).filter_by(engine_id=engine_id).update(
+            {"expires_at": _stack_lock_expiry()},
+            synchronize_session=False)
+
+
 def stack_lock_release(stack_id, engine_id):
     session = get_session()
     with session.begin():
@@ -557,8 +685,9 @@ def event_get_all(context):
 
 
 def event_get_all_by_tenant(context, limit=None, marker=None,
-                            sort_keys=None, sort_dir=None, filters=None):
-    query = model_query(context, models.Event)
+                            sort_keys=None, sort_dir=None, filters=None,
+                            use_slave=False):
+    query = model_query(context, models.Event, use_slave=use_slave)
     query = db_filters.exact_filter(query, models.Event, filters)
     query = query.join(
         models.Event.stack
@@ -568,14 +697,16 @@ def event_get_all_by_tenant(context, limit=None, marker=None,
                                          sort_keys, sort_dir, filters).all()
 
 
-def _query_all_by_stack(context, stack_id):
-    query = model_query(context, models.Event).filter_by(stack_id=stack_id)
+def _query_all_by_stack(context, stack_id, use_slave=False):
+    query = model_query(context, models.Event,
+                        use_slave=use_slave).filter_by(stack_id=stack_id)
     return query
 
 
 def event_get_all_by_stack(context, stack_id, limit=None, marker=None,
-                           sort_keys=None, sort_dir=None, filters=None):
-    query = _query_all_by_stack(context, stack_id)
+                           sort_keys=None, sort_dir=None, filters=None,
+                           use_slave=False):
+    query = _query_all_by_stack(context, stack_id, use_slave=use_slave)
     return _events_filter_and_page_query(context, query, limit, marker,
                                          sort_keys, sort_dir, filters).all()
 
@@ -596,8 +727,8 @@ def _events_paginate_query(context, query, model, limit=None, sort_keys=None,
     if marker:
         # not to use model_query(context, model).get(marker), because
         # user can only see the ID(column 'uuid') and the ID as the marker
-        model_marker = model_query(
-            context, model).filter_by(uuid=marker).first()
+        model_marker = query.session.query(
+            model).filter_by(uuid=marker).first()
     try:
         query = utils.paginate_query(query, model, limit, sort_keys,
                                      model_marker, sort_dir)
@@ -624,8 +755,9 @@ def _events_filter_and_page_query(context, query,
                                   whitelisted_sort_keys, marker, sort_dir)
 
 
-def event_count_all_by_stack(context, stack_id):
-    return _query_all_by_stack(context, stack_id).count()
+def event_count_all_by_stack(context, stack_id, use_slave=False):
+    return _query_all_by_stack(context, stack_id,
+                               use_slave=use_slave).count()
 
 
 def _delete_event_rows(context, stack_id, limit):
@@ -880,7 +1012,7 @@ def service_get_all_by_args(context, host, binary, hostname):
             filter_by(hostname=hostname).all())
 
 
-def purge_deleted(age, granularity='days'):
+def purge_deleted(age, granularity='days', batch_size=20, throttle=0):
     try:
         age = int(age)
     except ValueError:
@@ -892,6 +1024,13 @@ def purge_deleted(age, granularity='days'):
         raise exception.Error(
             _("granularity should be days, hours, minutes, or seconds"))
 
+    try:
+        batch_size = int(batch_size)
+    except ValueError:
+        raise exception.Error(_("batch_size should be an integer"))
+    if batch_size <= 0:
+        raise exception.Error(_("batch_size should be a positive integer"))
+
     if granularity == 'days':
         age = age * 86400
     elif granularity == 'hours':
@@ -904,39 +1043,102 @@ def purge_deleted(age, granularity='days'):
     meta = sqlalchemy.MetaData()
     meta.bind = engine
 
-    # Purge deleted stacks
+    # Purge deleted stacks, a batch at a time so that each transaction, and
+    # the locks it holds, stays small
     stack = sqlalchemy.Table('stack', meta, autoload=True)
-    event = sqlalchemy.Table('event', meta, autoload=True)
-    raw_template = sqlalchemy.Table('raw_template', meta, autoload=True)
-    user_creds = sqlalchemy.Table('user_creds', meta, autoload=True)
-
     stmt = sqlalchemy.select(
         [stack.c.id,
          stack.c.raw_template_id,
+         stack.c.prev_raw_template_id,
          stack.c.user_creds_id]
-    ).where(stack.c.deleted_at < time_line)
-    deleted_stacks = engine.execute(stmt)
-
-    for s in deleted_stacks:
-        event_del = event.delete().where(event.c.stack_id == s[0])
-        engine.execute(event_del)
-        stack_del = stack.delete().where(stack.c.id == s[0])
-        engine.execute(stack_del)
-        raw_template_del = raw_template.delete().where(
-            raw_template.c.id == s[1])
-        engine.execute(raw_template_del)
-        user_creds_del = user_creds.delete().where(user_creds.c.id == s[2])
-        engine.execute(user_creds_del)
+    ).where(stack.c.deleted_at < time_line).limit(batch_size)
+
+    purged = 0
+    while True:
+        with engine.begin() as conn:
+            deleted_stacks = conn.execute(stmt).fetchall()
+            if not deleted_stacks:
+                break
+            _purge_stacks(conn, meta, deleted_stacks)
+
+        purged += len(deleted_stacks)
+        LOG.info(_LI('Purged %d deleted stacks'), purged)
+        if throttle:
+            time.sleep(throttle)
 
     # Purge deleted services
     service = sqlalchemy.Table('service', meta, autoload=True)
-    stmt = (sqlalchemy.select([service.c.id]).
-            where(service.c.deleted_at < time_line))
-    deleted_services = engine.execute(stmt)
-
-    for s in deleted_services:
-        stmt = service.delete().where(service.c.id == s[0])
-        engine.execute(stmt)
+    engine.execute(service.delete().where(service.c.deleted_at < time_line))
+
+    return purged
+
+
+def _purge_stacks(conn, meta, deleted_stacks):
+    """Delete the given stacks and all of the rows that belong to them."""
+    def table(name):
+        return sqlalchemy.Table(name, meta, autoload=True)
+
+    stack = table('stack')
+    resource = table('resource')
+    raw_template = table('raw_template')
+    user_creds = table('user_creds')
+    watch_rule = table('watch_rule')
+
+    stack_ids = [s[0] for s in deleted_stacks]
+    creds_ids = list(set(s[3] for s in deleted_stacks) - set([None]))
+
+    tmpl_ids = set(s[1] for s in deleted_stacks)
+    tmpl_ids.update(s[2] for s in deleted_stacks)
+    tmpl_ids.update(r[0] for r in conn.execute(
+        sqlalchemy.select([resource.c.current_template_id]).where(
+            resource.c.stack_id.in_(stack_ids))))
+    tmpl_ids.discard(None)
+
+    resource_ids = sqlalchemy.select([resource.c.id]).where(
+        resource.c.stack_id.in_(stack_ids))
+    resource_data = table('resource_data')
+    conn.execute(resource_data.delete().where(
+        resource_data.c.resource_id.in_(resource_ids)))
+
+    watch_rule_ids = sqlalchemy.select([watch_rule.c.id]).where(
+        watch_rule.c.stack_id.in_(stack_ids))
+    watch_data = table('watch_data')
+    conn.execute(watch_data.delete().where(
+        watch_data.c.watch_rule_id.in_(watch_rule_ids)))
+
+    for name in ('event', 'resource', 'stack_tag', 'snapshot', 'stack_lock',
+                 'sync_point', 'watch_rule'):
+        dependent = table(name)
+        conn.execute(dependent.delete().where(
+            dependent.c.stack_id.in_(stack_ids)))
+
+    conn.execute(stack.delete().where(stack.c.id.in_(stack_ids)))
+
+    # Templates and credentials may still be shared with a stack that was
+    # not purged, e.g. a backup stack.
+    if tmpl_ids:
+        in_use = set(r[0] for r in conn.execute(
+            sqlalchemy.union(
+                sqlalchemy.select([stack.c.raw_template_id]).where(
+                    stack.c.raw_template_id.in_(list(tmpl_ids))),
+                sqlalchemy.select([stack.c.prev_raw_template_id]).where(
+                    stack.c.prev_raw_template_id.in_(list(tmpl_ids))),
+                sqlalchemy.select([resource.c.current_template_id]).where(
+                    resource.c.current_template_id.in_(list(tmpl_ids))))))
+        tmpl_ids = list(tmpl_ids - in_use)
+    if tmpl_ids:
+        conn.execute(raw_template.update().where(
+            raw_template.c.predecessor.in_(tmpl_ids)).values(
+                predecessor=None))
+        conn.execute(raw_template.delete().where(
+            raw_template.c.id.in_(tmpl_ids)))
+
+    if creds_ids:
+        in_use = sqlalchemy.select([stack.c.user_creds_id]).where(
+            stack.c.user_creds_id.in_(creds_ids))
+        conn.execute(user_creds.delete().where(
+            user_creds.c.id.in_(creds_ids)).where(
+                ~user_creds.c.id.in_(in_use)))
 
 
 def sync_point_delete_all_by_stack_and_traversal(context, stack_id,
@@ -155,6 +155,9 @@ class Stack(BASE, HeatBase, SoftDelete, StateAware):
     __table_args__ = (
         sqlalchemy.Index('ix_stack_name', 'name', mysql_length=255),
         sqlalchemy.Index('ix_stack_tenant', 'tenant', mysql_length=255),
+        sqlalchemy.Index('ix_stack_tenant_created_at',
+                         'tenant', 'created_at', 'id',
+                         mysql_length={'tenant': 255}),
     )
 
     id = sqlalchemy.Column(sqlalchemy.String(36), primary_key=True,
@@ -206,6 +209,7 @@ class StackLock(BASE, HeatBase):
                                  sqlalchemy.ForeignKey('stack.id'),
                                  primary_key=True)
     engine_id = sqlalchemy.Column(sqlalchemy.String(36))
+    expires_at = sqlalchemy.Column(sqlalchemy.DateTime)
 
 
 class UserCreds(BASE, HeatBase):
@@ -233,6 +237,10 @@ class Event(BASE, HeatBase):
     """Represents an event generated by the heat engine."""
 
     __tablename__ = 'event'
+    __table_args__ = (
+        sqlalchemy.Index('ix_event_stack_id_created_at',
+                         'stack_id', 'created_at', 'id'),
+    )
 
     id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True)
     stack_id = sqlalchemy.Column(sqlalchemy.String(36),
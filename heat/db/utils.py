@@ -43,5 +43,5 @@ IMPL = LazyPluggable('backend',
                      sqlalchemy='heat.db.sqlalchemy.api')
 
 
-def purge_deleted(age, granularity='days'):
-    IMPL.purge_deleted(age, granularity)
+def purge_deleted(age, granularity='days', batch_size=20, throttle=0):
+    return IMPL.purge_deleted(age, granularity, batch_size, throttle)
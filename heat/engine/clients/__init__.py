@@ -17,11 +17,11 @@ from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_utils import importutils
 import six
-from stevedore import extension
 
 from heat.common import exception
 from heat.common.i18n import _LE
 from heat.common.i18n import _LW
+from heat.engine import plugin_manager
 
 LOG = logging.getLogger(__name__)
 
@@ -50,8 +50,9 @@ class OpenStackClients(object):
         global _mgr
         if name in self._client_plugins:
             return self._client_plugins[name]
-        if _mgr and name in _mgr.names():
-            client_plugin = _mgr[name].plugin(self.context)
+        plugin_class = _mgr and _mgr.get(name)
+        if plugin_class:
+            client_plugin = plugin_class(self.context)
             self._client_plugins[name] = client_plugin
             return client_plugin
 
@@ -153,7 +154,7 @@ _mgr = None
 
 
 def has_client(name):
-    return _mgr and name in _mgr.names()
+    return bool(_mgr and _mgr.get(name))
 
 
 def initialise():
@@ -161,10 +162,7 @@ def initialise():
     if _mgr:
         return
 
-    _mgr = extension.ExtensionManager(
-        namespace='heat.clients',
-        invoke_on_load=False,
-        verify_requirements=True)
+    _mgr = plugin_manager.EntryPointPlugins('heat.clients')
 
 
 def list_opts():
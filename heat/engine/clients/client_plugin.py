@@ -176,3 +176,79 @@ class ClientPlugin(object):
             return
         else:
             raise ex
+
+
+class StatusBatcher(object):
+    '''
+    Poll the status of many objects of one kind with bulk list calls.
+
+    Objects are tracked while they are in a transitional state. When tracked
+    objects are polled and more than one is being tracked, a single listing
+    covering all of them is fetched per polling round and shared between
+    them, instead of each object being fetched on its own. A new listing is
+    only fetched once an object has already consumed the current one, so a
+    round follows the scheduler steps of the tasks doing the polling.
+    '''
+
+    def __init__(self, list_objects):
+        '''
+        :param list_objects: a callable taking a dict of the tracked object
+                             ids and their markers, and returning a dict of
+                             object ids and their details
+        '''
+        self._list_objects = list_objects
+        self._tracked = {}
+        self._listing = {}
+        self._generation = 0
+
+    def __contains__(self, obj_id):
+        return obj_id in self._tracked
+
+    def track(self, obj_id, marker=None):
+        '''Start or keep tracking an object, updating its marker.'''
+        tracked = self._tracked.setdefault(
+            obj_id, {'generation': self._generation})
+        tracked['marker'] = marker
+
+    def untrack(self, obj_id):
+        '''Stop tracking an object.'''
+        self._tracked.pop(obj_id, None)
+
+    def poll(self, obj_id):
+        '''
+        Return the details of a tracked object from the current listing.
+
+        Errors from the list call are raised to the object that triggered
+        it; the other objects get no new details for that round.
+
+        :returns: a dict of the object's details, an empty dict if nothing
+                  new is known this round, or None if the object should be
+                  fetched on its own
+        '''
+        tracked = self._tracked.get(obj_id)
+        if tracked is None:
+            return None
+
+        if tracked['generation'] == self._generation:
+            if len(self._tracked) < 2:
+                return None
+            self._refresh()
+        tracked['generation'] = self._generation
+
+        if self._listing is None:
+            return {}
+        return self._listing.get(obj_id)
+
+    def _refresh(self):
+        generation = self._generation
+        self._generation += 1
+        self._listing = None
+
+        # Forget about objects that nobody polled during the last round
+        for obj_id, tracked in list(self._tracked.items()):
+            if tracked['generation'] < generation:
+                del self._tracked[obj_id]
+
+        self._listing = self._list_objects(
+            dict((obj_id, tracked['marker'])
+                 for obj_id, tracked in self._tracked.items()))
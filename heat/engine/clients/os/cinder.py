@@ -31,6 +31,10 @@ class CinderClientPlugin(client_plugin.ClientPlugin):
 
     exceptions_module = exceptions
 
+    def __init__(self, context):
+        super(CinderClientPlugin, self).__init__(context)
+        self._volume_batcher = client_plugin.StatusBatcher(self._list_volumes)
+
     def get_volume_api_version(self):
         '''Returns the most recent API version.'''
 
@@ -94,6 +98,35 @@ class CinderClientPlugin(client_plugin.ClientPlugin):
                      {'volume': volume, 'ex': ex})
             raise exception.VolumeNotFound(volume=volume)
 
+    def poll_volume(self, volume_id, pending_statuses):
+        '''
+        Return the current state of a volume that is being waited on.
+
+        While several volumes are in one of the given pending statuses, they
+        are refreshed together from a listing of the volumes in each of
+        those statuses, instead of being fetched one at a time.
+        '''
+        manager = self.client().volumes
+        details = self._volume_batcher.poll(volume_id)
+        if details:
+            vol = manager.resource_class(manager, details, loaded=True)
+        else:
+            vol = manager.get(volume_id)
+
+        if vol.status in pending_statuses:
+            self._volume_batcher.track(volume_id, vol.status)
+        else:
+            self._volume_batcher.untrack(volume_id)
+        return vol
+
+    def _list_volumes(self, statuses):
+        volumes = {}
+        for status in set(statuses.values()):
+            for vol in self.client().volumes.list(
+                    search_opts={'status': status}):
+                volumes[vol.id] = vol._info
+        return volumes
+
     def get_volume_snapshot(self, snapshot):
         try:
             return self.client().volume_snapshots.get(snapshot)
@@ -15,6 +15,7 @@ import collections
 import email
 from email.mime import multipart
 from email.mime import text
+import hashlib
 import logging
 import os
 import pkgutil
@@ -25,6 +26,7 @@ from novaclient import exceptions
 from novaclient import shell as novashell
 from oslo_config import cfg
 from oslo_serialization import jsonutils
+from oslo_utils import encodeutils
 from oslo_utils import uuidutils
 import six
 from six.moves.urllib import parse as urlparse
@@ -38,6 +40,24 @@ from heat.engine import scheduler
 
 LOG = logging.getLogger(__name__)
 
+USERDATA_CACHE_SIZE = 64
+
+_cloudinit_files = {}
+_cloudinit_templates = {}
+_userdata_cache = collections.OrderedDict()
+
+
+def _read_cloudinit_file(fn):
+    if fn not in _cloudinit_files:
+        _cloudinit_files[fn] = pkgutil.get_data('heat', 'cloudinit/%s' % fn)
+    return _cloudinit_files[fn]
+
+
+def _cloudinit_template(fn):
+    if fn not in _cloudinit_templates:
+        _cloudinit_templates[fn] = string.Template(_read_cloudinit_file(fn))
+    return _cloudinit_templates[fn]
+
 
 class NovaClientPlugin(client_plugin.ClientPlugin):
 
@@ -54,6 +74,10 @@ class NovaClientPlugin(client_plugin.ClientPlugin):
 
     exceptions_module = exceptions
 
+    def __init__(self, context):
+        super(NovaClientPlugin, self).__init__(context)
+        self._server_batcher = client_plugin.StatusBatcher(self._list_servers)
+
     def _create(self):
         computeshell = novashell.OpenStackComputeShell()
         extensions = computeshell._discover_extensions("1.1")
@@ -106,7 +130,12 @@ class NovaClientPlugin(client_plugin.ClientPlugin):
         API errors.
         '''
         try:
-            server.get()
+            details = self._server_batcher.poll(server.id)
+            if details is None:
+                server.get()
+            elif details:
+                server._add_details(details)
+            self._track_server(server)
         except exceptions.OverLimit as exc:
             LOG.warn(_LW("Server %(name)s (%(id)s) received an OverLimit "
                          "response during server.get(): %(exception)s"),
@@ -125,6 +154,30 @@ class NovaClientPlugin(client_plugin.ClientPlugin):
             else:
                 raise
 
+    def _track_server(self, server):
+        '''
+        Track a server that is still in a deferred status, so that it can be
+        refreshed together with the others from a single listing.
+        '''
+        updated = getattr(server, 'updated', None)
+        if (isinstance(updated, six.string_types) and
+                self.get_status(server) in self.deferred_server_statuses):
+            self._server_batcher.track(server.id, updated)
+        else:
+            self._server_batcher.untrack(server.id)
+
+    def _list_servers(self, updated):
+        '''
+        List the servers changed since the oldest of the given update times.
+
+        Deleted servers are left out, so that they are fetched on their own.
+        '''
+        servers = self.client().servers.list(
+            detailed=True,
+            search_opts={'changes-since': min(updated.values())})
+        return dict((s.id, s._info) for s in servers
+                    if s.status != 'DELETED')
+
     def get_ip(self, server, net_type, ip_version):
         """Return the server's IP of the given type and version."""
         if net_type in server.addresses:
@@ -196,6 +249,37 @@ class NovaClientPlugin(client_plugin.ClientPlugin):
         if user_data_format == 'RAW':
             return userdata
 
+        # Identical servers, such as the members of a scaling group, produce
+        # identical user data, so keep the most recently built blobs.
+        key = self._userdata_cache_key(metadata, userdata, instance_user,
+                                       user_data_format)
+        mime_string = _userdata_cache.pop(key, None)
+        if mime_string is None:
+            mime_string = self._build_userdata(metadata, userdata,
+                                               instance_user,
+                                               user_data_format)
+        _userdata_cache[key] = mime_string
+        while len(_userdata_cache) > USERDATA_CACHE_SIZE:
+            _userdata_cache.popitem(last=False)
+
+        return mime_string
+
+    @staticmethod
+    def _userdata_cache_key(metadata, userdata, instance_user,
+                            user_data_format):
+        digest = hashlib.sha256()
+        digest.update(jsonutils.dumps(metadata, sort_keys=True))
+        if userdata is not None:
+            digest.update(b'\0')
+            digest.update(encodeutils.safe_encode(userdata))
+        return (digest.hexdigest(), instance_user, user_data_format,
+                cfg.CONF.heat_metadata_server_url,
+                cfg.CONF.heat_watch_server_url,
+                cfg.CONF.instance_connection_is_secure,
+                cfg.CONF.instance_connection_https_validate_certificates)
+
+    def _build_userdata(self, metadata, userdata, instance_user,
+                        user_data_format):
         is_cfntools = user_data_format == 'HEAT_CFNTOOLS'
         is_software_config = user_data_format == 'SOFTWARE_CONFIG'
 
@@ -207,9 +291,6 @@ class NovaClientPlugin(client_plugin.ClientPlugin):
                            filename=filename)
             return msg
 
-        def read_cloudinit_file(fn):
-            return pkgutil.get_data('heat', 'cloudinit/%s' % fn)
-
         if instance_user:
             config_custom_user = 'user: %s' % instance_user
             # FIXME(shadower): compatibility workaround for cloud-init 0.6.3.
@@ -224,16 +305,15 @@ echo -e '%s\tALL=(ALL)\tNOPASSWD: ALL' >> /etc/sudoers
             config_custom_user = ''
             boothook_custom_user = ''
 
-        cloudinit_config = string.Template(
-            read_cloudinit_file('config')).safe_substitute(
-                add_custom_user=config_custom_user)
-        cloudinit_boothook = string.Template(
-            read_cloudinit_file('boothook.sh')).safe_substitute(
+        cloudinit_config = _cloudinit_template('config').safe_substitute(
+            add_custom_user=config_custom_user)
+        cloudinit_boothook = _cloudinit_template(
+            'boothook.sh').safe_substitute(
                 add_custom_user=boothook_custom_user)
 
         attachments = [(cloudinit_config, 'cloud-config'),
                        (cloudinit_boothook, 'boothook.sh', 'cloud-boothook'),
-                       (read_cloudinit_file('part_handler.py'),
+                       (_read_cloudinit_file('part_handler.py'),
                         'part-handler.py')]
 
         if is_cfntools:
@@ -255,7 +335,7 @@ echo -e '%s\tALL=(ALL)\tNOPASSWD: ALL' >> /etc/sudoers
                 attachments.append((userdata, 'userdata', 'x-shellscript'))
 
         if is_cfntools:
-            attachments.append((read_cloudinit_file('loguserdata.py'),
+            attachments.append((_read_cloudinit_file('loguserdata.py'),
                                'loguserdata.py', 'x-shellscript'))
 
         if metadata:
@@ -12,9 +12,13 @@
 #    under the License.
 
 import collections
+import contextlib
 import numbers
 import re
+import sys
+import weakref
 
+import eventlet
 from oslo_utils import strutils
 import six
 
@@ -577,10 +581,78 @@ class BaseCustomConstraint(object):
             "value": value, "message": self._error_message}
 
     def validate(self, value, context):
+        cache = _validation_caches.get(context)
+        if cache is None:
+            valid, message = self._validate(value, context)
+        else:
+            valid, message = cache.check(
+                (type(self), value), lambda: self._validate(value, context))
+        if not valid:
+            self._error_message = message
+        return valid
+
+    def _validate(self, value, context):
         try:
             self.validate_with_client(context.clients, value)
         except self.expected_exceptions as e:
-            self._error_message = str(e)
-            return False
+            return False, str(e)
         else:
-            return True
+            return True, None
+
+
+class ValidationCache(object):
+    """Results of the custom constraint checks made during a validation.
+
+    Identical checks share a single call to the remote service, and a check
+    already in progress in another thread is waited for rather than being
+    repeated. Failed checks are forgotten once they complete.
+    """
+
+    def __init__(self):
+        self._checks = {}
+
+    def check(self, key, validate):
+        try:
+            pending = self._checks.get(key)
+        except TypeError:
+            # Unhashable values (e.g. lists) are not cached
+            return validate()
+
+        if pending is not None:
+            return pending.wait()
+
+        pending = self._checks[key] = eventlet.event.Event()
+        try:
+            result = validate()
+        except Exception:
+            exc_info = sys.exc_info()
+            del self._checks[key]
+            pending.send_exception(*exc_info)
+            six.reraise(*exc_info)
+
+        valid, message = result
+        if not valid:
+            # Don't remember failures, the missing resource may yet appear
+            del self._checks[key]
+        pending.send(result)
+        return result
+
+
+_validation_caches = weakref.WeakKeyDictionary()
+
+
+@contextlib.contextmanager
+def validation_cache(context):
+    """Share custom constraint results within a block for a request context.
+
+    Nested blocks for the same context use the outermost cache.
+    """
+    if context is None or context in _validation_caches:
+        yield
+        return
+
+    _validation_caches[context] = ValidationCache()
+    try:
+        yield
+    finally:
+        _validation_caches.pop(context, None)
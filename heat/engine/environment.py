@@ -162,6 +162,7 @@ class ResourceRegistry(object):
         self._registry = {'resources': {}}
         self.global_registry = global_registry
         self.environment = env
+        self._catalogue = {}
 
     def load(self, json_snippet):
         self._load_registry([], json_snippet)
@@ -184,6 +185,7 @@ class ResourceRegistry(object):
         """place the new info in the correct location in the registry.
         path: a list of keys ['resources', 'my_server', 'OS::Nova::Server']
         """
+        self._catalogue.clear()
         descriptive_path = '/'.join(path)
         name = path[-1]
         # create the structure if needed
@@ -236,6 +238,7 @@ class ResourceRegistry(object):
         if not isinstance(info, TemplateResourceInfo):
             return
 
+        self._catalogue.clear()
         registry = self._registry
         for key in info.path[:-1]:
             registry = registry[key]
@@ -340,8 +343,23 @@ class ResourceRegistry(object):
 
         return _as_dict(self._registry)
 
+    def get_cached(self, key, build):
+        '''
+        Return the value stored under key, building it if necessary.
+
+        Values are kept until the registry next changes, so they must be
+        derived only from the registered resource types.
+        '''
+        if key not in self._catalogue:
+            self._catalogue[key] = build()
+        return self._catalogue[key]
+
     def get_types(self, support_status):
         '''Return a list of valid resource types.'''
+        return list(self.get_cached(('types', support_status),
+                                    lambda: self._get_types(support_status)))
+
+    def _get_types(self, support_status):
 
         def is_resource(key):
             return isinstance(self._registry[key], (ClassResourceInfo,
@@ -389,6 +407,7 @@ class Environment(object):
                                if k not in (env_fmt.PARAMETER_DEFAULTS,
                                             env_fmt.RESOURCE_REGISTRY))
         self.constraints = {}
+        self.constraint_plugins = None
         self.stack_lifecycle_plugins = []
 
     def load(self, env_snippet):
@@ -422,6 +441,13 @@ class Environment(object):
     def register_constraint(self, constraint_name, constraint):
         self.constraints[constraint_name] = constraint
 
+    def register_constraint_plugins(self, plugins):
+        '''Fall back to the given plugins for unregistered constraints.
+
+        The plugins are only loaded when the constraint is first requested.
+        '''
+        self.constraint_plugins = plugins
+
     def register_stack_lifecycle_plugin(self, stack_lifecycle_name,
                                         stack_lifecycle_class):
         self.stack_lifecycle_plugins.append((stack_lifecycle_name,
@@ -439,7 +465,10 @@ class Environment(object):
                                                registry_type)
 
     def get_constraint(self, name):
-        return self.constraints.get(name)
+        constraint = self.constraints.get(name)
+        if constraint is None and self.constraint_plugins is not None:
+            constraint = self.constraint_plugins.get(name)
+        return constraint
 
     def get_stack_lifecycle_plugins(self):
         return self.stack_lifecycle_plugins
@@ -11,10 +11,19 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+
+import eventlet
+from eventlet import queue
 from oslo_config import cfg
+from oslo_log import log as logging
 
+from heat.common.i18n import _LE
+from heat.common.i18n import _LW
 from heat.common import messaging
 
+LOG = logging.getLogger(__name__)
+
 SERVICE = 'orchestration'
 INFO = 'INFO'
 ERROR = 'ERROR'
@@ -26,7 +35,23 @@ notifier_opts = [
     cfg.StrOpt('default_publisher_id',
                help='Default publisher_id for outgoing notifications.'),
     cfg.MultiStrOpt('list_notifier_drivers',
-                    help='List of drivers to send notifications (DEPRECATED).')
+                    help='List of drivers to send notifications '
+                         '(DEPRECATED).'),
+    cfg.IntOpt('notification_queue_size',
+               default=1000,
+               help='Maximum number of outgoing notifications waiting to be '
+                    'sent in the background. Set to 0 to send notifications '
+                    'synchronously.'),
+    cfg.StrOpt('notification_overflow',
+               default='drop',
+               choices=['drop', 'block'],
+               help='What to do with a notification when the queue of '
+                    'outgoing notifications is full: drop it, or block '
+                    'until there is room for it.'),
+    cfg.IntOpt('notification_drain_timeout',
+               default=10,
+               help='Maximum time in seconds to wait for queued '
+                    'notifications to be sent when the engine stops.'),
 ]
 CONF = cfg.CONF
 CONF.register_opts(notifier_opts)
@@ -43,12 +68,87 @@ def get_default_level():
     return CONF.default_notification_level.upper()
 
 
-def notify(context, event_type, level, body):
-    client = messaging.get_notifier(_get_default_publisher())
+_queue = None
+_stats = collections.Counter()
+
+
+def _send(context, publisher_id, event_type, level, body):
+    client = messaging.get_notifier(publisher_id)
 
     method = getattr(client, level.lower())
     method(context, "%s.%s" % (SERVICE, event_type), body)
 
 
+def _sender(pending):
+    while True:
+        args = pending.get()
+        try:
+            _send(*args)
+        except Exception:
+            _stats['failed'] += 1
+            LOG.exception(_LE('Failed to send notification %s'), args[2])
+        else:
+            _stats['sent'] += 1
+        finally:
+            pending.task_done()
+
+
+def _get_queue():
+    global _queue
+    if _queue is None:
+        _queue = queue.Queue(CONF.notification_queue_size)
+        eventlet.spawn_n(_sender, _queue)
+    return _queue
+
+
+def get_stats():
+    """Return counts of the notifications sent, dropped and failed."""
+    stats = dict.fromkeys(('sent', 'dropped', 'failed'), 0)
+    stats.update(_stats)
+    stats['queued'] = _queue.qsize() if _queue is not None else 0
+    return stats
+
+
+def flush(timeout):
+    """Wait up to timeout seconds for the queued notifications to be sent.
+
+    Returns the number of notifications that have still not been sent.
+    """
+    if _queue is None:
+        return 0
+    with eventlet.Timeout(timeout, False):
+        _queue.join()
+    if _queue.unfinished_tasks:
+        LOG.warn(_LW('%d notifications were not sent in time'),
+                 _queue.unfinished_tasks)
+    return _queue.unfinished_tasks
+
+
+def notify(context, event_type, level, body):
+    """Send a notification, in the background if a queue is configured.
+
+    Sending in the background means that a slow message broker does not hold
+    up the state changes that notifications are sent for.
+    """
+    args = (context, _get_default_publisher(), event_type, level, body)
+    if CONF.notification_queue_size <= 0:
+        _send(*args)
+        _stats['sent'] += 1
+        return
+
+    pending = _get_queue()
+    if CONF.notification_overflow == 'block':
+        pending.put(args)
+        return
+
+    try:
+        pending.put_nowait(args)
+    except queue.Full:
+        _stats['dropped'] += 1
+        LOG.warn(_LW('Notification queue is full, dropping notification '
+                     '%(event)s (%(dropped)s dropped so far)'),
+                 {'event': event_type, 'dropped': _stats['dropped']})
+
+
 def list_opts():
     yield None, notifier_opts
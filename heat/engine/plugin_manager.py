@@ -17,6 +17,7 @@ import sys
 
 from oslo_config import cfg
 from oslo_log import log
+import pkg_resources
 import six
 
 from heat.common.i18n import _LE
@@ -114,3 +115,43 @@ class PluginMapping(object):
         mod_dicts = plugin_manager.map_to_modules(self.load_from_module)
         return itertools.chain.from_iterable(six.iteritems(d) for d
                                              in mod_dicts)
+
+
+class EntryPointPlugins(object):
+    '''The plugins registered under an entry point namespace.
+
+    Unlike a stevedore ExtensionManager, which imports every plugin and
+    verifies its requirements up front, each plugin is only loaded the first
+    time it is asked for. Plugins that fail to load are logged and treated as
+    missing.
+    '''
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self._entry_points = dict(
+            (ep.name, ep) for ep in pkg_resources.iter_entry_points(namespace))
+        self._plugins = {}
+
+    def names(self):
+        '''Return the names of all plugins not known to be unloadable.'''
+        return [name for name in self._entry_points
+                if self._plugins.get(name, True) is not None]
+
+    def get(self, name):
+        '''Return the named plugin, or None if it is not available.'''
+        if name not in self._plugins:
+            if name not in self._entry_points:
+                return None
+            self._plugins[name] = self._load(self._entry_points[name])
+        return self._plugins[name]
+
+    def _load(self, entry_point):
+        try:
+            entry_point.require()
+            return entry_point.resolve()
+        except Exception as ex:
+            LOG.error(_LE('Failed to load %(namespace)s plugin %(name)s: '
+                          '%(ex)s'), {'namespace': self.namespace,
+                                      'name': entry_point.name,
+                                      'ex': ex})
+            return None
@@ -115,6 +115,10 @@ class Resource(object):
     # Default name to use for calls to self.client()
     default_client_name = None
 
+    # Number of times to try writing the resource row when it is being
+    # modified concurrently
+    STORE_ATTEMPTS = 3
+
     def __new__(cls, name, definition, stack):
         '''Create a new Resource of the appropriate class for its type.'''
 
@@ -166,6 +170,7 @@ class Resource(object):
         self.id = None
         self.uuid = None
         self._data = {}
+        self._db_data = None
         self._rsrc_metadata = None
         self._stored_properties_data = None
         self.created_time = None
@@ -176,6 +181,7 @@ class Resource(object):
         self.replaces = None
         self.replaced_by = None
         self.current_template_id = stack.t.id
+        self._atomic_key = None
 
         resource = stack.db_resource_get(name)
         if resource:
@@ -195,11 +201,10 @@ class Resource(object):
         self.status_reason = resource.status_reason
         self.id = resource.id
         self.uuid = resource.uuid
-        try:
-            self._data = resource_data_objects.ResourceData.get_all(
-                self, resource.data)
-        except exception.NotFound:
-            self._data = {}
+        # The data rows are loaded along with the resource, but values are
+        # only decrypted when the data is first accessed
+        self._data = None
+        self._db_data = resource.data
         self._rsrc_metadata = resource.rsrc_metadata
         self._stored_properties_data = resource.properties_data
         self.created_time = resource.created_at
@@ -209,6 +214,7 @@ class Resource(object):
         self.replaces = resource.replaces
         self.replaced_by = resource.replaced_by
         self.current_template_id = resource.current_template_id
+        self._atomic_key = resource.atomic_key
 
     def reparse(self):
         self.properties = self.t.properties(self.properties_schema,
@@ -261,8 +267,7 @@ class Resource(object):
     def metadata_set(self, metadata):
         if self.id is None:
             raise exception.ResourceNotAvailable(resource_name=self.name)
-        rs = resource_objects.Resource.get_obj(self.stack.context, self.id)
-        rs.update_and_save({'rsrc_metadata': metadata})
+        self._update_stored({'rsrc_metadata': metadata})
         self._rsrc_metadata = metadata
 
     def type(self):
@@ -486,6 +491,10 @@ class Resource(object):
 
         If a prefix is supplied, the handler method handle_<PREFIX>_<ACTION>()
         is called instead.
+
+        If the task is cancelled or times out while waiting for the action to
+        complete, the handle_<ACTION>_cancel() method is called with the
+        result of the handler, if it is provided.
         '''
         handler_action = action.lower()
         check = getattr(self, 'check_%s_complete' % handler_action, None)
@@ -496,10 +505,17 @@ class Resource(object):
 
         if callable(handler):
             handler_data = handler(*args)
-            yield
-            if callable(check):
-                while not check(handler_data):
-                    yield
+            try:
+                yield
+                if callable(check):
+                    while not check(handler_data):
+                        yield
+            except (GeneratorExit, scheduler.Timeout):
+                cancel = getattr(self, 'handle_%s_cancel' % handler_action,
+                                 None)
+                if callable(cancel):
+                    cancel(handler_data)
+                raise
 
     @scheduler.wrappertask
     def _do_action(self, action, pre_func=None, resource_data=None):
@@ -899,11 +915,17 @@ class Resource(object):
         self.resource_id = inst
         if self.id is not None:
             try:
-                rs = resource_objects.Resource.get_obj(self.context, self.id)
-                rs.update_and_save({'nova_instance': self.resource_id})
+                self._update_stored({'nova_instance': self.resource_id})
+            except exception.ConcurrentTransaction:
+                raise
             except Exception as ex:
                 LOG.warn(_LW('db error %s'), ex)
 
+    def store(self):
+        '''Create the resource in the database if it is not already there.'''
+        if self.id is None:
+            self._store()
+
     def _store(self):
         '''Create the resource in the database.'''
         metadata = self.metadata_get()
@@ -927,10 +949,34 @@ class Resource(object):
             self.id = new_rs.id
             self.uuid = new_rs.uuid
             self.created_time = new_rs.created_at
+            self._atomic_key = new_rs.atomic_key
             self._rsrc_metadata = metadata
         except Exception as ex:
             LOG.error(_LE('DB error %s'), ex)
 
+    def _update_stored(self, values):
+        '''Write the given values to the resource row in the database.
+
+        The row is not read first; the atomic key is used to detect whether
+        it has been modified elsewhere since this object last wrote it, in
+        which case the current key is fetched and the write is repeated.
+        ConcurrentTransaction is raised if the write still does not succeed
+        after STORE_ATTEMPTS attempts.
+        '''
+        rs_obj = resource_objects.Resource
+        atomic_key = self._atomic_key
+        for attempt in six.moves.range(self.STORE_ATTEMPTS):
+            if attempt:
+                LOG.warn(_LW('Resource %s was modified concurrently, '
+                             'overwriting'), six.text_type(self))
+                atomic_key = rs_obj.get_obj(self.context, self.id).atomic_key
+            if rs_obj.update_by_id(self.context, self.id, dict(values),
+                                   atomic_key):
+                self._atomic_key = (atomic_key or 0) + 1
+                return
+
+        raise exception.ConcurrentTransaction(resource=six.text_type(self))
+
     def _add_event(self, action, status, reason):
         '''Add a state change event to the database.'''
         ev = event.Event(self.context, self.stack, action, status, reason,
@@ -946,8 +992,7 @@ class Resource(object):
 
         if self.id is not None:
             try:
-                rs = resource_objects.Resource.get_obj(self.context, self.id)
-                rs.update_and_save({
+                self._update_stored({
                     'action': self.action,
                     'status': self.status,
                     'status_reason': reason,
@@ -960,6 +1005,9 @@ class Resource(object):
                     'replaced_by': self.replaced_by,
                     'current_template_id': self.current_template_id,
                     'nova_instance': self.resource_id})
+            except exception.ConcurrentTransaction:
+                # The state was not saved, so the action cannot carry on
+                raise
             except Exception as ex:
                 LOG.error(_LE('DB error %s'), ex)
 
@@ -1138,9 +1186,11 @@ class Resource(object):
         '''
         if self._data is None and self.id:
             try:
-                self._data = resource_data_objects.ResourceData.get_all(self)
+                self._data = resource_data_objects.ResourceData.get_all(
+                    self, self._db_data)
             except exception.NotFound:
-                pass
+                self._data = {}
+            self._db_data = None
 
         return self._data or {}
 
@@ -1149,6 +1199,7 @@ class Resource(object):
         resource_data_objects.ResourceData.set(self, key, value, redact)
         # force fetch all resource data from the database again
         self._data = None
+        self._db_data = None
 
     def data_delete(self, key):
         '''
@@ -1163,6 +1214,7 @@ class Resource(object):
         else:
             # force fetch all resource data from the database again
             self._data = None
+            self._db_data = None
             return True
 
     def is_using_neutron(self):
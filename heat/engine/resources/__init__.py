@@ -69,7 +69,8 @@ def _load_global_environment(env):
 
 
 def _load_global_resources(env):
-    _register_constraints(env, _get_mapping('heat.constraints'))
+    env.register_constraint_plugins(
+        plugin_manager.EntryPointPlugins('heat.constraints'))
     _register_stack_lifecycle_plugins(
         env,
         _get_mapping('heat.stack_lifecycle_plugins'))
@@ -30,6 +30,7 @@ from heat.engine import properties
 from heat.engine import resource
 from heat.engine.resources.openstack.heat import instance_group as instgrp
 from heat.engine import rsrc_defn
+from heat.engine import scheduler
 from heat.engine import support
 from heat.scaling import cooldown
 
@@ -282,21 +283,30 @@ class AutoScalingGroup(instgrp.InstanceGroup, cooldown.CooldownMixin):
 
         self.properties = json_snippet.properties(self.properties_schema,
                                                   self.context)
-        if prop_diff:
-            # Replace instances first if launch configuration has changed
-            self._try_rolling_update(prop_diff)
+        updater = scheduler.TaskRunner(self._update_group, prop_diff)
+        updater.start()
+        return updater
 
+    def _update_size(self):
         if self.properties[self.DESIRED_CAPACITY] is not None:
-            self.adjust(self.properties[self.DESIRED_CAPACITY],
-                        adjustment_type=EXACT_CAPACITY)
+            return self._adjust(self.properties[self.DESIRED_CAPACITY],
+                                adjustment_type=EXACT_CAPACITY)
         else:
             current_capacity = grouputils.get_size(self)
-            self.adjust(current_capacity, adjustment_type=EXACT_CAPACITY)
+            return self._adjust(current_capacity,
+                                adjustment_type=EXACT_CAPACITY)
 
     def adjust(self, adjustment, adjustment_type=CHANGE_IN_CAPACITY):
         """
         Adjust the size of the scaling group if the cooldown permits.
         """
+        adjuster = scheduler.TaskRunner(self._adjust, adjustment,
+                                        adjustment_type=adjustment_type)
+        adjuster(timeout=self.stack.timeout_secs())
+
+    @scheduler.wrappertask
+    def _adjust(self, adjustment, adjustment_type=CHANGE_IN_CAPACITY):
+        """Return a task to adjust the size of the scaling group."""
         if self._cooldown_inprogress():
             LOG.info(_LI("%(name)s NOT performing scaling adjustment, "
                          "cooldown %(cooldown)s"),
@@ -324,7 +334,7 @@ class AutoScalingGroup(instgrp.InstanceGroup, cooldown.CooldownMixin):
         }
         notification.send(**notif)
         try:
-            self.resize(new_capacity)
+            yield self._resize(new_capacity)
         except Exception as resize_ex:
             with excutils.save_and_reraise_exception():
                 try:
@@ -128,7 +128,8 @@ class Volume(resource.Resource):
         return vol.id
 
     def check_create_complete(self, vol_id):
-        vol = self.client().volumes.get(vol_id)
+        vol = self.client_plugin().poll_volume(vol_id,
+                                               self._volume_creating_status)
 
         if vol.status == 'available':
             return True
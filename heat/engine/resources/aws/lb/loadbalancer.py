@@ -14,6 +14,7 @@ import os
 
 from oslo_config import cfg
 from oslo_log import log as logging
+from oslo_serialization import jsonutils
 import six
 
 from heat.common import exception
@@ -484,9 +485,7 @@ backend servers
 
         servers = []
         n = 1
-        nova_cp = self.client_plugin('nova')
-        for i in instances or []:
-            ip = nova_cp.server_to_ipaddress(i) or '0.0.0.0'
+        for ip in self._instance_addresses(instances or []):
             LOG.debug('haproxy server:%s' % ip)
             servers.append('%sserver server%d %s:%s%s' % (spaces, n,
                                                           ip, inst_port,
@@ -494,6 +493,31 @@ backend servers
             n = n + 1
         return '\n'.join(servers)
 
+    def _instance_addresses(self, instances):
+        '''
+        Return the IP address of each of the given instances.
+
+        Known addresses are kept as a single entry in the resource data, so
+        that a change in membership only looks up the instances which were
+        added, and the entry is written at most once per reload.
+        '''
+        stored = self.data().get('instance_addresses')
+        known = jsonutils.loads(stored) if stored else {}
+        nova_cp = self.client_plugin('nova')
+        current = {}
+        addresses = []
+        for inst in instances:
+            ip = known.get(inst)
+            if ip is None:
+                ip = nova_cp.server_to_ipaddress(inst)
+            if ip is not None:
+                current[inst] = ip
+            addresses.append(ip or '0.0.0.0')
+
+        if current != known and self.id is not None:
+            self.data_set('instance_addresses', jsonutils.dumps(current))
+        return addresses
+
     def _haproxy_config(self, instances):
         # initial simplifications:
         # - only one Listener
@@ -570,11 +594,14 @@ backend servers
                  new_props[self.INSTANCES] is not None)):
             cfg = self._haproxy_config(prop_diff[self.INSTANCES])
 
-            md = self.nested()['LB_instance'].metadata_get()
+            lb_instance = self.nested()['LB_instance']
+            md = lb_instance.metadata_get()
             files = md['AWS::CloudFormation::Init']['config']['files']
+            if files['/etc/haproxy/haproxy.cfg'].get('content') == cfg:
+                return
             files['/etc/haproxy/haproxy.cfg']['content'] = cfg
 
-            self.nested()['LB_instance'].metadata_set(md)
+            lb_instance.metadata_set(md)
 
     def check_update_complete(self, updater):
         """Because we are not calling update_with_template, return True."""
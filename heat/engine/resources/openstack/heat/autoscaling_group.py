@@ -134,9 +134,9 @@ class AutoScalingResourceGroup(aws_asg.AutoScalingGroup):
     def _try_rolling_update(self, prop_diff):
         if self.RESOURCE in prop_diff:
             policy = self.properties[self.ROLLING_UPDATES]
-            self._replace(policy[self.MIN_IN_SERVICE],
-                          policy[self.MAX_BATCH_SIZE],
-                          policy[self.PAUSE_TIME])
+            return self._replace(policy[self.MIN_IN_SERVICE],
+                                 policy[self.MAX_BATCH_SIZE],
+                                 policy[self.PAUSE_TIME])
 
     def _create_template(self, num_instances, num_replace=0,
                          template_version=('heat_template_version',
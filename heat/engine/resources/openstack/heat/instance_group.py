@@ -198,17 +198,38 @@ class InstanceGroup(stack_resource.StackResource):
 
         self.properties = json_snippet.properties(self.properties_schema,
                                                   self.context)
+        updater = scheduler.TaskRunner(self._update_group, prop_diff)
+        updater.start()
+        return updater
+
+    def handle_update_cancel(self, updater):
+        if isinstance(updater, scheduler.TaskRunner):
+            updater.cancel()
+        else:
+            super(InstanceGroup, self).handle_update_cancel(updater)
+
+    @scheduler.wrappertask
+    def _update_group(self, prop_diff):
+        """
+        Update the group's instances, as a task that is stepped along with
+        the rest of the stack by check_update_complete().
+        """
         if prop_diff:
             # Replace instances first if launch configuration has changed
-            self._try_rolling_update(prop_diff)
+            replacer = self._try_rolling_update(prop_diff)
+            if replacer is not None:
+                yield replacer
+
+        yield self._update_size()
 
+    def _update_size(self):
         # Get the current capacity, we may need to adjust if
         # Size has changed
         if self.properties[self.SIZE] is not None:
-            self.resize(self.properties[self.SIZE])
+            return self._resize(self.properties[self.SIZE])
         else:
             curr_size = grouputils.get_size(self)
-            self.resize(curr_size)
+            return self._resize(curr_size)
 
     def _tags(self):
         """
@@ -277,10 +298,11 @@ class InstanceGroup(stack_resource.StackResource):
                 self.LAUNCH_CONFIGURATION_NAME in prop_diff):
             policy = self.update_policy[self.ROLLING_UPDATE]
             pause_sec = iso8601utils.parse_isoduration(policy[self.PAUSE_TIME])
-            self._replace(policy[self.MIN_INSTANCES_IN_SERVICE],
-                          policy[self.MAX_BATCH_SIZE],
-                          pause_sec)
+            return self._replace(policy[self.MIN_INSTANCES_IN_SERVICE],
+                                 policy[self.MAX_BATCH_SIZE],
+                                 pause_sec)
 
+    @scheduler.wrappertask
     def _replace(self, min_in_service, batch_size, pause_sec):
         """
         Replace the instances in the group using updated launch configuration
@@ -324,30 +346,40 @@ class InstanceGroup(stack_resource.StackResource):
                 updater = self.update_with_template(template)
                 checker = scheduler.TaskRunner(self._check_for_completion,
                                                updater)
-                checker(timeout=update_timeout)
+                yield checker.as_task(timeout=update_timeout)
                 remainder -= efft_bat_sz
                 if ((remainder > 0 or efft_capacity > capacity) and
                         pause_sec > 0):
                     self._lb_reload()
                     waiter = scheduler.TaskRunner(pause_between_batch)
-                    waiter(timeout=pause_sec)
+                    yield waiter.as_task(timeout=pause_sec)
         finally:
             self._lb_reload()
 
     def _check_for_completion(self, updater):
-        while not self.check_update_complete(updater):
-            yield
+        try:
+            while not self.check_update_complete(updater):
+                yield
+        except (GeneratorExit, scheduler.Timeout):
+            # Stop the nested stack update along with the batch
+            self.handle_update_cancel(updater)
+            raise
 
     def resize(self, new_capacity):
         """Resize the instance group to the new capacity.
 
         When shrinking, the oldest instances will be removed.
         """
+        resizer = scheduler.TaskRunner(self._resize, new_capacity)
+        resizer(timeout=self.stack.timeout_secs())
+
+    @scheduler.wrappertask
+    def _resize(self, new_capacity):
+        """Return a task to resize the instance group."""
         new_template = self._create_template(new_capacity)
         try:
             updater = self.update_with_template(new_template)
-            checker = scheduler.TaskRunner(self._check_for_completion, updater)
-            checker(timeout=self.stack.timeout_secs())
+            yield self._check_for_completion(updater)
         finally:
             # Reload the LB in any case, so it's only pointing at healthy
             # nodes.
@@ -19,6 +19,7 @@ from heat.engine import properties
 from heat.engine import resource
 from heat.engine.resources.openstack.neutron import neutron
 from heat.engine import support
+from heat.scaling import lbutils
 
 
 class HealthMonitor(neutron.NeutronResource):
@@ -694,11 +695,11 @@ class LoadBalancer(resource.Resource):
         if (self.MEMBERS in prop_diff and
                 (self.properties[self.MEMBERS] is not None or
                  new_props[self.MEMBERS] is not None)):
-            members = set(new_props[self.MEMBERS] or [])
             rd_members = self.data()
-            old_members = set(rd_members.keys())
+            added, removed = lbutils.members_delta(rd_members.keys(),
+                                                   new_props[self.MEMBERS])
             client = self.neutron()
-            for member in old_members - members:
+            for member in removed:
                 member_id = rd_members[member]
                 try:
                     client.delete_member(member_id)
@@ -707,7 +708,7 @@ class LoadBalancer(resource.Resource):
                 self.data_delete(member)
             pool = self.properties[self.POOL_ID]
             protocol_port = self.properties[self.PROTOCOL_PORT]
-            for member in members - old_members:
+            for member in added:
                 address = self.client_plugin('nova').server_to_ipaddress(
                     member)
                 lb_member = client.create_member({
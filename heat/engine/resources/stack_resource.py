@@ -13,9 +13,11 @@
 
 import hashlib
 
+import eventlet
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
+from oslo_utils import excutils
 import six
 
 from heat.common import exception
@@ -28,13 +30,70 @@ from heat.engine import environment
 from heat.engine import resource
 from heat.engine import scheduler
 from heat.engine import stack as parser
+from heat.engine import stack_lock
 from heat.engine import template
+from heat.objects import raw_template
+from heat.objects import stack as stack_object
 
 cfg.CONF.import_opt('error_wait_time', 'heat.common.config')
+cfg.CONF.import_opt('distribute_nested_stacks', 'heat.common.config')
 
 LOG = logging.getLogger(__name__)
 
 
+class RemoteStackAction(object):
+    '''
+    Tracks an action on a nested stack that is running in another engine.
+
+    This stands in for the TaskRunner of a local action. Each step polls the
+    stored state of the nested stack, and once the action has finished the
+    nested stack is reloaded so that its final state can be checked. If the
+    engine running the action stops while it is in progress, the action is
+    treated as failed.
+    '''
+
+    def __init__(self, stack_resource, action):
+        self.stack_resource = stack_resource
+        self.action = action
+
+    def __repr__(self):
+        return 'Remote %s of %s' % (self.action, self.stack_resource.name)
+
+    def step(self):
+        '''Return True if the action has finished.'''
+        res = self.stack_resource
+        s = stack_object.Stack.get_by_id(res.context, res.resource_id)
+        if s is None:
+            raise exception.NotFound(_("Nested stack not found in DB"))
+        if (s.action, s.status) == (self.action, parser.Stack.IN_PROGRESS):
+            if stack_lock.StackLock.is_held(s.id):
+                return False
+            # The lock is released just after the action finishes, so check
+            # the state again before deciding that the engine went away
+            s = stack_object.Stack.get_by_id(res.context, res.resource_id)
+            if (s.action, s.status) == (self.action,
+                                        parser.Stack.IN_PROGRESS):
+                raise exception.Error(_("The engine running the %s of the "
+                                        "nested stack stopped") % self.action)
+
+        res.nested(force_reload=True)
+        return True
+
+    def cancel(self):
+        '''Stop the action in the engine that is running it.'''
+        res = self.stack_resource
+        try:
+            res.rpc_client().stop_nested_stack_action(
+                res.context, dict(res.nested().identifier()))
+        except Exception as ex:
+            LOG.warn(_LW("Failed to stop %(action)s: %(ex)s"),
+                     {'action': self, 'ex': six.text_type(ex)})
+
+    def run_to_completion(self, wait_time=1):
+        while not self.step():
+            eventlet.sleep(wait_time)
+
+
 class StackResource(resource.Resource):
     '''
     An abstract Resource subclass that allows the management of an entire Stack
@@ -94,14 +153,24 @@ class StackResource(resource.Resource):
             self._nested = None
 
         if self._nested is None and self.resource_id is not None:
-            self._nested = parser.Stack.load(self.context,
-                                             self.resource_id,
-                                             parent_resource=self.name,
-                                             show_deleted=show_deleted,
-                                             force_reload=force_reload)
+            cache = self.stack.stack_cache
+            if not force_reload:
+                self._nested = cache.get(self.resource_id)
 
             if self._nested is None:
-                raise exception.NotFound(_("Nested stack not found in DB"))
+                # Fetch the rows of all the sibling nested stacks at once,
+                # they are likely to be needed during the same operation
+                cache.prefetch_children(self.context, self.stack.id)
+                self._nested = parser.Stack.load(self.context,
+                                                 self.resource_id,
+                                                 parent_resource=self.name,
+                                                 show_deleted=show_deleted,
+                                                 force_reload=force_reload,
+                                                 cache=cache)
+
+                if self._nested is None:
+                    raise exception.NotFound(
+                        _("Nested stack not found in DB"))
 
         return self._nested
 
@@ -196,7 +265,8 @@ class StackResource(resource.Resource):
                               user_creds_id=self.stack.user_creds_id,
                               stack_user_project_id=stack_user_project_id,
                               adopt_stack_data=adopt_data,
-                              nested_depth=new_nested_depth)
+                              nested_depth=new_nested_depth,
+                              cache=self.stack.stack_cache)
         return nested
 
     def _validate_nested_resources(self, templ):
@@ -227,6 +297,8 @@ class StackResource(resource.Resource):
         if adopt_data:
             action = self._nested.ADOPT
             error_wait_time = None
+        elif cfg.CONF.distribute_nested_stacks:
+            return self._dispatch_nested(action)
 
         stack_creator = scheduler.TaskRunner(self._nested.stack_task,
                                              action=action,
@@ -245,6 +317,10 @@ class StackResource(resource.Resource):
 
         return done
 
+    def handle_create_cancel(self, stack_creator):
+        if isinstance(stack_creator, RemoteStackAction):
+            stack_creator.cancel()
+
     def check_adopt_complete(self, stack_creator):
         if stack_creator is None:
             return True
@@ -277,12 +353,34 @@ class StackResource(resource.Resource):
         stack = self._parse_nested_stack(name, child_template, user_params,
                                          timeout_mins)
         stack.validate()
+        if cfg.CONF.distribute_nested_stacks:
+            template_id = stack.t.store(self.context)
+            try:
+                return self._dispatch_nested(nested_stack.UPDATE,
+                                             template_id=template_id,
+                                             timeout_mins=stack.timeout_mins)
+            except Exception:
+                with excutils.save_and_reraise_exception():
+                    raw_template.RawTemplate.delete(self.context,
+                                                    template_id)
+
         stack.parameters.set_stack_id(nested_stack.identifier())
         nested_stack.updated_time = self.updated_time
         updater = scheduler.TaskRunner(nested_stack.update_task, stack)
         updater.start()
         return updater
 
+    def _dispatch_nested(self, action, template_id=None, timeout_mins=None):
+        '''
+        Start an action on the stored nested stack in any engine.
+
+        Returns a RemoteStackAction to be stepped in place of a TaskRunner.
+        '''
+        self.rpc_client().nested_stack_action(
+            self.context, dict(self.nested().identifier()), action,
+            self.name, template_id=template_id, timeout_mins=timeout_mins)
+        return RemoteStackAction(self, action)
+
     def check_update_complete(self, updater):
         if updater is not None:
             if not updater.step():
@@ -295,6 +393,10 @@ class StackResource(resource.Resource):
                                   nested_stack.status_reason)
         return True
 
+    def handle_update_cancel(self, updater):
+        if isinstance(updater, RemoteStackAction):
+            updater.cancel()
+
     def delete_nested(self):
         '''
         Delete the nested stack.
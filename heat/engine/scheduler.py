@@ -236,6 +236,22 @@ class TaskRunner(object):
         while not self.step():
             self._sleep(wait_time)
 
+    def as_task(self, timeout=None):
+        """
+        Return a task that starts and drives the TaskRunner.
+
+        This allows a task to be run with its own timeout as a subtask of a
+        wrappertask. If the parent task is interrupted, the task is cancelled.
+        """
+        self.start(timeout=timeout)
+        while not self.done():
+            try:
+                yield
+            except:  # noqa
+                self.cancel()
+                raise
+            self.step()
+
     def cancel(self, grace_period=None):
         """Cancel the task and mark it as done."""
         if self.done():
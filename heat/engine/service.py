@@ -12,6 +12,7 @@
 #    under the License.
 
 import collections
+import inspect
 import os
 import socket
 import warnings
@@ -21,6 +22,7 @@ from oslo_config import cfg
 from oslo_log import log as logging
 import oslo_messaging as messaging
 from oslo_serialization import jsonutils
+from oslo_utils import timeutils
 from oslo_utils import uuidutils
 from osprofiler import profiler
 import six
@@ -28,6 +30,7 @@ import webob
 
 from heat.common import context
 from heat.common import exception
+from heat.common import hash_ring
 from heat.common.i18n import _
 from heat.common.i18n import _LE
 from heat.common.i18n import _LI
@@ -41,6 +44,7 @@ from heat.engine import attributes
 from heat.engine import clients
 from heat.engine import environment
 from heat.engine import event as evt
+from heat.engine import notification
 from heat.engine import parameter_groups
 from heat.engine import properties
 from heat.engine import resources
@@ -67,6 +71,8 @@ cfg.CONF.import_opt('max_stacks_per_tenant', 'heat.common.config')
 cfg.CONF.import_opt('enable_stack_abandon', 'heat.common.config')
 cfg.CONF.import_opt('enable_stack_adopt', 'heat.common.config')
 cfg.CONF.import_opt('convergence_engine', 'heat.common.config')
+cfg.CONF.import_opt('num_engine_workers', 'heat.common.config')
+cfg.CONF.import_opt('partition_stacks', 'heat.common.config')
 
 LOG = logging.getLogger(__name__)
 
@@ -219,13 +225,14 @@ class EngineListener(service.Service):
     engines to communicate with each other for multi-engine support.
     '''
 
-    ACTIONS = (STOP_STACK, SEND) = ('stop_stack', 'send')
+    ACTIONS = (STOP_STACK, SEND, FORWARD) = ('stop_stack', 'send', 'forward')
 
-    def __init__(self, host, engine_id, thread_group_mgr):
+    def __init__(self, host, engine_id, thread_group_mgr, engine=None):
         super(EngineListener, self).__init__()
         self.thread_group_mgr = thread_group_mgr
         self.engine_id = engine_id
         self.host = host
+        self.engine = engine
 
     def start(self):
         super(EngineListener, self).start()
@@ -251,6 +258,38 @@ class EngineListener(service.Service):
         stack_id = stack_identity['stack_id']
         self.thread_group_mgr.send(stack_id, message)
 
+    @context.request_context
+    def forward(self, ctxt, method, kwargs):
+        '''
+        Run an action on a stack owned by this engine, on behalf of the
+        engine that received the request.
+        '''
+        handler = getattr(self.engine, method).owner_handler
+        return handler(self.engine, ctxt, **kwargs)
+
+
+def route_to_owner(func):
+    '''
+    Decorator for actions on an existing stack that forwards them to the
+    engine worker owning the stack when stacks are partitioned.
+
+    The undecorated method is kept as owner_handler, which is what the owner
+    runs, so a request is only ever forwarded once.
+    '''
+    @six.wraps(func)
+    def wrapped(self, cnxt, stack_identity, *args, **kwargs):
+        owner = self._stack_owner(stack_identity)
+        if owner is None:
+            return func(self, cnxt, stack_identity, *args, **kwargs)
+
+        call_args = inspect.getcallargs(func, self, cnxt, stack_identity,
+                                        *args, **kwargs)
+        del call_args['self'], call_args['cnxt']
+        return self._forward_to_owner(cnxt, owner, func.__name__, call_args)
+
+    wrapped.owner_handler = func
+    return wrapped
+
 
 @profiler.trace_cls("rpc")
 class EngineService(service.Service):
@@ -264,7 +303,7 @@ class EngineService(service.Service):
     by the RPC caller.
     """
 
-    RPC_API_VERSION = '1.6'
+    RPC_API_VERSION = '1.8'
 
     def __init__(self, host, topic, manager=None):
         super(EngineService, self).__init__()
@@ -284,6 +323,7 @@ class EngineService(service.Service):
         self.target = None
         self.service_id = None
         self.manage_thread_grp = None
+        self.engine_ring = None
         self._rpc_server = None
         self.software_config = service_software_config.SoftwareConfigService()
 
@@ -321,7 +361,7 @@ class EngineService(service.Service):
         self.engine_id = stack_lock.StackLock.generate_engine_id()
         self.thread_group_mgr = ThreadGroupManager()
         self.listener = EngineListener(self.host, self.engine_id,
-                                       self.thread_group_mgr)
+                                       self.thread_group_mgr, engine=self)
         LOG.debug("Starting listener for engine %s" % self.engine_id)
         self.listener.start()
 
@@ -349,6 +389,9 @@ class EngineService(service.Service):
         self.manage_thread_grp = threadgroup.ThreadGroup()
         self.manage_thread_grp.add_timer(cfg.CONF.periodic_interval,
                                          self.service_manage_report)
+        self.manage_thread_grp.add_timer(
+            stack_lock.StackLock.renew_interval(),
+            stack_lock.StackLock.renew_all, None, self.engine_id)
 
         super(EngineService, self).start()
 
@@ -382,6 +425,9 @@ class EngineService(service.Service):
             self.thread_group_mgr.stop(stack_id, True)
             LOG.info(_LI("Stack %s processing was finished"), stack_id)
 
+        # Send the notifications queued by the stacks that just finished
+        notification.flush(cfg.CONF.notification_drain_timeout)
+
         self.manage_thread_grp.stop()
         ctxt = context.get_admin_context()
         service_objects.Service.delete(ctxt, self.service_id)
@@ -417,14 +463,16 @@ class EngineService(service.Service):
         else:
             raise exception.StackNotFound(stack_name=stack_name)
 
-    def _get_stack(self, cnxt, stack_identity, show_deleted=False):
+    def _get_stack(self, cnxt, stack_identity, show_deleted=False,
+                   use_slave=False):
         identity = identifier.HeatIdentifier(**stack_identity)
 
         s = stack_object.Stack.get_by_id(
             cnxt,
             identity.stack_id,
             show_deleted=show_deleted,
-            eager_load=True)
+            eager_load=True,
+            use_slave=use_slave)
 
         if s is None:
             raise exception.StackNotFound(stack_name=identity.stack_name)
@@ -449,10 +497,11 @@ class EngineService(service.Service):
             to show all
         """
         if stack_identity is not None:
-            db_stack = self._get_stack(cnxt, stack_identity, show_deleted=True)
-            stacks = [parser.Stack.load(cnxt, stack=db_stack)]
+            db_stack = self._get_stack(cnxt, stack_identity, show_deleted=True,
+                                       use_slave=True)
+            stacks = [parser.Stack.load(cnxt, stack=db_stack, use_slave=True)]
         else:
-            stacks = parser.Stack.load_all(cnxt)
+            stacks = parser.Stack.load_all(cnxt, use_slave=True)
 
         return [api.format_stack(stack) for stack in stacks]
 
@@ -482,7 +531,8 @@ class EngineService(service.Service):
         stacks = parser.Stack.load_all(cnxt, limit, marker, sort_keys,
                                        sort_dir, filters, tenant_safe,
                                        show_deleted, resolve_data=False,
-                                       show_nested=show_nested)
+                                       show_nested=show_nested,
+                                       use_slave=True)
         return [api.format_stack(stack) for stack in stacks]
 
     @context.request_context
@@ -502,7 +552,8 @@ class EngineService(service.Service):
             filters=filters,
             tenant_safe=tenant_safe,
             show_deleted=show_deleted,
-            show_nested=show_nested)
+            show_nested=show_nested,
+            use_slave=True)
 
     def _validate_deferred_auth_context(self, cnxt, stack):
         if cfg.CONF.deferred_auth_method != 'password':
@@ -653,7 +704,7 @@ class EngineService(service.Service):
                 LOG.info(_LI("Stack create failed, status %s"), stack.status)
 
         convergence = cfg.CONF.convergence_engine
-        if convergence:
+        if convergence and args.get(rpc_api.PARAM_ADOPT_STACK_DATA):
             raise exception.NotSupported(feature=_('Convergence engine'))
 
         stack = self._parse_template_and_validate_stack(
@@ -662,12 +713,19 @@ class EngineService(service.Service):
 
         stack.store()
 
-        self.thread_group_mgr.start_with_lock(cnxt, stack, self.engine_id,
-                                              _stack_create, stack)
+        if convergence:
+            self.thread_group_mgr.start_with_lock(cnxt, stack,
+                                                  self.engine_id,
+                                                  stack.converge_stack)
+        else:
+            self.thread_group_mgr.start_with_lock(cnxt, stack,
+                                                  self.engine_id,
+                                                  _stack_create, stack)
 
         return dict(stack.identifier())
 
     @context.request_context
+    @route_to_owner
     def update_stack(self, cnxt, stack_identity, template, params,
                      files, args):
         """
@@ -734,6 +792,7 @@ class EngineService(service.Service):
         return dict(current_stack.identifier())
 
     @context.request_context
+    @route_to_owner
     def stack_cancel_update(self, cnxt, stack_identity):
         """Cancel currently running stack update.
 
@@ -869,6 +928,7 @@ class EngineService(service.Service):
             return False
 
     @context.request_context
+    @route_to_owner
     def delete_stack(self, cnxt, stack_identity):
         """
         The delete_stack method deletes a given stack.
@@ -921,6 +981,7 @@ class EngineService(service.Service):
         return None
 
     @context.request_context
+    @route_to_owner
     def abandon_stack(self, cnxt, stack_identity):
         """
         The abandon_stack method abandons a given stack.
@@ -958,8 +1019,15 @@ class EngineService(service.Service):
         :param cnxt: RPC context.
         :param type_name: Name of the resource type to obtain the schema of.
         """
+        env = resources.global_env()
+        return env.registry.get_cached(
+            ('schema', type_name),
+            lambda: self._resource_schema(env, type_name))
+
+    @staticmethod
+    def _resource_schema(env, type_name):
         try:
-            resource_class = resources.global_env().get_class(type_name)
+            resource_class = env.get_class(type_name)
         except exception.StackValidationFailed:
             raise exception.ResourceTypeNotFound(type_name=type_name)
         except exception.NotFound as ex:
@@ -989,9 +1057,12 @@ class EngineService(service.Service):
         :param cnxt: RPC context.
         :param type_name: Name of the resource type to generate a template for.
         """
+        env = resources.global_env()
         try:
-            return resources.global_env().get_class(
-                type_name).resource_to_template(type_name)
+            return env.registry.get_cached(
+                ('template', type_name),
+                lambda: env.get_class(type_name).resource_to_template(
+                    type_name))
         except exception.StackValidationFailed:
             raise exception.ResourceTypeNotFound(type_name=type_name)
         except exception.NotFound as ex:
@@ -1016,7 +1087,8 @@ class EngineService(service.Service):
         """
 
         if stack_identity is not None:
-            st = self._get_stack(cnxt, stack_identity, show_deleted=True)
+            st = self._get_stack(cnxt, stack_identity, show_deleted=True,
+                                 use_slave=True)
 
             events = event_object.Event.get_all_by_stack(
                 cnxt,
@@ -1025,14 +1097,16 @@ class EngineService(service.Service):
                 marker=marker,
                 sort_keys=sort_keys,
                 sort_dir=sort_dir,
-                filters=filters)
+                filters=filters,
+                use_slave=True)
         else:
             events = event_object.Event.get_all_by_tenant(
                 cnxt, limit=limit,
                 marker=marker,
                 sort_keys=sort_keys,
                 sort_dir=sort_dir,
-                filters=filters)
+                filters=filters,
+                use_slave=True)
 
         stacks = {}
 
@@ -1080,8 +1154,8 @@ class EngineService(service.Service):
     @context.request_context
     def describe_stack_resource(self, cnxt, stack_identity, resource_name,
                                 with_attr=None):
-        s = self._get_stack(cnxt, stack_identity)
-        stack = parser.Stack.load(cnxt, stack=s)
+        s = self._get_stack(cnxt, stack_identity, use_slave=True)
+        stack = parser.Stack.load(cnxt, stack=s, use_slave=True)
 
         if cfg.CONF.heat_stack_user_role in cnxt.roles:
             if not self._authorize_stack_user(cnxt, stack, resource_name):
@@ -1096,6 +1170,7 @@ class EngineService(service.Service):
                                          with_attr=with_attr)
 
     @context.request_context
+    @route_to_owner
     def resource_signal(self, cnxt, stack_identity, resource_name, details,
                         sync_call=False):
         '''
@@ -1176,6 +1251,7 @@ class EngineService(service.Service):
                 for resource in stack.iter_resources(depth)]
 
     @context.request_context
+    @route_to_owner
     def stack_suspend(self, cnxt, stack_identity):
         '''
         Handle request to perform suspend action on a stack
@@ -1191,6 +1267,7 @@ class EngineService(service.Service):
                                               _stack_suspend, stack)
 
     @context.request_context
+    @route_to_owner
     def stack_resume(self, cnxt, stack_identity):
         '''
         Handle request to perform a resume action on a stack
@@ -1206,6 +1283,7 @@ class EngineService(service.Service):
                                               _stack_resume, stack)
 
     @context.request_context
+    @route_to_owner
     def stack_snapshot(self, cnxt, stack_identity, name):
         def _stack_snapshot(stack, snapshot):
             LOG.debug("snapshotting stack %s" % stack.name)
@@ -1257,6 +1335,7 @@ class EngineService(service.Service):
             stack.id, _delete_snapshot, stack, snapshot)
 
     @context.request_context
+    @route_to_owner
     def stack_check(self, cnxt, stack_identity):
         '''
         Handle request to perform a check action on a stack
@@ -1269,6 +1348,101 @@ class EngineService(service.Service):
                                               stack.check)
 
     @context.request_context
+    @route_to_owner
+    def nested_stack_action(self, cnxt, stack_identity, action,
+                            parent_resource_name, template_id=None,
+                            timeout_mins=None):
+        '''
+        Start a create or update of a stored nested stack in this engine.
+
+        The stack is marked IN_PROGRESS before returning, so that the parent
+        resource can poll the stored state to find out when it is finished.
+
+        :param cnxt: RPC context.
+        :param stack_identity: Identity of the nested stack.
+        :param action: The action to perform, CREATE or UPDATE.
+        :param parent_resource_name: Name of the resource owning the stack.
+        :param template_id: ID of the stored template to update to.
+        :param timeout_mins: Timeout of the update, in minutes. The current
+            timeout of the stack is kept if it is not given.
+        '''
+        s = self._get_stack(cnxt, stack_identity)
+        stack = parser.Stack.load(cnxt, stack=s,
+                                  parent_resource=parent_resource_name)
+
+        if action == stack.CREATE:
+            args = ()
+            func = stack.create
+        elif action == stack.UPDATE:
+            tmpl = templatem.Template.load(cnxt, template_id)
+            if timeout_mins is None:
+                timeout_mins = stack.timeout_mins
+            new_stack = parser.Stack(
+                cnxt, stack.name, tmpl,
+                timeout_mins=timeout_mins,
+                disable_rollback=True,
+                parent_resource=parent_resource_name,
+                owner_id=stack.owner_id,
+                user_creds_id=stack.user_creds_id,
+                stack_user_project_id=stack.stack_user_project_id,
+                nested_depth=stack.nested_depth)
+            new_stack.parameters.set_stack_id(stack.identifier())
+            args = (new_stack,)
+            func = stack.update
+        else:
+            raise ValueError(_("Invalid action %s") % action)
+
+        LOG.info(_LI("Starting %(action)s of nested stack %(name)s"),
+                 {'action': action, 'name': stack.name})
+        lock = stack_lock.StackLock(cnxt, stack, self.engine_id)
+        with lock.thread_lock(stack.id):
+            stack_object.Stack.update_by_id(
+                cnxt, stack.id,
+                {'action': action,
+                 'status': stack.IN_PROGRESS,
+                 'status_reason': 'Stack %s dispatched' % action})
+            self.thread_group_mgr.start_with_acquired_lock(stack, lock,
+                                                           func, *args)
+
+    @context.request_context
+    @route_to_owner
+    def stop_nested_stack_action(self, cnxt, stack_identity):
+        '''
+        Stop an action started by nested_stack_action() in any engine.
+
+        The nested stack is marked FAILED if the action was still running.
+
+        :param cnxt: RPC context.
+        :param stack_identity: Identity of the nested stack.
+        '''
+        s = self._get_stack(cnxt, stack_identity)
+        stack = parser.Stack.load(cnxt, stack=s)
+
+        lock = stack_lock.StackLock(cnxt, stack, self.engine_id)
+        acquire_result = lock.try_acquire()
+        if acquire_result is None:
+            lock.release(stack.id)
+        elif acquire_result == self.engine_id:
+            self.thread_group_mgr.stop(stack.id)
+        elif stack_lock.StackLock.engine_alive(cnxt, acquire_result):
+            stop_result = self._remote_call(
+                cnxt, acquire_result, self.listener.STOP_STACK,
+                stack_identity=stack_identity)
+            if stop_result is not None:
+                raise exception.StopActionFailed(stack_name=stack.name,
+                                                 engine_id=acquire_result)
+
+        s = self._get_stack(cnxt, stack_identity)
+        if s.status == stack.IN_PROGRESS:
+            LOG.info(_LI("Stopped %(action)s of nested stack %(name)s"),
+                     {'action': s.action, 'name': stack.name})
+            stack_object.Stack.update_by_id(
+                cnxt, stack.id,
+                {'status': stack.FAILED,
+                 'status_reason': 'Stack %s cancelled' % s.action})
+
+    @context.request_context
+    @route_to_owner
     def stack_restore(self, cnxt, stack_identity, snapshot_id):
         def _stack_restore(stack, snapshot):
             LOG.debug("restoring stack %s" % stack.name)
@@ -1289,6 +1463,7 @@ class EngineService(service.Service):
         return [api.format_snapshot(snapshot) for snapshot in data]
 
     @context.request_context
+    @route_to_owner
     def metadata_update(self, cnxt, stack_identity,
                         resource_name, metadata):
         """
@@ -1523,7 +1698,14 @@ class EngineService(service.Service):
                 self.host,
                 self.binary,
                 self.hostname)
-            if len(service_refs) == 1:
+            if cfg.CONF.partition_stacks and cfg.CONF.num_engine_workers > 1:
+                # Stacks are partitioned over the records of the live
+                # workers, so every worker process keeps a record of its own
+                # and only takes over one left behind by a worker that has
+                # stopped reporting
+                service_refs = [ref for ref in service_refs
+                                if not self._service_alive(ref)]
+            if service_refs:
                 # Service was aborted or stopped
                 service_ref = service_refs[0]
 
@@ -1538,7 +1720,7 @@ class EngineService(service.Service):
                          report_interval=cfg.CONF.periodic_interval))
                 self.service_id = service_ref['id']
                 LOG.info(_LI('Service %s is restarted'), self.service_id)
-            elif len(service_refs) == 0:
+            else:
                 # Service is started now
                 service_ref = service_objects.Service.create(
                     cnxt,
@@ -1551,3 +1733,49 @@ class EngineService(service.Service):
                 )
                 self.service_id = service_ref['id']
                 LOG.info(_LI('Service %s is started'), self.service_id)
+
+        if cfg.CONF.partition_stacks:
+            self._update_engine_ring(cnxt)
+
+        LOG.debug("Notifications sent: %(sent)s, queued: %(queued)s, "
+                  "dropped: %(dropped)s, failed: %(failed)s" %
+                  notification.get_stats())
+
+    @staticmethod
+    def _service_alive(service_ref):
+        # Allow for one missed report, so that a slightly late report does
+        # not move stacks between engines
+        last_report = service_ref['updated_at'] or service_ref['created_at']
+        return not timeutils.is_older_than(
+            last_report, 2 * service_ref['report_interval'])
+
+    def _update_engine_ring(self, cnxt):
+        engine_ids = [srv['engine_id']
+                      for srv in service_objects.Service.get_all(cnxt)
+                      if (srv['topic'] == self.topic and srv['engine_id'] and
+                          self._service_alive(srv))]
+        ring = hash_ring.HashRing(engine_ids)
+        if self.engine_ring is None or ring.nodes != self.engine_ring.nodes:
+            LOG.info(_LI('Stacks are partitioned over %d engines'), len(ring))
+        self.engine_ring = ring
+
+    def _stack_owner(self, stack_identity):
+        '''
+        Return the ID of the engine that owns the given stack, if the stack is
+        to be forwarded to another engine, or None otherwise.
+        '''
+        if self.engine_ring is None:
+            return None
+
+        owner = self.engine_ring.get_node(stack_identity.get('stack_id'))
+        if owner == self.engine_id:
+            return None
+        return owner
+
+    def _forward_to_owner(self, cnxt, owner, method, kwargs):
+        LOG.debug('Forwarding %(method)s to engine %(owner)s',
+                  {'method': method, 'owner': owner})
+        client = rpc_messaging.get_rpc_client(
+            version='1.0', topic="heat-engine-listener", server=owner)
+        return client.call(cnxt, EngineListener.FORWARD,
+                           method=method, kwargs=kwargs)
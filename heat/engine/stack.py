@@ -15,8 +15,10 @@ import collections
 import copy
 import datetime
 import re
+import uuid
 import warnings
 
+from eventlet import greenpool
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_utils import encodeutils
@@ -31,6 +33,7 @@ from heat.common.i18n import _LI
 from heat.common.i18n import _LW
 from heat.common import identifier
 from heat.common import lifecycle_plugin_utils
+from heat.engine import constraints
 from heat.engine import dependencies
 from heat.engine import function
 from heat.engine.notification import stack as notification
@@ -38,6 +41,7 @@ from heat.engine import parameter_groups as param_groups
 from heat.engine import resource
 from heat.engine import resources
 from heat.engine import scheduler
+from heat.engine import sync_point
 from heat.engine import template as tmpl
 from heat.engine import update
 from heat.objects import resource as resource_objects
@@ -45,8 +49,10 @@ from heat.objects import snapshot as snapshot_object
 from heat.objects import stack as stack_object
 from heat.objects import user_creds as ucreds_object
 from heat.rpc import api as rpc_api
+from heat.rpc import worker_client as rpc_worker_client
 
 cfg.CONF.import_opt('error_wait_time', 'heat.common.config')
+cfg.CONF.import_opt('max_concurrent_validations', 'heat.common.config')
 
 LOG = logging.getLogger(__name__)
 
@@ -58,6 +64,46 @@ class ForcedCancel(BaseException):
         return "Operation cancelled"
 
 
+class StackCache(object):
+    """Identity map of the Stack objects loaded during a single operation.
+
+    One cache is shared by a root stack and all of its nested stacks, so that
+    walking a tree of nested stacks loads each stack from the database only
+    once. The database rows of the children of a stack are fetched with a
+    single query the first time any one of them is needed.
+    """
+
+    def __init__(self):
+        self._stacks = {}
+        self._db_stacks = {}
+        self._prefetched = set()
+
+    def get(self, stack_id):
+        return self._stacks.get(stack_id)
+
+    def add(self, stack):
+        if stack.id is not None:
+            self._stacks[stack.id] = stack
+            self._db_stacks.pop(stack.id, None)
+
+    def discard(self, stack_id):
+        self._stacks.pop(stack_id, None)
+        self._db_stacks.pop(stack_id, None)
+
+    def prefetch_children(self, context, owner_id):
+        """Fetch the DB rows of all the child stacks of the given stack."""
+        if owner_id is None or owner_id in self._prefetched:
+            return
+        self._prefetched.add(owner_id)
+        for db_stack in stack_object.Stack.get_all_by_owner_id(
+                context, owner_id, eager_load=True):
+            if db_stack.id not in self._stacks:
+                self._db_stacks[db_stack.id] = db_stack
+
+    def pop_db_stack(self, stack_id):
+        return self._db_stacks.pop(stack_id, None)
+
+
 class Stack(collections.Mapping):
 
     ACTIONS = (
@@ -82,11 +128,15 @@ class Stack(collections.Mapping):
                  user_creds_id=None, tenant_id=None,
                  use_stored_context=False, username=None,
                  nested_depth=0, strict_validate=True, convergence=False,
-                 current_traversal=None):
+                 current_traversal=None, current_deps=None, cache=None,
+                 use_slave=False):
         '''
         Initialise from a context, name, Template object and (optionally)
         Environment object. The database ID may also be initialised, if the
         stack is already in the database.
+
+        If use_slave is True, the stored resources are read from the
+        database read replica, so the stack must only be used for display.
         '''
 
         def _validate_stack_name(name):
@@ -116,6 +166,7 @@ class Stack(collections.Mapping):
         self._dependencies = None
         self._access_allowed_handlers = {}
         self._db_resources = None
+        self._use_slave = use_slave
         self.adopt_stack_data = adopt_stack_data
         self.stack_user_project_id = stack_user_project_id
         self.created_time = created_time
@@ -125,6 +176,8 @@ class Stack(collections.Mapping):
         self.strict_validate = strict_validate
         self.convergence = convergence
         self.current_traversal = current_traversal
+        self.current_deps = current_deps
+        self.stack_cache = StackCache() if cache is None else cache
 
         if use_stored_context:
             self.context = self.stored_context()
@@ -149,6 +202,8 @@ class Stack(collections.Mapping):
         else:
             self.outputs = {}
 
+        self.stack_cache.add(self)
+
     @property
     def env(self):
         """This is a helper to allow resources to access stack.env."""
@@ -167,10 +222,13 @@ class Stack(collections.Mapping):
         if self.parent_resource_name is None or self.owner_id is None:
             return None
 
-        try:
-            owner = self.load(self.context, stack_id=self.owner_id)
-        except exception.NotFound:
-            return None
+        owner = self.stack_cache.get(self.owner_id)
+        if owner is None:
+            try:
+                owner = self.load(self.context, stack_id=self.owner_id,
+                                  cache=self.stack_cache)
+            except exception.NotFound:
+                return None
         self._parent_resource = owner[self.parent_resource_name]
         return self._parent_resource
 
@@ -226,7 +284,7 @@ class Stack(collections.Mapping):
         if self._db_resources is None:
             try:
                 _db_resources = resource_objects.Resource.get_all_by_stack(
-                    self.context, self.id)
+                    self.context, self.id, use_slave=self._use_slave)
                 self._db_resources = _db_resources
             except exception.NotFound:
                 return None
@@ -242,6 +300,14 @@ class Stack(collections.Mapping):
     def reset_dependencies(self):
         self._dependencies = None
 
+    def convergence_dependencies(self):
+        '''
+        Return the dependency graph of the current convergence traversal,
+        keyed by resource ID.
+        '''
+        edges = (self.current_deps or {}).get('edges', [])
+        return dependencies.Dependencies(edges)
+
     @property
     def root_stack(self):
         '''
@@ -255,21 +321,18 @@ class Stack(collections.Mapping):
         '''
         Return the total number of resources in a stack, including nested
         stacks below.
-        '''
-        def total_nested(res):
-            get_nested = getattr(res, 'nested', None)
-            if callable(get_nested):
-                try:
-                    nested_stack = get_nested()
-                except exception.NotFound:
-                    # when an delete is underway, a nested stack can
-                    # disapear at any moment.
-                    return 0
-                if nested_stack is not None:
-                    return nested_stack.total_resources()
-            return 0
 
-        return len(self) + sum(total_nested(res) for res in self.itervalues())
+        The resources of the nested stacks are counted from their stored
+        templates rather than by loading every nested stack, so that the
+        resources of a nested stack still being created are all counted.
+        '''
+        total = len(self)
+        if self.id is not None:
+            for nested_t in stack_object.Stack.get_nested_templates(
+                    self.context, self.id):
+                nested_tmpl = tmpl.Template(nested_t)
+                total += len(nested_tmpl[nested_tmpl.RESOURCES] or {})
+        return total
 
     def _set_param_stackid(self):
         '''
@@ -290,14 +353,27 @@ class Stack(collections.Mapping):
 
     @classmethod
     def load(cls, context, stack_id=None, stack=None, parent_resource=None,
-             show_deleted=True, use_stored_context=False, force_reload=False):
-        '''Retrieve a Stack from the database.'''
+             show_deleted=True, use_stored_context=False, force_reload=False,
+             cache=None, use_slave=False):
+        '''Retrieve a Stack from the database.
+
+        If a StackCache is passed, the loaded stack shares it and a DB row
+        already prefetched into it is used instead of querying again. If
+        use_slave is True, the stack and its resources are read from the
+        database read replica, for display only.
+        '''
+        if stack is None and cache is not None and not force_reload:
+            stack = cache.pop_db_stack(stack_id)
+            if (stack is not None and stack.deleted_at is not None and
+                    not show_deleted):
+                stack = None
         if stack is None:
             stack = stack_object.Stack.get_by_id(
                 context,
                 stack_id,
                 show_deleted=show_deleted,
-                eager_load=True)
+                eager_load=True,
+                use_slave=use_slave)
         if stack is None:
             message = _('No stack exists with id "%s"') % str(stack_id)
             raise exception.NotFound(message)
@@ -306,13 +382,14 @@ class Stack(collections.Mapping):
             stack.refresh()
 
         return cls._from_db(context, stack, parent_resource=parent_resource,
-                            use_stored_context=use_stored_context)
+                            use_stored_context=use_stored_context,
+                            cache=cache, use_slave=use_slave)
 
     @classmethod
     def load_all(cls, context, limit=None, marker=None, sort_keys=None,
                  sort_dir=None, filters=None, tenant_safe=True,
                  show_deleted=False, resolve_data=True,
-                 show_nested=False):
+                 show_nested=False, use_slave=False):
         stacks = stack_object.Stack.get_all(
             context,
             limit,
@@ -322,13 +399,15 @@ class Stack(collections.Mapping):
             filters,
             tenant_safe,
             show_deleted,
-            show_nested) or []
+            show_nested,
+            use_slave) or []
         for stack in stacks:
-            yield cls._from_db(context, stack, resolve_data=resolve_data)
+            yield cls._from_db(context, stack, resolve_data=resolve_data,
+                               use_slave=use_slave)
 
     @classmethod
     def _from_db(cls, context, stack, parent_resource=None, resolve_data=True,
-                 use_stored_context=False):
+                 use_stored_context=False, cache=None, use_slave=False):
         template = tmpl.Template.load(
             context, stack.raw_template_id, stack.raw_template)
         return cls(context, stack.name, template,
@@ -346,7 +425,9 @@ class Stack(collections.Mapping):
                    user_creds_id=stack.user_creds_id, tenant_id=stack.tenant,
                    use_stored_context=use_stored_context,
                    username=stack.username, convergence=stack.convergence,
-                   current_traversal=stack.current_traversal)
+                   current_traversal=stack.current_traversal,
+                   current_deps=stack.current_deps,
+                   cache=cache, use_slave=use_slave)
 
     @profiler.trace('Stack.store', hide_args=False)
     def store(self, backup=False):
@@ -372,6 +453,7 @@ class Stack(collections.Mapping):
             'nested_depth': self.nested_depth,
             'convergence': self.convergence,
             'current_traversal': self.current_traversal,
+            'current_deps': self.current_deps,
         }
         if self.id:
             stack_object.Stack.update_by_id(self.context, self.id, s)
@@ -391,6 +473,7 @@ class Stack(collections.Mapping):
             new_s = stack_object.Stack.create(self.context, s)
             self.id = new_s.id
             self.created_time = new_s.created_at
+            self.stack_cache.add(self)
 
         self._set_param_stackid()
 
@@ -530,18 +613,13 @@ class Stack(collections.Mapping):
             raise exception.StackValidationFailed(
                 message=_("Duplicate names %s") % dup_names)
 
-        for res in self.dependencies:
-            try:
-                result = res.validate()
-            except exception.HeatException as ex:
-                LOG.info(ex)
-                raise ex
-            except Exception as ex:
-                LOG.exception(_LE("Exception: %s"), ex)
-                raise exception.StackValidationFailed(
-                    message=encodeutils.safe_decode(six.text_type(ex)))
-            if result:
-                raise exception.StackValidationFailed(message=result)
+        # Resources are validated concurrently, but the error reported is
+        # always that of the first failing resource in dependency order
+        with constraints.validation_cache(self.context):
+            errors = self._validate_resources(list(self.dependencies))
+        for error in errors:
+            if error is not None:
+                raise error
 
         for val in self.outputs.values():
             try:
@@ -560,6 +638,32 @@ class Stack(collections.Mapping):
                            '%s') % six.text_type(ex)
                 raise exception.StackValidationFailed(message=reason)
 
+    def _validate_resources(self, resources):
+        '''
+        Validate the given resources, returning a list of the resulting
+        errors (or None for each valid resource) in the same order.
+        '''
+        pool_size = min(cfg.CONF.max_concurrent_validations, len(resources))
+        if pool_size < 2:
+            return map(self._validate_resource, resources)
+
+        pool = greenpool.GreenPool(pool_size)
+        return list(pool.imap(self._validate_resource, resources))
+
+    @staticmethod
+    def _validate_resource(res):
+        try:
+            result = res.validate()
+        except exception.HeatException as ex:
+            LOG.info(ex)
+            return ex
+        except Exception as ex:
+            LOG.exception(_LE("Exception: %s"), ex)
+            return exception.StackValidationFailed(
+                message=encodeutils.safe_decode(six.text_type(ex)))
+        if result:
+            return exception.StackValidationFailed(message=result)
+
     def requires_deferred_auth(self):
         '''
         Returns whether this stack may need to perform API requests
@@ -611,6 +715,24 @@ class Stack(collections.Mapping):
 
         return self.timeout_mins * 60
 
+    def time_elapsed(self):
+        '''
+        Return the time in seconds since the current stack action started.
+
+        An action starts at the time stored as the stack's update time, or
+        its creation time if it has never been updated.
+        '''
+        start_time = self.updated_time or self.created_time
+        if start_time is None:
+            return 0
+        return (datetime.datetime.utcnow() - start_time).total_seconds()
+
+    def time_remaining(self):
+        '''
+        Return the time in seconds left before the current action times out.
+        '''
+        return self.timeout_secs() - self.time_elapsed()
+
     def preview_resources(self):
         '''
         Preview the stack with all of the resources.
@@ -634,6 +756,55 @@ class Stack(collections.Mapping):
             error_wait_time=cfg.CONF.error_wait_time)
         creator(timeout=self.timeout_secs())
 
+    @profiler.trace('Stack.converge_stack', hide_args=False)
+    def converge_stack(self):
+        '''
+        Start a convergence traversal to create the stack.
+
+        Every resource is stored, and a sync point is created for each of
+        them and for the stack itself. The resources that have no
+        dependencies are then cast to the workers, which carry the traversal
+        on through the graph as resources complete, so the create is spread
+        across all of the engines rather than run by this one.
+        '''
+        if not self.stack_user_project_id:
+            try:
+                self.create_stack_user_project_id()
+            except exception.AuthorizationFailure as ex:
+                self.state_set(self.CREATE, self.FAILED, six.text_type(ex))
+                return
+
+        self.current_traversal = str(uuid.uuid4())
+        for rsrc in self.resources.itervalues():
+            rsrc.store()
+
+        edges = [(rqr.id, rqd.id if rqd is not None else None)
+                 for rqr, rqd in self.dependencies.graph().edges()]
+        self.current_deps = {'edges': [list(e) for e in edges]}
+        self.store()
+        self.state_set(self.CREATE, self.IN_PROGRESS,
+                       'Stack %s started' % self.CREATE)
+
+        graph = self.convergence_dependencies().graph()
+        for rsrc_id in graph:
+            sync_point.create(self.context, rsrc_id, self.current_traversal,
+                              False, self.id)
+        sync_point.create(self.context, self.id, self.current_traversal,
+                          False, self.id)
+
+        if not graph:
+            self.state_set(self.CREATE, self.COMPLETE,
+                           'Stack %s completed successfully' % self.CREATE)
+            sync_point.delete_all(self.context, self.id,
+                                  self.current_traversal)
+            return
+
+        client = rpc_worker_client.WorkerClient()
+        for rsrc_id, node in graph.items():
+            if not node:
+                client.check_resource(self.context, rsrc_id,
+                                      self.current_traversal, {}, False)
+
     def _adopt_kwargs(self, resource):
         data = self.adopt_stack_data
         if not data or not data.get('resources'):
@@ -737,7 +908,7 @@ class Stack(collections.Mapping):
             LOG.debug('Loaded existing backup stack')
             return self.load(self.context, stack=s)
         elif create_if_missing:
-            prev = type(self)(self.context, self.name, copy.deepcopy(self.t),
+            prev = type(self)(self.context, self.name, copy.copy(self.t),
                               owner_id=self.id,
                               user_creds_id=self.user_creds_id,
                               convergence=self.convergence)
@@ -812,10 +983,9 @@ class Stack(collections.Mapping):
                        'Stack %s started' % action)
 
         if action == self.UPDATE:
-            # Oldstack is useless when the action is not UPDATE , so we don't
-            # need to build it, this can avoid some unexpected errors.
-            oldstack = Stack(self.context, self.name, copy.deepcopy(self.t),
-                             convergence=self.convergence)
+            # The old template is only needed to roll back an UPDATE. Keep a
+            # copy of it now, but build the stack only if we roll back.
+            old_template = copy.copy(self.t)
         backup_stack = self._backup_stack()
         try:
             update_task = update.StackUpdate(
@@ -861,7 +1031,8 @@ class Stack(collections.Mapping):
             stack_status = self.FAILED
             if action == self.UPDATE:
                 update_task.updater.cancel_all()
-                yield self.update_task(oldstack, action=self.ROLLBACK)
+                yield self.update_task(self._rollback_stack(old_template),
+                                       action=self.ROLLBACK)
                 return
 
         except exception.ResourceFailure as e:
@@ -872,7 +1043,8 @@ class Stack(collections.Mapping):
                 # If rollback is enabled, we do another update, with the
                 # existing template, so we roll back to the original state
                 if not self.disable_rollback:
-                    yield self.update_task(oldstack, action=self.ROLLBACK)
+                    yield self.update_task(self._rollback_stack(old_template),
+                                           action=self.ROLLBACK)
                     return
         else:
             LOG.debug('Deleting backup stack')
@@ -896,6 +1068,11 @@ class Stack(collections.Mapping):
 
         notification.send(self)
 
+    def _rollback_stack(self, template):
+        '''Return a Stack to roll back an update to the given template.'''
+        return Stack(self.context, self.name, template,
+                     convergence=self.convergence)
+
     def _delete_backup_stack(self, stack):
         # Delete resources in the backup stack referred to by 'stack'
 
@@ -1089,6 +1266,7 @@ class Stack(collections.Mapping):
             except exception.NotFound:
                 LOG.info(_LI("Tried to delete stack that does not exist "
                              "%s "), self.id)
+            self.stack_cache.discard(self.id)
             self.id = None
 
     @profiler.trace('Stack.suspend', hide_args=False)
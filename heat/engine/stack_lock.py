@@ -20,12 +20,14 @@ import oslo_messaging as messaging
 from oslo_utils import excutils
 
 from heat.common import exception
+from heat.common.i18n import _LE
 from heat.common.i18n import _LI
 from heat.common.i18n import _LW
 from heat.common import messaging as rpc_messaging
 from heat.db import api as db_api
 
 cfg.CONF.import_opt('engine_life_check_timeout', 'heat.common.config')
+cfg.CONF.import_opt('stack_lock_lease', 'heat.common.config')
 
 LOG = logging.getLogger(__name__)
 
@@ -53,6 +55,11 @@ class StackLock(object):
     def generate_engine_id():
         return str(uuid.uuid4())
 
+    @staticmethod
+    def renew_interval():
+        """Return how often, in seconds, an engine renews its leases."""
+        return max(cfg.CONF.stack_lock_lease // 3, 1)
+
     def try_acquire(self):
         """
         Try to acquire a stack lock, but don't raise an ActionInProgress
@@ -75,25 +82,16 @@ class StackLock(object):
                                      'stack': self.stack.id})
             return
 
-        if (lock_engine_id == self.engine_id or
-                self.engine_alive(self.context, lock_engine_id)):
-            LOG.debug("Lock on stack %(stack)s is owned by engine "
-                      "%(engine)s" % {'stack': self.stack.id,
-                                      'engine': lock_engine_id})
-            raise exception.ActionInProgress(stack_name=self.stack.name,
-                                             action=self.stack.action)
-        else:
-            LOG.info(_LI("Stale lock detected on stack %(stack)s.  Engine "
-                         "%(engine)s will attempt to steal the lock"),
-                     {'stack': self.stack.id, 'engine': self.engine_id})
-
-            result = db_api.stack_lock_steal(self.stack.id, lock_engine_id,
-                                             self.engine_id)
-
+        if lock_engine_id != self.engine_id:
+            # The holder renews its lease for as long as it is running, so
+            # only a lock left behind by a stopped engine can be taken over
+            result = db_api.stack_lock_steal_expired(self.stack.id,
+                                                     self.engine_id)
             if result is None:
-                LOG.info(_LI("Engine %(engine)s successfully stole the lock "
-                             "on stack %(stack)s"),
+                LOG.info(_LI("Engine %(engine)s took over the expired lock "
+                             "of engine %(old)s on stack %(stack)s"),
                          {'engine': self.engine_id,
+                          'old': lock_engine_id,
                           'stack': self.stack.id})
                 return
             elif result is True:
@@ -104,14 +102,66 @@ class StackLock(object):
                                                    'engine': self.engine_id})
                     return self.acquire(retry=False)
             else:
-                new_lock_engine_id = result
-                LOG.info(_LI("Failed to steal lock on stack %(stack)s. "
-                             "Engine %(engine)s stole the lock first"),
-                         {'stack': self.stack.id,
-                          'engine': new_lock_engine_id})
-
-            raise exception.ActionInProgress(
-                stack_name=self.stack.name, action=self.stack.action)
+                lock_engine_id = result
+                # Engines that predate leases write locks with no expiry and
+                # never renew them, so during an upgrade the holder of such a
+                # lock is asked whether it is still running
+                if (not db_api.stack_lock_has_lease(self.stack.id) and
+                        not self.engine_alive(self.context, lock_engine_id)):
+                    return self._steal_stale(lock_engine_id, retry)
+
+        LOG.debug("Lock on stack %(stack)s is owned by engine "
+                  "%(engine)s" % {'stack': self.stack.id,
+                                  'engine': lock_engine_id})
+        raise exception.ActionInProgress(stack_name=self.stack.name,
+                                         action=self.stack.action)
+
+    def _steal_stale(self, lock_engine_id, retry):
+        LOG.info(_LI("Stale lock detected on stack %(stack)s.  Engine "
+                     "%(engine)s will attempt to steal the lock"),
+                 {'stack': self.stack.id, 'engine': self.engine_id})
+
+        result = db_api.stack_lock_steal(self.stack.id, lock_engine_id,
+                                         self.engine_id)
+
+        if result is None:
+            LOG.info(_LI("Engine %(engine)s successfully stole the lock "
+                         "on stack %(stack)s"),
+                     {'engine': self.engine_id,
+                      'stack': self.stack.id})
+            return
+        elif result is True:
+            if retry:
+                LOG.info(_LI("The lock on stack %(stack)s was released "
+                             "while engine %(engine)s was stealing it. "
+                             "Trying again"), {'stack': self.stack.id,
+                                               'engine': self.engine_id})
+                return self.acquire(retry=False)
+        else:
+            LOG.info(_LI("Failed to steal lock on stack %(stack)s. "
+                         "Engine %(engine)s stole the lock first"),
+                     {'stack': self.stack.id,
+                      'engine': result})
+
+        raise exception.ActionInProgress(stack_name=self.stack.name,
+                                         action=self.stack.action)
+
+    @staticmethod
+    def is_held(stack_id):
+        """Return True if a live engine holds the lock on a stack."""
+        return db_api.stack_lock_held(stack_id)
+
+    @staticmethod
+    def renew_all(engine_id):
+        """Extend the leases on all of the locks held by an engine."""
+        try:
+            count = db_api.stack_lock_renew(engine_id)
+        except Exception as ex:
+            LOG.error(_LE("Failed to renew stack locks of engine %(engine)s:"
+                          " %(ex)s"), {'engine': engine_id, 'ex': ex})
+        else:
+            LOG.debug("Engine %(engine)s renewed %(count)s stack locks" %
+                      {'engine': engine_id, 'count': count})
 
     def release(self, stack_id):
         """Release a stack lock."""
@@ -0,0 +1,95 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Helpers for the sync points that join the branches of a convergence
+traversal.
+
+A sync point exists for each resource, and one for the stack itself, in each
+traversal. When an entity completes, it records its output in the sync point
+of every entity that requires it; whichever engine records the last of the
+required inputs is the one that carries the traversal on to that entity.
+"""
+
+from oslo_log import log as logging
+
+from heat.common import exception
+from heat.common.i18n import _
+from heat.objects import sync_point as sync_point_object
+
+LOG = logging.getLogger(__name__)
+
+
+def make_key(entity_id):
+    '''Return the key under which an entity's output is recorded.'''
+    return str(entity_id)
+
+
+def create(context, entity_id, traversal_id, is_update, stack_id):
+    values = {'entity_id': make_key(entity_id),
+              'traversal_id': traversal_id,
+              'is_update': is_update,
+              'stack_id': stack_id,
+              'atomic_key': 0,
+              'input_data': {}}
+    return sync_point_object.SyncPoint.create(context, values)
+
+
+def get(context, entity_id, traversal_id, is_update):
+    sync_point = sync_point_object.SyncPoint.get_by_key(context,
+                                                        make_key(entity_id),
+                                                        traversal_id,
+                                                        is_update)
+    if sync_point is None:
+        message = _('No sync point exists for %(entity)s in traversal '
+                    '%(traversal)s') % {'entity': entity_id,
+                                        'traversal': traversal_id}
+        raise exception.NotFound(message)
+
+    return sync_point
+
+
+def delete_all(context, stack_id, traversal_id):
+    return sync_point_object.SyncPoint.delete_all_by_stack_and_traversal(
+        context, stack_id, traversal_id)
+
+
+def sync(context, entity_id, traversal_id, is_update, propagate,
+         predecessors, new_data):
+    '''
+    Record the output of a predecessor in the sync point of an entity.
+
+    The write is retried against a fresh copy of the sync point whenever
+    another engine has updated it in the meantime, so that no input is lost.
+    Once inputs from all of the given predecessors have been recorded,
+    propagate is called with the entity ID and the collected input data.
+    '''
+    while True:
+        sync_point = get(context, entity_id, traversal_id, is_update)
+        input_data = dict(sync_point.input_data or {})
+        input_data.update(new_data)
+        rows_updated = sync_point_object.SyncPoint.update_input_data(
+            context, make_key(entity_id), traversal_id, is_update,
+            sync_point.atomic_key, input_data)
+        if rows_updated:
+            break
+
+    waiting = set(make_key(p) for p in predecessors) - set(input_data)
+    if waiting:
+        LOG.debug('[%(traversal)s] Sync point %(entity)s waiting for '
+                  '%(waiting)s', {'traversal': traversal_id,
+                                  'entity': entity_id,
+                                  'waiting': ', '.join(sorted(waiting))})
+        return
+
+    propagate(entity_id, input_data)
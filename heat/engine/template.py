@@ -118,6 +118,19 @@ class Template(collections.Mapping):
         self.env = env or environment.Environment({})
         self.version = get_version(self.t, _template_classes.keys())
 
+    def __copy__(self):
+        '''
+        Return a copy of the template sharing its data with this one.
+
+        Only the top level and the resources section are copied, since those
+        are the only parts modified in place (by add_resource() and
+        remove_resource()); resource snippets are always replaced as a whole.
+        '''
+        t = dict(self.t)
+        if t.get(self.RESOURCES) is not None:
+            t[self.RESOURCES] = dict(t[self.RESOURCES])
+        return Template(t, files=self.files, env=self.env)
+
     def __deepcopy__(self, memo):
         return Template(copy.deepcopy(self.t, memo), files=self.files,
                         env=self.env)
@@ -109,14 +109,15 @@ class VolumeAttachTask(object):
         self.attachment_id = va.id
         yield
 
-        cinder = self.clients.client('cinder')
+        cinder_plugin = self.clients.client_plugin('cinder')
 
-        vol = cinder.volumes.get(self.volume_id)
-        while vol.status == 'available' or vol.status == 'attaching':
+        pending = ('available', 'attaching')
+        vol = cinder_plugin.poll_volume(self.volume_id, pending)
+        while vol.status in pending:
             LOG.debug('%(name)s - volume status: %(status)s'
                       % {'name': str(self), 'status': vol.status})
             yield
-            vol = cinder.volumes.get(self.volume_id)
+            vol = cinder_plugin.poll_volume(self.volume_id, pending)
 
         if vol.status != 'in-use':
             LOG.info(_LI("Attachment failed - volume %(vol)s "
@@ -188,11 +189,12 @@ class VolumeDetachTask(object):
 
         yield
 
+        pending = ('in-use', 'detaching')
         try:
-            while vol.status in ('in-use', 'detaching'):
+            while vol.status in pending:
                 LOG.debug('%s - volume still in use' % str(self))
                 yield
-                vol = cinder.volumes.get(nova_vol.id)
+                vol = cinder_plugin.poll_volume(nova_vol.id, pending)
 
             LOG.info(_LI('%(name)s - status: %(status)s'),
                      {'name': str(self), 'status': vol.status})
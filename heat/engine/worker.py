@@ -13,13 +13,23 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
+
 from oslo_log import log as logging
 import oslo_messaging
 from osprofiler import profiler
+import six
 
+from heat.common import context
+from heat.common import exception
 from heat.common.i18n import _LE
 from heat.common.i18n import _LI
 from heat.common import messaging as rpc_messaging
+from heat.engine import scheduler
+from heat.engine import stack as parser
+from heat.engine import sync_point
+from heat.objects import resource as resource_objects
+from heat.objects import stack as stack_object
 from heat.openstack.common import service
 from heat.rpc import worker_client as rpc_client
 
@@ -36,7 +46,10 @@ class WorkerService(service.Service):
     or expect replies from these messages.
     """
 
-    RPC_API_VERSION = '1.0'
+    RPC_API_VERSION = '1.1'
+
+    # Number of stacks, one per traversal, kept loaded between resources
+    STACK_CACHE_SIZE = 20
 
     def __init__(self,
                  host,
@@ -51,6 +64,7 @@ class WorkerService(service.Service):
 
         self._rpc_client = None
         self._rpc_server = None
+        self._stacks = collections.OrderedDict()
 
     def start(self):
         target = oslo_messaging.Target(
@@ -76,3 +90,151 @@ class WorkerService(service.Service):
             LOG.error(_LE("WorkerService is failed to stop, %s"), e)
 
         super(WorkerService, self).stop()
+
+    def _load_resource(self, cnxt, resource_id, traversal, data):
+        '''
+        Return a resource and its stack, as of the given traversal.
+
+        The stack is only loaded from the database for the first resource of
+        each traversal that this engine processes, and is reused for the
+        rest. The resource itself is refreshed from its row, and the
+        resources that it requires are brought up to date from the input
+        data recorded by their sync points.
+        '''
+        try:
+            rs = resource_objects.Resource.get_obj(cnxt, resource_id)
+        except exception.NotFound:
+            return None, None
+
+        stack = self._stacks.pop(traversal, None)
+        if stack is None or stack.id != rs.stack_id:
+            stack = parser.Stack.load(cnxt, stack_id=rs.stack_id)
+        self._stacks[traversal] = stack
+        while len(self._stacks) > self.STACK_CACHE_SIZE:
+            self._stacks.popitem(last=False)
+
+        rsrc = stack.resources.get(rs.name)
+        if rsrc is not None:
+            rsrc._load_data(rs)
+
+        by_id = dict((r.id, r) for r in stack.resources.itervalues())
+        for key, value in data.items():
+            required = by_id.get(int(key))
+            if required is not None:
+                required.resource_id = value['resource_id']
+                required.action = value['action']
+                required.status = value['status']
+
+        return rsrc, stack
+
+    @context.request_context
+    def check_resource(self, cnxt, resource_id, current_traversal, data,
+                       is_update):
+        '''
+        Process a resource in a convergence traversal.
+
+        The resource is created if it has not been already, and its output is
+        then recorded in the sync points of the resources that require it (or
+        of the stack, if nothing requires it). The traversal continues on
+        whichever engine completes the last input of a sync point.
+
+        The work is done in a thread of the stack, so that the RPC server is
+        not held up while the resource is created.
+        '''
+        rsrc, stack = self._load_resource(cnxt, resource_id,
+                                          current_traversal, data)
+        if rsrc is None:
+            LOG.debug('[%(traversal)s] Resource %(id)s not found; stopping.',
+                      {'traversal': current_traversal, 'id': resource_id})
+            return
+
+        if self._traversal_cancelled(cnxt, stack.id, current_traversal):
+            LOG.debug('[%s] Traversal cancelled; stopping.',
+                      current_traversal)
+            self._stacks.pop(current_traversal, None)
+            return
+
+        self.thread_group_mgr.start(stack.id, self._process_resource, cnxt,
+                                    rsrc, stack, current_traversal,
+                                    is_update)
+
+    def _process_resource(self, cnxt, rsrc, stack, current_traversal,
+                          is_update):
+        try:
+            self._check_resource(cnxt, rsrc, stack, current_traversal,
+                                 is_update)
+        except (Exception, scheduler.Timeout) as ex:
+            # A failed branch deletes the sync points of the traversal, so
+            # the engines still working on other branches find them gone
+            if self._traversal_cancelled(cnxt, stack.id, current_traversal):
+                LOG.debug('[%s] Traversal cancelled; stopping.',
+                          current_traversal)
+                self._stacks.pop(current_traversal, None)
+                return
+
+            if not isinstance(ex, (exception.ResourceFailure,
+                                   scheduler.Timeout)):
+                LOG.exception(_LE('[%(traversal)s] Unexpected error '
+                                  'checking resource %(name)s'),
+                              {'traversal': current_traversal,
+                               'name': rsrc.name})
+            self._fail_traversal(cnxt, stack, current_traversal,
+                                 six.text_type(ex))
+
+    def _check_resource(self, cnxt, rsrc, stack, current_traversal,
+                        is_update):
+        if rsrc.state == (rsrc.INIT, rsrc.COMPLETE):
+            # The whole traversal shares the stack timeout, so each resource
+            # only gets whatever is left of it
+            timeout = stack.time_remaining()
+            if timeout <= 0:
+                self._fail_traversal(cnxt, stack, current_traversal,
+                                     'Timed out')
+                return
+
+            scheduler.TaskRunner(rsrc.create)(timeout=timeout)
+
+        deps = stack.convergence_dependencies()
+        graph = deps.graph()
+        output = {sync_point.make_key(rsrc.id): {
+            'resource_id': rsrc.resource_id,
+            'action': rsrc.action,
+            'status': rsrc.status}}
+
+        def propagate(entity_id, input_data):
+            self._rpc_client.check_resource(cnxt, entity_id,
+                                            current_traversal, input_data,
+                                            is_update)
+
+        requirers = list(deps.required_by(rsrc.id))
+        for req in requirers:
+            sync_point.sync(cnxt, req, current_traversal, is_update,
+                            propagate, graph[req], output)
+
+        if not requirers:
+            def complete(entity_id, input_data):
+                self._complete_traversal(cnxt, stack, current_traversal)
+
+            roots = [k for k, node in graph.items() if node.stem()]
+            sync_point.sync(cnxt, stack.id, current_traversal, is_update,
+                            complete, roots, output)
+
+    def _traversal_cancelled(self, cnxt, stack_id, traversal):
+        db_stack = stack_object.Stack.get_by_id(cnxt, stack_id)
+        return db_stack is None or db_stack.current_traversal != traversal
+
+    def _complete_traversal(self, cnxt, stack, traversal):
+        self._stacks.pop(traversal, None)
+        stack.state_set(stack.CREATE, stack.COMPLETE,
+                        'Stack %s completed successfully' % stack.CREATE)
+        sync_point.delete_all(cnxt, stack.id, traversal)
+
+    def _fail_traversal(self, cnxt, stack, traversal, reason):
+        self._stacks.pop(traversal, None)
+        # Clearing the current traversal stops the other branches of the
+        # graph from being carried on by the engines still working on them
+        stack_object.Stack.update_by_id(cnxt, stack.id,
+                                        {'current_traversal': None})
+        stack.state_set(stack.CREATE, stack.FAILED,
+                        'Resource %s failed: %s' % (stack.CREATE, reason))
+        sync_point.delete_all(cnxt, stack.id, traversal)
@@ -99,6 +99,12 @@ class Resource(
     def create(cls, context, values):
         return db_api.resource_create(context, values)
 
+    @classmethod
+    def update_by_id(cls, context, resource_id, values, atomic_key,
+                     expected_engine_id=None):
+        return db_api.resource_update(context, resource_id, values,
+                                      atomic_key, expected_engine_id)
+
     @classmethod
     def delete(cls, context, resource_id):
         resource_db = db_api.resource_get(context, resource_id)
@@ -112,8 +118,9 @@ class Resource(
             resource_id2)
 
     @classmethod
-    def get_all_by_stack(cls, context, stack_id):
-        resources_db = db_api.resource_get_all_by_stack(context, stack_id)
+    def get_all_by_stack(cls, context, stack_id, use_slave=False):
+        resources_db = db_api.resource_get_all_by_stack(context, stack_id,
+                                                        use_slave=use_slave)
         resources = [
             (
                 resource_name,
@@ -120,8 +120,9 @@ class Stack(
         return stacks
 
     @classmethod
-    def get_all_by_owner_id(cls, context, owner_id):
-        db_stacks = db_api.stack_get_all_by_owner_id(context, owner_id)
+    def get_all_by_owner_id(cls, context, owner_id, **kwargs):
+        db_stacks = db_api.stack_get_all_by_owner_id(context, owner_id,
+                                                     **kwargs)
         stacks = map(
             lambda db_stack: cls._from_db_object(
                 context,
@@ -134,6 +135,10 @@ class Stack(
     def count_all(cls, context, **kwargs):
         return db_api.stack_count_all(context, **kwargs)
 
+    @classmethod
+    def get_nested_templates(cls, context, stack_id):
+        return db_api.stack_get_nested_templates(context, stack_id)
+
     @classmethod
     def create(cls, context, values):
         return db_api.stack_create(context, values)
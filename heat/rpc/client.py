@@ -29,6 +29,8 @@ class EngineClient(object):
         1.0 - Initial version.
         1.1 - Add support_status argument to list_resource_types()
         1.4 - Add support for service list
+        1.7 - Add nested_stack_action()
+        1.8 - Add stop_nested_stack_action()
     '''
 
     BASE_RPC_API_VERSION = '1.0'
@@ -394,6 +396,41 @@ class EngineClient(object):
         return self.call(ctxt, self.make_msg('stack_check',
                                              stack_identity=stack_identity))
 
+    def nested_stack_action(self, ctxt, stack_identity, action,
+                            parent_resource_name, template_id=None,
+                            timeout_mins=None):
+        """
+        Start a create or update of a stored nested stack in any engine.
+
+        :param ctxt: RPC context.
+        :param stack_identity: Identity of the nested stack.
+        :param action: The action to perform, CREATE or UPDATE.
+        :param parent_resource_name: Name of the resource owning the stack.
+        :param template_id: ID of the stored template to update to.
+        :param timeout_mins: Timeout of the update, in minutes.
+        """
+        return self.call(ctxt,
+                         self.make_msg(
+                             'nested_stack_action',
+                             stack_identity=stack_identity,
+                             action=action,
+                             parent_resource_name=parent_resource_name,
+                             template_id=template_id,
+                             timeout_mins=timeout_mins),
+                         version='1.7')
+
+    def stop_nested_stack_action(self, ctxt, stack_identity):
+        """
+        Stop an action on a nested stack in whichever engine is running it.
+
+        :param ctxt: RPC context.
+        :param stack_identity: Identity of the nested stack.
+        """
+        return self.call(ctxt,
+                         self.make_msg('stop_nested_stack_action',
+                                       stack_identity=stack_identity),
+                         version='1.8')
+
     def stack_cancel_update(self, ctxt, stack_identity):
         return self.call(ctxt, self.make_msg('stack_cancel_update',
                                              stack_identity=stack_identity))
@@ -27,6 +27,7 @@ class WorkerClient(object):
     API version history::
 
         1.0 - Initial version.
+        1.1 - Add check_resource()
     '''
 
     BASE_RPC_API_VERSION = '1.0'
@@ -47,3 +48,12 @@ class WorkerClient(object):
         else:
             client = self._client
         return client.cast(ctxt, method, **kwargs)
+
+    def check_resource(self, ctxt, resource_id, current_traversal, data,
+                       is_update):
+        self.cast(ctxt, self.make_msg('check_resource',
+                                      resource_id=resource_id,
+                                      current_traversal=current_traversal,
+                                      data=data,
+                                      is_update=is_update),
+                  version='1.1')
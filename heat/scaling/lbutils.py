@@ -27,20 +27,28 @@ def reload_loadbalancers(group, load_balancers, exclude=None):
     Notify the LoadBalancer to reload its config.
 
     This must be done after activation (instance in ACTIVE state), otherwise
-    the instances' IP addresses may not be available.
+    the instances' IP addresses may not be available. Load balancers whose
+    membership is already up to date are left alone; the others are updated
+    and apply only the difference in membership.
     '''
     exclude = exclude or []
     id_list = grouputils.get_member_refids(group, exclude=exclude)
     for name, lb in six.iteritems(load_balancers):
-        props = copy.copy(lb.properties.data)
         if 'Instances' in lb.properties_schema:
-            props['Instances'] = id_list
+            members_key = 'Instances'
         elif 'members' in lb.properties_schema:
-            props['members'] = id_list
+            members_key = 'members'
         else:
             raise exception.Error(
                 _("Unsupported resource '%s' in LoadBalancerNames") % name)
 
+        added, removed = members_delta(lb.properties[members_key], id_list)
+        if not (added or removed):
+            continue
+
+        props = copy.copy(lb.properties.data)
+        props[members_key] = id_list
+
         lb_defn = rsrc_defn.ResourceDefinition(
             lb.name,
             lb.type(),
@@ -49,3 +57,12 @@ def reload_loadbalancers(group, load_balancers, exclude=None):
             deletion_policy=lb.t.get('DeletionPolicy'))
 
         scheduler.TaskRunner(lb.update, lb_defn)()
+
+
+def members_delta(old_members, new_members):
+    '''
+    Return the sets of members added and removed between two member lists.
+    '''
+    old_members = set(old_members or [])
+    new_members = set(new_members or [])
+    return new_members - old_members, old_members - new_members
@@ -140,7 +140,7 @@ class TestGroupAdjust(common.HeatTestCase):
     def test_scaling_same_capacity(self):
         """Alway resize even if the capacity is the same."""
         self.patchobject(grouputils, 'get_size', return_value=3)
-        resize = self.patchobject(self.group, 'resize')
+        resize = self.patchobject(self.group, '_resize', return_value=None)
         cd_stamp = self.patchobject(self.group, '_cooldown_timestamp')
         notify = self.patch('heat.engine.notification.autoscaling.send')
         self.patchobject(self.group, '_cooldown_inprogress',
@@ -169,7 +169,7 @@ class TestGroupAdjust(common.HeatTestCase):
 
     def test_scaling_policy_cooldown_ok(self):
         self.patchobject(grouputils, 'get_members', return_value=[])
-        resize = self.patchobject(self.group, 'resize')
+        resize = self.patchobject(self.group, '_resize', return_value=None)
         cd_stamp = self.patchobject(self.group, '_cooldown_timestamp')
         notify = self.patch('heat.engine.notification.autoscaling.send')
         self.patchobject(self.group, '_cooldown_inprogress',
@@ -197,7 +197,7 @@ class TestGroupAdjust(common.HeatTestCase):
 
     def test_scaling_policy_resize_fail(self):
         self.patchobject(grouputils, 'get_members', return_value=[])
-        self.patchobject(self.group, 'resize',
+        self.patchobject(self.group, '_resize',
                          side_effect=ValueError('test error'))
         notify = self.patch('heat.engine.notification.autoscaling.send')
         self.patchobject(self.group, '_cooldown_inprogress',
@@ -251,7 +251,7 @@ class TestGroupCrud(common.HeatTestCase):
 
     def test_handle_update_desired_cap(self):
         self.group._try_rolling_update = mock.Mock(return_value=None)
-        self.group.adjust = mock.Mock(return_value=None)
+        self.group._adjust = mock.Mock(return_value=None)
 
         props = {'desired_capacity': 4}
         defn = rsrc_defn.ResourceDefinition(
@@ -261,13 +261,13 @@ class TestGroupCrud(common.HeatTestCase):
 
         self.group.handle_update(defn, None, props)
 
-        self.group.adjust.assert_called_once_with(
+        self.group._adjust.assert_called_once_with(
             4, adjustment_type='ExactCapacity')
         self.group._try_rolling_update.assert_called_once_with(props)
 
     def test_handle_update_desired_nocap(self):
         self.group._try_rolling_update = mock.Mock(return_value=None)
-        self.group.adjust = mock.Mock(return_value=None)
+        self.group._adjust = mock.Mock(return_value=None)
         get_size = self.patchobject(grouputils, 'get_size')
         get_size.return_value = 6
 
@@ -279,14 +279,14 @@ class TestGroupCrud(common.HeatTestCase):
 
         self.group.handle_update(defn, None, props)
 
-        self.group.adjust.assert_called_once_with(
+        self.group._adjust.assert_called_once_with(
             6, adjustment_type='ExactCapacity')
         self.group._try_rolling_update.assert_called_once_with(props)
 
     def test_update_in_failed(self):
         self.group.state_set('CREATE', 'FAILED')
         # to update the failed asg
-        self.group.adjust = mock.Mock(return_value=None)
+        self.group._adjust = mock.Mock(return_value=None)
 
         new_defn = rsrc_defn.ResourceDefinition(
             'asg', 'OS::Heat::AutoScalingGroup',
@@ -301,7 +301,7 @@ class TestGroupCrud(common.HeatTestCase):
                   'Foo': 'hello'}}})
 
         self.group.handle_update(new_defn, None, None)
-        self.group.adjust.assert_called_once_with(
+        self.group._adjust.assert_called_once_with(
             2, adjustment_type='ExactCapacity')
 
 
@@ -514,7 +514,7 @@ class RollingUpdatePolicyDiffTest(common.HeatTestCase):
             current_grp.type(),
             properties=updated_grp.t['Properties'])
         current_grp._try_rolling_update = mock.MagicMock()
-        current_grp.adjust = mock.MagicMock()
+        current_grp._adjust = mock.MagicMock(return_value=None)
         current_grp.handle_update(update_snippet, tmpl_diff, None)
         if updated_policy is None:
             self.assertIsNone(
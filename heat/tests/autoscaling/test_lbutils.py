@@ -126,6 +126,39 @@ class LBUtilsTest(common.HeatTestCase):
         lb2.handle_update.assert_called_with(mock.ANY, mock.ANY,
                                              prop_diff)
 
+    def test_reload_unchanged_members(self):
+        group = mock.Mock()
+        self.patchobject(grouputils, 'get_member_refids',
+                         return_value=['ID1', 'ID2', 'ID3'])
+
+        lb1 = self.stack['neutron_lb_1']
+        lb1.t = lb1.t.freeze(properties={'members': ['ID3', 'ID1', 'ID2']})
+        lb1.reparse()
+        lb2 = self.stack['neutron_lb_2']
+        lbs = {
+            'LB_1': lb1,
+            'LB_2': lb2
+        }
+
+        lb1.handle_update = mock.Mock()
+        lb2.handle_update = mock.Mock()
+
+        lbutils.reload_loadbalancers(group, lbs)
+
+        self.assertFalse(lb1.handle_update.called)
+        lb2.handle_update.assert_called_with(
+            mock.ANY, mock.ANY, {'members': ['ID1', 'ID2', 'ID3']})
+
+    def test_members_delta(self):
+        self.assertEqual((set(['ID3']), set(['ID1'])),
+                         lbutils.members_delta(['ID1', 'ID2'],
+                                               ['ID2', 'ID3']))
+        self.assertEqual((set(['ID1']), set()),
+                         lbutils.members_delta(None, ['ID1']))
+        self.assertEqual((set(), set()),
+                         lbutils.members_delta(['ID2', 'ID1'],
+                                               ['ID1', 'ID2']))
+
     def test_reload_non_lb(self):
         group = mock.Mock()
         self.patchobject(grouputils, 'get_member_refids',
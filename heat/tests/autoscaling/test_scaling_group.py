@@ -319,7 +319,7 @@ class TestGroupAdjust(common.HeatTestCase):
     def test_scaling_same_capacity(self):
         """Alway resize even if the capacity is the same."""
         self.patchobject(grouputils, 'get_size', return_value=3)
-        resize = self.patchobject(self.group, 'resize')
+        resize = self.patchobject(self.group, '_resize', return_value=None)
         cd_stamp = self.patchobject(self.group, '_cooldown_timestamp')
         notify = self.patch('heat.engine.notification.autoscaling.send')
         self.patchobject(self.group, '_cooldown_inprogress',
@@ -348,7 +348,7 @@ class TestGroupAdjust(common.HeatTestCase):
 
     def test_scaling_policy_cooldown_ok(self):
         self.patchobject(grouputils, 'get_members', return_value=[])
-        resize = self.patchobject(self.group, 'resize')
+        resize = self.patchobject(self.group, '_resize', return_value=None)
         cd_stamp = self.patchobject(self.group, '_cooldown_timestamp')
         notify = self.patch('heat.engine.notification.autoscaling.send')
         self.patchobject(self.group, '_cooldown_inprogress',
@@ -376,7 +376,7 @@ class TestGroupAdjust(common.HeatTestCase):
 
     def test_scaling_policy_resize_fail(self):
         self.patchobject(grouputils, 'get_members', return_value=[])
-        self.patchobject(self.group, 'resize',
+        self.patchobject(self.group, '_resize',
                          side_effect=ValueError('test error'))
         notify = self.patch('heat.engine.notification.autoscaling.send')
         self.patchobject(self.group, '_cooldown_inprogress',
@@ -425,7 +425,7 @@ class TestGroupCrud(common.HeatTestCase):
 
     def test_handle_update_desired_cap(self):
         self.group._try_rolling_update = mock.Mock(return_value=None)
-        self.group.adjust = mock.Mock(return_value=None)
+        self.group._adjust = mock.Mock(return_value=None)
 
         props = {'DesiredCapacity': 4}
         defn = rsrc_defn.ResourceDefinition(
@@ -435,13 +435,13 @@ class TestGroupCrud(common.HeatTestCase):
 
         self.group.handle_update(defn, None, props)
 
-        self.group.adjust.assert_called_once_with(
+        self.group._adjust.assert_called_once_with(
             4, adjustment_type='ExactCapacity')
         self.group._try_rolling_update.assert_called_once_with(props)
 
     def test_handle_update_desired_nocap(self):
         self.group._try_rolling_update = mock.Mock(return_value=None)
-        self.group.adjust = mock.Mock(return_value=None)
+        self.group._adjust = mock.Mock(return_value=None)
         get_size = self.patchobject(grouputils, 'get_size')
         get_size.return_value = 6
 
@@ -453,10 +453,44 @@ class TestGroupCrud(common.HeatTestCase):
 
         self.group.handle_update(defn, None, props)
 
-        self.group.adjust.assert_called_once_with(
+        self.group._adjust.assert_called_once_with(
             6, adjustment_type='ExactCapacity')
         self.group._try_rolling_update.assert_called_once_with(props)
 
+    def test_handle_update_resize_task(self):
+        steps = []
+
+        def resize(new_capacity):
+            for i in range(2):
+                steps.append(new_capacity)
+                yield
+
+        self.group._try_rolling_update = mock.Mock(return_value=None)
+        self.group._resize = mock.Mock(side_effect=resize)
+        self.patchobject(self.group, '_cooldown_inprogress',
+                         return_value=False)
+        self.patchobject(self.group, '_cooldown_timestamp')
+        self.patchobject(grouputils, 'get_size', return_value=2)
+        self.patch('heat.engine.notification.autoscaling.send')
+
+        props = {'AvailabilityZones': ['nova'],
+                 'LaunchConfigurationName': 'config',
+                 'MaxSize': 5,
+                 'MinSize': 1,
+                 'DesiredCapacity': 4}
+        defn = rsrc_defn.ResourceDefinition(
+            'nopayload',
+            'AWS::AutoScaling::AutoScalingGroup',
+            props)
+
+        updater = self.group.handle_update(defn, None, props)
+        self.assertEqual([4], steps)
+
+        while not updater.step():
+            pass
+        self.assertEqual([4, 4], steps)
+        self.group._resize.assert_called_once_with(4)
+
     def test_conf_properties_vpc_zone(self):
         self.stub_ImageConstraint_validate()
         self.stub_FlavorConstraint_validate()
@@ -481,7 +515,7 @@ class TestGroupCrud(common.HeatTestCase):
     def test_update_in_failed(self):
         self.group.state_set('CREATE', 'FAILED')
         # to update the failed asg
-        self.group.adjust = mock.Mock(return_value=None)
+        self.group._adjust = mock.Mock(return_value=None)
 
         new_defn = rsrc_defn.ResourceDefinition(
             'asg', 'AWS::AutoScaling::AutoScalingGroup',
@@ -492,7 +526,7 @@ class TestGroupCrud(common.HeatTestCase):
              'DesiredCapacity': 2})
 
         self.group.handle_update(new_defn, None, None)
-        self.group.adjust.assert_called_once_with(
+        self.group._adjust.assert_called_once_with(
             2, adjustment_type='ExactCapacity')
 
 
@@ -636,7 +670,7 @@ class RollingUpdatePolicyDiffTest(common.HeatTestCase):
             properties=updated_grp.t['Properties'],
             update_policy=updated_policy)
         current_grp._try_rolling_update = mock.MagicMock()
-        current_grp.adjust = mock.MagicMock()
+        current_grp._adjust = mock.MagicMock(return_value=None)
         current_grp.handle_update(update_snippet, tmpl_diff, None)
         if updated_policy is None:
             self.assertEqual({}, current_grp.update_policy.data)
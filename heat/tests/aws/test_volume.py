@@ -255,6 +255,10 @@ class VolumeTest(vt_base.BaseVolumeTest):
 
         self.m.ReplayAll()
 
+        poll_volume = cinder.CinderClientPlugin.poll_volume
+        poll = self.patchobject(cinder.CinderClientPlugin, 'poll_volume',
+                                autospec=True, side_effect=poll_volume)
+
         stack = utils.parse_stack(self.t, stack_name=stack_name)
 
         self.create_volume(self.t, stack, 'DataVolume')
@@ -263,6 +267,13 @@ class VolumeTest(vt_base.BaseVolumeTest):
         scheduler.TaskRunner(rsrc.delete)()
 
         self.m.VerifyAll()
+        # every status the attach and detach tasks wait on is tracked
+        creating = rsrc.stack['DataVolume']._volume_creating_status
+        self.assertEqual([creating, creating,
+                          ('available', 'attaching'),
+                          ('in-use', 'detaching'),
+                          ('in-use', 'detaching')],
+                         [c[0][2] for c in poll.call_args_list])
 
     def test_volume_detachment_err(self):
         stack_name = 'test_volume_detach_err_stack'
@@ -590,6 +590,17 @@ class HeatMigrationsCheckers(test_migrations.WalkVersionsMixin,
         for column in column_list:
             self.assertColumnExists(engine, 'resource', column)
 
+    def _check_061(self, engine, data):
+        self.assertColumnExists(engine, 'stack_lock', 'expires_at')
+
+    def _check_062(self, engine, data):
+        self.assertIndexMembers(engine, 'stack',
+                                'ix_stack_tenant_created_at',
+                                ['tenant', 'created_at', 'id'])
+        self.assertIndexMembers(engine, 'event',
+                                'ix_event_stack_id_created_at',
+                                ['stack_id', 'created_at', 'id'])
+
 
 class TestHeatMigrationsMySQL(HeatMigrationsCheckers,
                               test_base.MySQLOpportunisticTestCase):
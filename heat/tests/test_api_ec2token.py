@@ -12,10 +12,12 @@
 #    under the License.
 
 
+import datetime
 import json
 
 from oslo_config import cfg
 from oslo_utils import importutils
+from oslo_utils import timeutils
 import requests
 import six
 
@@ -32,7 +34,7 @@ class Ec2TokenTest(common.HeatTestCase):
 
     def setUp(self):
         super(Ec2TokenTest, self).setUp()
-        self.m.StubOutWithMock(requests, 'post')
+        self.m.StubOutWithMock(requests.Session, 'post')
 
     def _dummy_GET_request(self, params=None, environ=None):
         # Mangle the params dict into a query string
@@ -183,7 +185,8 @@ class Ec2TokenTest(common.HeatTestCase):
         self.assertEqual('xyz', ec2.__call__(dummy_req))
 
     def _stub_http_connection(self, headers=None, params=None, response=None,
-                              req_url='http://123:5000/v2.0/ec2tokens'):
+                              req_url='http://123:5000/v2.0/ec2tokens',
+                              signature='xyz'):
 
         headers = headers or {}
         params = params or {}
@@ -202,12 +205,13 @@ class Ec2TokenTest(common.HeatTestCase):
                                  "host": "heat:8000",
                                  "verb": "GET",
                                  "params": params,
-                                 "signature": "xyz",
+                                 "signature": signature,
                                  "path": "/v1",
                                  "body_hash": body_hash}})
         req_headers = {'Content-Type': 'application/json'}
-        requests.post(req_url, data=req_creds,
-                      headers=req_headers).AndReturn(DummyHTTPResponse())
+        requests.Session.post(req_url, data=req_creds,
+                              headers=req_headers).AndReturn(
+                                  DummyHTTPResponse())
 
     def test_call_ok(self):
         dummy_conf = {'auth_uri': 'http://123:5000/v2.0'}
@@ -348,6 +352,116 @@ class Ec2TokenTest(common.HeatTestCase):
 
         self.m.VerifyAll()
 
+    def _v2_request(self, signature='xyz'):
+        params = {'AWSAccessKeyId': 'foo', 'Signature': signature}
+        req_env = {'SERVER_NAME': 'heat',
+                   'SERVER_PORT': '8000',
+                   'PATH_INFO': '/v1'}
+        return self._dummy_GET_request(params, req_env)
+
+    def test_call_ok_cached(self):
+        dummy_conf = {'auth_uri': 'http://123:5000/v2.0'}
+        ec2 = ec2token.EC2Token(app='woot', conf=dummy_conf)
+
+        ok_resp = json.dumps({'access': {'metadata': {'roles': ['a']},
+                                         'token': {
+            'id': 123,
+            'tenant': {'name': 'tenant', 'id': 'abcd1234'}}}})
+        # Keystone is only asked once for the same signed request
+        self._stub_http_connection(response=ok_resp,
+                                   params={'AWSAccessKeyId': 'foo'})
+        self.m.ReplayAll()
+        self.assertEqual('woot', ec2.__call__(self._v2_request()))
+
+        dummy_req = self._v2_request()
+        self.assertEqual('woot', ec2.__call__(dummy_req))
+        self.assertEqual(123, dummy_req.headers['X-Auth-Token'])
+        self.assertEqual('tenant', dummy_req.headers['X-Tenant-Name'])
+        self.assertEqual('abcd1234', dummy_req.headers['X-Tenant-Id'])
+        self.assertEqual('a', dummy_req.headers['X-Roles'])
+        self.m.VerifyAll()
+
+    def test_call_cache_other_signature(self):
+        dummy_conf = {'auth_uri': 'http://123:5000/v2.0'}
+        ec2 = ec2token.EC2Token(app='woot', conf=dummy_conf)
+
+        ok_resp = json.dumps({'access': {'metadata': {}, 'token': {
+            'id': 123,
+            'tenant': {'name': 'tenant', 'id': 'abcd1234'}}}})
+        err_msg = "EC2 access key not found."
+        err_resp = json.dumps({'error': {'message': err_msg}})
+        self._stub_http_connection(response=ok_resp,
+                                   params={'AWSAccessKeyId': 'foo'})
+        self.m.ReplayAll()
+        self.assertEqual('woot', ec2.__call__(self._v2_request()))
+        self.m.VerifyAll()
+
+        # A different signature is still checked against keystone
+        self.m.UnsetStubs()
+        self.m.StubOutWithMock(requests.Session, 'post')
+        self._stub_http_connection(response=err_resp,
+                                   params={'AWSAccessKeyId': 'foo'},
+                                   signature='abc')
+        self.m.ReplayAll()
+        dummy_req = self._v2_request('abc')
+        self.assertRaises(exception.HeatInvalidClientTokenIdError,
+                          ec2.__call__, dummy_req)
+        self.m.VerifyAll()
+
+    def test_call_cache_disabled(self):
+        dummy_conf = {'auth_uri': 'http://123:5000/v2.0', 'cache_ttl': '0'}
+        ec2 = ec2token.EC2Token(app='woot', conf=dummy_conf)
+        self.assertIsNone(ec2._cache)
+
+        ok_resp = json.dumps({'access': {'metadata': {}, 'token': {
+            'id': 123,
+            'tenant': {'name': 'tenant', 'id': 'abcd1234'}}}})
+        self._stub_http_connection(response=ok_resp,
+                                   params={'AWSAccessKeyId': 'foo'})
+        self._stub_http_connection(response=ok_resp,
+                                   params={'AWSAccessKeyId': 'foo'})
+        self.m.ReplayAll()
+        self.assertEqual('woot', ec2.__call__(self._v2_request()))
+        self.assertEqual('woot', ec2.__call__(self._v2_request()))
+        self.m.VerifyAll()
+
+    def test_call_cache_token_expired(self):
+        dummy_conf = {'auth_uri': 'http://123:5000/v2.0'}
+        ec2 = ec2token.EC2Token(app='woot', conf=dummy_conf)
+
+        ok_resp = json.dumps({'access': {'metadata': {}, 'token': {
+            'id': 123,
+            'expires': '2000-01-01T00:00:00Z',
+            'tenant': {'name': 'tenant', 'id': 'abcd1234'}}}})
+        self._stub_http_connection(response=ok_resp,
+                                   params={'AWSAccessKeyId': 'foo'})
+        self._stub_http_connection(response=ok_resp,
+                                   params={'AWSAccessKeyId': 'foo'})
+        self.m.ReplayAll()
+        self.assertEqual('woot', ec2.__call__(self._v2_request()))
+        self.assertEqual('woot', ec2.__call__(self._v2_request()))
+        self.m.VerifyAll()
+
+    def test_signature_cache_size(self):
+        cache = ec2token.SignatureCache(60, 2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(1, cache.get('a'))
+        cache.put('c', 3)
+        # The least recently used entry is dropped
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(1, cache.get('a'))
+        self.assertEqual(3, cache.get('c'))
+
+    def test_signature_cache_ttl(self):
+        cache = ec2token.SignatureCache(60, 10)
+        now = timeutils.utcnow()
+        self.patchobject(timeutils, 'utcnow', return_value=now)
+        cache.put('a', 1)
+        self.assertEqual(1, cache.get('a'))
+        timeutils.utcnow.return_value = now + datetime.timedelta(seconds=61)
+        self.assertIsNone(cache.get('a'))
+
     def test_call_ok_multicloud(self):
         dummy_conf = {
             'allowed_auth_uris': [
@@ -2104,6 +2104,26 @@ class StackSerializerTest(common.HeatTestCase):
         self.assertEqual('location', response.headers['Location'])
         self.assertEqual('application/json', response.headers['Content-Type'])
 
+    def test_serialize_resource_schema(self):
+        result = {'resource_type': 'OS::Foo', 'properties': {}}
+        response = self.serializer.resource_schema(webob.Response(), result)
+        self.assertEqual(result, json.loads(response.body))
+        self.assertEqual('application/json', response.content_type)
+        self.assertEqual('private, max-age=300',
+                         response.headers['Cache-Control'])
+        self.assertIsNotNone(response.etag)
+
+    def test_serialize_resource_types_not_modified(self):
+        result = {'resource_types': ['OS::Foo']}
+        etag = self.serializer.list_resource_types(webob.Response(),
+                                                   result).etag
+
+        request = webob.Request.blank('/resource_types',
+                                      headers={'If-None-Match': '"%s"' % etag})
+        response = self.serializer.list_resource_types(
+            webob.Response(request=request), result)
+        self.assertEqual(304, request.get_response(response).status_int)
+
 
 @mock.patch.object(policy.Enforcer, 'enforce')
 class ResourceControllerTest(ControllerTest, common.HeatTestCase):
@@ -55,6 +55,42 @@ class CinderClientPluginTests(common.HeatTestCase):
         self.cinder_client.volume_snapshots.get.assert_called_once_with(
             snapshot_id)
 
+    def _volume(self, volume_id, status):
+        vol = mock.Mock(id=volume_id, status=status)
+        vol._info = {'id': volume_id, 'status': status}
+        return vol
+
+    def test_poll_volume(self):
+        manager = self.cinder_client.volumes
+        manager.get.side_effect = lambda vol_id: self._volume(vol_id,
+                                                              'creating')
+        manager.list.return_value = [self._volume('a', 'creating')]
+        manager.resource_class.side_effect = (
+            lambda mgr, info, loaded: self._volume(info['id'],
+                                                   info['status']))
+
+        for i in range(2):
+            for vol_id in ('a', 'b'):
+                vol = self.cinder_plugin.poll_volume(vol_id, ('creating',))
+                self.assertEqual('creating', vol.status)
+
+        self.assertEqual([mock.call('a'), mock.call('b'), mock.call('b')],
+                         manager.get.call_args_list)
+        manager.list.assert_called_once_with(
+            search_opts={'status': 'creating'})
+
+    def test_poll_volume_done(self):
+        manager = self.cinder_client.volumes
+        manager.get.side_effect = lambda vol_id: self._volume(vol_id,
+                                                              'available')
+        for i in range(2):
+            for vol_id in ('a', 'b'):
+                vol = self.cinder_plugin.poll_volume(vol_id, ('creating',))
+                self.assertEqual('available', vol.status)
+
+        self.assertEqual(4, manager.get.call_count)
+        self.assertFalse(manager.list.called)
+
 
 class VolumeConstraintTest(common.HeatTestCase):
 
@@ -230,6 +230,63 @@ class ClientPluginTest(common.HeatTestCase):
         self.assertRaises(TypeError, client_plugin.ClientPlugin, c)
 
 
+class StatusBatcherTest(common.HeatTestCase):
+
+    def setUp(self):
+        super(StatusBatcherTest, self).setUp()
+        self.list_objects = mock.Mock(return_value={'a': {'status': 'A'},
+                                                    'b': {'status': 'B'}})
+        self.batcher = client_plugin.StatusBatcher(self.list_objects)
+
+    def test_poll_untracked(self):
+        self.assertIsNone(self.batcher.poll('a'))
+        self.assertFalse(self.list_objects.called)
+
+    def test_poll_single(self):
+        self.batcher.track('a', 1)
+        self.assertIsNone(self.batcher.poll('a'))
+        self.assertFalse(self.list_objects.called)
+
+    def test_poll_shared_listing(self):
+        self.batcher.track('a', 1)
+        self.batcher.track('b', 2)
+        for i in range(2):
+            self.assertEqual({'status': 'A'}, self.batcher.poll('a'))
+            self.assertEqual({'status': 'B'}, self.batcher.poll('b'))
+        self.assertEqual([mock.call({'a': 1, 'b': 2})] * 2,
+                         self.list_objects.call_args_list)
+
+    def test_poll_not_listed(self):
+        self.batcher.track('a', 1)
+        self.batcher.track('c', 3)
+        self.assertEqual({'status': 'A'}, self.batcher.poll('a'))
+        self.assertIsNone(self.batcher.poll('c'))
+
+    def test_poll_listing_failed(self):
+        self.list_objects.side_effect = ValueError
+        self.batcher.track('a', 1)
+        self.batcher.track('b', 2)
+        self.assertRaises(ValueError, self.batcher.poll, 'a')
+        self.assertEqual({}, self.batcher.poll('b'))
+        self.assertEqual(1, self.list_objects.call_count)
+
+    def test_poll_forgets_stale(self):
+        self.batcher.track('a', 1)
+        self.batcher.track('b', 2)
+        self.batcher.poll('a')
+        self.batcher.poll('a')
+        self.list_objects.assert_called_with({'a': 1})
+        self.assertIn('a', self.batcher)
+        self.assertNotIn('b', self.batcher)
+
+    def test_untrack(self):
+        self.batcher.track('a', 1)
+        self.batcher.track('b', 2)
+        self.batcher.untrack('b')
+        self.assertIsNone(self.batcher.poll('a'))
+        self.assertFalse(self.list_objects.called)
+
+
 class TestClientPluginsInitialise(common.HeatTestCase):
 
     @testcase.skip('skipped until keystone can read context auth_ref')
@@ -11,7 +11,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-
+import eventlet
+import mock
 import six
 import testtools
 
@@ -495,3 +496,82 @@ class CustomConstraintTest(testtools.TestCase):
 
         constraint = constraints.CustomConstraint("zero", environment=self.env)
         self.assertEqual("zero", constraint["custom_constraint"])
+
+
+class BaseCustomConstraintTest(testtools.TestCase):
+
+    class ZeroConstraint(constraints.BaseCustomConstraint):
+        expected_exceptions = (ValueError,)
+
+        def __init__(self):
+            self.checked = []
+
+        def validate_with_client(self, client, value):
+            self.checked.append(value)
+            if value != 0:
+                raise ValueError('not zero')
+
+    def setUp(self):
+        super(BaseCustomConstraintTest, self).setUp()
+        self.ctx = mock.Mock()
+        self.constraint = self.ZeroConstraint()
+
+    def test_validate(self):
+        self.assertTrue(self.constraint.validate(0, self.ctx))
+        self.assertTrue(self.constraint.validate(0, self.ctx))
+        self.assertFalse(self.constraint.validate(1, self.ctx))
+        self.assertEqual('Error validating value 1: not zero',
+                         self.constraint.error(1))
+        self.assertEqual([0, 0, 1], self.constraint.checked)
+
+    def test_validate_cached(self):
+        with constraints.validation_cache(self.ctx):
+            self.assertTrue(self.constraint.validate(0, self.ctx))
+            self.assertTrue(self.ZeroConstraint().validate(0, self.ctx))
+            self.assertFalse(self.constraint.validate(1, self.ctx))
+            self.assertFalse(self.constraint.validate(1, self.ctx))
+            self.assertEqual('Error validating value 1: not zero',
+                             self.constraint.error(1))
+        self.assertEqual([0, 1, 1], self.constraint.checked)
+
+        self.assertTrue(self.constraint.validate(0, self.ctx))
+        self.assertEqual([0, 1, 1, 0], self.constraint.checked)
+
+    def test_validate_cached_unhashable(self):
+        with constraints.validation_cache(self.ctx):
+            self.assertFalse(self.constraint.validate([0], self.ctx))
+            self.assertFalse(self.constraint.validate([0], self.ctx))
+        self.assertEqual([[0], [0]], self.constraint.checked)
+
+    def test_validate_cached_nested(self):
+        with constraints.validation_cache(self.ctx):
+            with constraints.validation_cache(self.ctx):
+                self.assertTrue(self.constraint.validate(0, self.ctx))
+            self.assertTrue(self.constraint.validate(0, self.ctx))
+        self.assertEqual([0], self.constraint.checked)
+
+    def test_validate_cached_concurrent(self):
+        constraint = self.constraint
+
+        def check(client, value):
+            constraint.checked.append(value)
+            eventlet.sleep(0)
+
+        with mock.patch.object(constraint, 'validate_with_client',
+                               side_effect=check):
+            with constraints.validation_cache(self.ctx):
+                threads = [eventlet.spawn(constraint.validate, 0, self.ctx)
+                           for i in range(3)]
+                self.assertEqual([True] * 3, [t.wait() for t in threads])
+        self.assertEqual([0], constraint.checked)
+
+    def test_validate_cached_exception(self):
+        with mock.patch.object(self.constraint, 'validate_with_client',
+                               side_effect=KeyError):
+            with constraints.validation_cache(self.ctx):
+                self.assertRaises(KeyError, self.constraint.validate,
+                                  0, self.ctx)
+                self.assertRaises(KeyError, self.constraint.validate,
+                                  0, self.ctx)
+            self.assertEqual(2,
+                             self.constraint.validate_with_client.call_count)
@@ -27,6 +27,7 @@ import six
 
 from heat.common import context
 from heat.common import exception
+from heat.common import hash_ring
 from heat.common import identifier
 from heat.common import service_utils
 from heat.common import template_format
@@ -37,8 +38,10 @@ from heat.engine.clients.os import nova
 from heat.engine.clients.os import swift
 from heat.engine import dependencies
 from heat.engine import environment
+from heat.engine import notification
 from heat.engine import properties
 from heat.engine import resource as res
+from heat.engine import resources
 from heat.engine.resources.aws.ec2 import instance as instances
 from heat.engine import service
 from heat.engine import service_software_config
@@ -636,11 +639,26 @@ class StackServiceCreateUpdateDeleteTest(common.HeatTestCase):
                           self.man.create_stack,
                           self.ctx, stack_name, stack.t.t, {}, None, {})
 
-    def test_stack_create_enabled_convergence_engine(self):
+    @mock.patch.object(parser.Stack, 'converge_stack')
+    def test_stack_create_enabled_convergence_engine(self, mock_converge):
+        cfg.CONF.set_override('convergence_engine', True)
+        self.man.thread_group_mgr = mock.Mock()
+        stack_name = 'service_create_convergence_test_stack'
+        t = {'HeatTemplateFormatVersion': '2012-12-12'}
+        result = self.man.create_stack(self.ctx, stack_name, t, {}, None, {})
+
+        db_stack = stack_object.Stack.get_by_id(self.ctx, result['stack_id'])
+        self.assertTrue(db_stack.convergence)
+        self.man.thread_group_mgr.start_with_lock.assert_called_once_with(
+            self.ctx, mock.ANY, self.man.engine_id, mock_converge)
+        self.assertFalse(mock_converge.called)
+
+    def test_stack_adopt_enabled_convergence_engine(self):
         cfg.CONF.set_override('convergence_engine', True)
         ex = self.assertRaises(dispatcher.ExpectedException,
                                self.man.create_stack, self.ctx, 'test',
-                               wp_template, {}, None, {})
+                               wp_template, {}, None,
+                               {'adopt_stack_data': '{}'})
         self.assertEqual(exception.NotSupported, ex.exc_info[0])
         self.assertEqual('Convergence engine is not supported.',
                          six.text_type(ex.exc_info[1]))
@@ -1564,6 +1582,113 @@ class StackServiceActionsTest(common.HeatTestCase):
         self.man.stack_check(self.ctx, stack.identifier())
         self.assertTrue(stack.check.called)
 
+    @mock.patch.object(service.ThreadGroupManager, 'start')
+    @mock.patch.object(parser.Stack, 'load')
+    def test_nested_stack_action_create(self, mock_load, mock_start):
+        stack = get_wordpress_stack('test_nested_create', self.ctx)
+        stack.store()
+        stack.create = mock.Mock()
+        mock_load.return_value = stack
+
+        def start(stack_id, func, *args, **kwargs):
+            s = stack_object.Stack.get_by_id(self.ctx, stack_id)
+            self.assertEqual(('CREATE', 'IN_PROGRESS'), (s.action, s.status))
+            return self._mock_thread_start(stack_id, func, *args, **kwargs)
+
+        mock_start.side_effect = start
+
+        self.man.nested_stack_action(self.ctx, stack.identifier(),
+                                     'CREATE', 'nested_res')
+        mock_load.assert_called_once_with(self.ctx, stack=mock.ANY,
+                                          parent_resource='nested_res')
+        stack.create.assert_called_once_with()
+
+    @mock.patch.object(service.ThreadGroupManager, 'start')
+    @mock.patch.object(parser.Stack, 'load')
+    def test_nested_stack_action_update(self, mock_load, mock_start):
+        stack = get_wordpress_stack('test_nested_update', self.ctx)
+        stack.store()
+        stack.update = mock.Mock()
+        mock_load.return_value = stack
+        mock_start.side_effect = self._mock_thread_start
+
+        new_tmpl = templatem.Template(template_format.parse(wp_template),
+                                      env=environment.Environment(
+                                          {'KeyName': 'test2'}))
+        template_id = new_tmpl.store(self.ctx)
+
+        self.man.nested_stack_action(self.ctx, stack.identifier(),
+                                     'UPDATE', 'nested_res',
+                                     template_id=template_id,
+                                     timeout_mins=42)
+        new_stack = stack.update.call_args[0][0]
+        self.assertEqual(template_id, new_stack.t.id)
+        self.assertEqual(42, new_stack.timeout_mins)
+        self.assertEqual('nested_res', new_stack.parent_resource_name)
+        self.assertEqual('test2', new_stack.parameters['KeyName'])
+        self.assertEqual(stack.identifier().arn(),
+                         new_stack.parameters['AWS::StackId'])
+
+    def test_nested_stack_action_invalid(self):
+        stack = get_wordpress_stack('test_nested_invalid', self.ctx)
+        stack.store()
+
+        self.assertRaises(ValueError, self.man.nested_stack_action,
+                          self.ctx, stack.identifier(), 'DELETE',
+                          'nested_res')
+
+    def _store_nested_in_progress(self, name):
+        stack = get_wordpress_stack(name, self.ctx)
+        stack.store()
+        stack_object.Stack.update_by_id(self.ctx, stack.id,
+                                        {'action': stack.CREATE,
+                                         'status': stack.IN_PROGRESS})
+        return stack
+
+    def test_stop_nested_stack_action_current_engine(self):
+        self.man.start()
+        stack = self._store_nested_in_progress('test_stop_nested_current')
+        self.patchobject(stack_lock.StackLock, 'try_acquire',
+                         return_value=self.man.engine_id)
+        mock_stop = self.patchobject(self.man.thread_group_mgr, 'stop')
+
+        self.man.stop_nested_stack_action(self.ctx, stack.identifier())
+        mock_stop.assert_called_once_with(stack.id)
+        s = db_api.stack_get(self.ctx, stack.id)
+        self.assertEqual(('CREATE', 'FAILED'), (s.action, s.status))
+        self.assertEqual('Stack CREATE cancelled', s.status_reason)
+
+    def test_stop_nested_stack_action_other_engine(self):
+        self.man.start()
+        stack = self._store_nested_in_progress('test_stop_nested_other')
+        self.patchobject(stack_lock.StackLock, 'try_acquire',
+                         return_value='other-engine-fake-uuid')
+        self.patchobject(stack_lock.StackLock, 'engine_alive',
+                         return_value=True)
+        mock_call = self.patchobject(self.man, '_remote_call',
+                                     return_value=None)
+
+        self.man.stop_nested_stack_action(self.ctx, stack.identifier())
+        mock_call.assert_called_once_with(
+            self.ctx, 'other-engine-fake-uuid', 'stop_stack',
+            stack_identity=stack.identifier())
+        s = db_api.stack_get(self.ctx, stack.id)
+        self.assertEqual(('CREATE', 'FAILED'), (s.action, s.status))
+
+    def test_stop_nested_stack_action_not_running(self):
+        stack = get_wordpress_stack('test_stop_nested_idle', self.ctx)
+        stack.store()
+        stack_object.Stack.update_by_id(self.ctx, stack.id,
+                                        {'action': stack.CREATE,
+                                         'status': stack.COMPLETE})
+        mock_stop = self.patchobject(self.man.thread_group_mgr, 'stop')
+
+        self.man.stop_nested_stack_action(self.ctx, stack.identifier())
+        self.assertFalse(mock_stop.called)
+        self.assertFalse(db_api.stack_lock_held(stack.id))
+        s = db_api.stack_get(self.ctx, stack.id)
+        self.assertEqual(('CREATE', 'COMPLETE'), (s.action, s.status))
+
 
 class StackServiceAuthorizeTest(common.HeatTestCase):
 
@@ -1676,7 +1801,7 @@ class StackServiceTest(common.HeatTestCase):
 
     def test_make_sure_rpc_version(self):
         self.assertEqual(
-            '1.6',
+            '1.8',
             service.EngineService.RPC_API_VERSION,
             ('RPC version is changed, please update this test to new version '
              'and make sure additional test cases are added for RPC APIs '
@@ -1765,7 +1890,8 @@ class StackServiceTest(common.HeatTestCase):
         s = stack_object.Stack.get_by_id(self.ctx, self.stack.id)
         service.EngineService._get_stack(self.ctx,
                                          self.stack.identifier(),
-                                         show_deleted=True).AndReturn(s)
+                                         show_deleted=True,
+                                         use_slave=True).AndReturn(s)
         self.m.ReplayAll()
 
         events = self.eng.list_events(self.ctx, self.stack.identifier())
@@ -1938,7 +2064,8 @@ class StackServiceTest(common.HeatTestCase):
                                                     sort_keys=sort_keys,
                                                     marker=marker,
                                                     sort_dir=sort_dir,
-                                                    filters=filters)
+                                                    filters=filters,
+                                                    use_slave=True)
 
     @mock.patch.object(db_api, 'event_get_all_by_tenant')
     def test_tenant_events_list_passes_marker_and_filters(
@@ -1957,14 +2084,16 @@ class StackServiceTest(common.HeatTestCase):
                                                            sort_keys=sort_keys,
                                                            marker=marker,
                                                            sort_dir=sort_dir,
-                                                           filters=filters)
+                                                           filters=filters,
+                                                           use_slave=True)
 
     @stack_context('service_list_all_test_stack')
     def test_stack_list_all(self):
         self.m.StubOutWithMock(parser.Stack, '_from_db')
         parser.Stack._from_db(
             self.ctx, mox.IgnoreArg(),
-            resolve_data=False
+            resolve_data=False,
+            use_slave=True
         ).AndReturn(self.stack)
 
         self.m.ReplayAll()
@@ -2002,6 +2131,7 @@ class StackServiceTest(common.HeatTestCase):
                                                    mock.ANY,
                                                    mock.ANY,
                                                    mock.ANY,
+                                                   True,
                                                    )
 
     @mock.patch.object(db_api, 'stack_get_all')
@@ -2017,6 +2147,7 @@ class StackServiceTest(common.HeatTestCase):
                                                    mock.ANY,
                                                    mock.ANY,
                                                    mock.ANY,
+                                                   True,
                                                    )
 
     @mock.patch.object(db_api, 'stack_get_all')
@@ -2031,6 +2162,7 @@ class StackServiceTest(common.HeatTestCase):
                                                    True,
                                                    mock.ANY,
                                                    mock.ANY,
+                                                   True,
                                                    )
 
     @mock.patch.object(db_api, 'stack_get_all')
@@ -2045,6 +2177,7 @@ class StackServiceTest(common.HeatTestCase):
                                                    False,
                                                    mock.ANY,
                                                    mock.ANY,
+                                                   True,
                                                    )
 
     @mock.patch.object(db_api, 'stack_get_all')
@@ -2059,6 +2192,7 @@ class StackServiceTest(common.HeatTestCase):
                                                    mock.ANY,
                                                    mock.ANY,
                                                    True,
+                                                   True,
                                                    )
 
     @mock.patch.object(db_api, 'stack_get_all')
@@ -2073,6 +2207,7 @@ class StackServiceTest(common.HeatTestCase):
                                                    mock.ANY,
                                                    True,
                                                    mock.ANY,
+                                                   True,
                                                    )
 
     @mock.patch.object(db_api, 'stack_count_all')
@@ -2082,7 +2217,8 @@ class StackServiceTest(common.HeatTestCase):
                                                      filters={'foo': 'bar'},
                                                      tenant_safe=mock.ANY,
                                                      show_deleted=False,
-                                                     show_nested=False)
+                                                     show_nested=False,
+                                                     use_slave=True)
 
     @mock.patch.object(db_api, 'stack_count_all')
     def test_count_stacks_tenant_safe_default_true(self, mock_stack_count_all):
@@ -2091,7 +2227,8 @@ class StackServiceTest(common.HeatTestCase):
                                                      filters=mock.ANY,
                                                      tenant_safe=True,
                                                      show_deleted=False,
-                                                     show_nested=False)
+                                                     show_nested=False,
+                                                     use_slave=True)
 
     @mock.patch.object(db_api, 'stack_count_all')
     def test_count_stacks_passes_tenant_safe_info(self, mock_stack_count_all):
@@ -2100,7 +2237,8 @@ class StackServiceTest(common.HeatTestCase):
                                                      filters=mock.ANY,
                                                      tenant_safe=False,
                                                      show_deleted=False,
-                                                     show_nested=False)
+                                                     show_nested=False,
+                                                     use_slave=True)
 
     @mock.patch.object(db_api, 'stack_count_all')
     def test_count_stacks_show_nested(self, mock_stack_count_all):
@@ -2109,7 +2247,8 @@ class StackServiceTest(common.HeatTestCase):
                                                      filters=mock.ANY,
                                                      tenant_safe=True,
                                                      show_deleted=False,
-                                                     show_nested=True)
+                                                     show_nested=True,
+                                                     use_slave=True)
 
     @mock.patch.object(db_api, 'stack_count_all')
     def test_count_stack_show_deleted(self, mock_stack_count_all):
@@ -2118,7 +2257,8 @@ class StackServiceTest(common.HeatTestCase):
                                                      filters=mock.ANY,
                                                      tenant_safe=True,
                                                      show_deleted=True,
-                                                     show_nested=False)
+                                                     show_nested=False,
+                                                     use_slave=True)
 
     @stack_context('service_abandon_stack')
     def test_abandon_stack(self):
@@ -2159,7 +2299,7 @@ class StackServiceTest(common.HeatTestCase):
         self.m.StubOutWithMock(service.EngineService, '_get_stack')
         service.EngineService._get_stack(
             self.ctx, non_exist_identifier,
-            show_deleted=True).AndRaise(stack_not_found_exc)
+            show_deleted=True, use_slave=True).AndRaise(stack_not_found_exc)
         self.m.ReplayAll()
 
         ex = self.assertRaises(dispatcher.ExpectedException,
@@ -2178,7 +2318,7 @@ class StackServiceTest(common.HeatTestCase):
         self.m.StubOutWithMock(service.EngineService, '_get_stack')
         service.EngineService._get_stack(
             self.ctx, non_exist_identifier,
-            show_deleted=True).AndRaise(invalid_tenant_exc)
+            show_deleted=True, use_slave=True).AndRaise(invalid_tenant_exc)
         self.m.ReplayAll()
 
         ex = self.assertRaises(dispatcher.ExpectedException,
@@ -2194,7 +2334,8 @@ class StackServiceTest(common.HeatTestCase):
         s = stack_object.Stack.get_by_id(self.ctx, self.stack.id)
         service.EngineService._get_stack(self.ctx,
                                          self.stack.identifier(),
-                                         show_deleted=True).AndReturn(s)
+                                         show_deleted=True,
+                                         use_slave=True).AndReturn(s)
         self.m.ReplayAll()
 
         sl = self.eng.show_stack(self.ctx, self.stack.identifier())
@@ -2279,6 +2420,17 @@ class StackServiceTest(common.HeatTestCase):
         schema = self.eng.resource_schema(self.ctx, type_name=type_name)
         self.assertEqual(expected, schema)
 
+    def test_resource_schema_cached(self):
+        type_name = 'ResourceWithPropsType'
+        schema = self.eng.resource_schema(self.ctx, type_name=type_name)
+        self.assertIs(schema,
+                      self.eng.resource_schema(self.ctx, type_name=type_name))
+
+        resources.global_env().register_class(type_name,
+                                              generic_rsrc.GenericResource)
+        schema = self.eng.resource_schema(self.ctx, type_name=type_name)
+        self.assertEqual({}, schema['properties'])
+
     def _no_template_file(self, function):
         env = environment.Environment()
         info = environment.ResourceInfo(env.registry,
@@ -2310,7 +2462,8 @@ class StackServiceTest(common.HeatTestCase):
     def _test_describe_stack_resource(self):
         self.m.StubOutWithMock(parser.Stack, 'load')
         parser.Stack.load(self.ctx,
-                          stack=mox.IgnoreArg()).AndReturn(self.stack)
+                          stack=mox.IgnoreArg(),
+                          use_slave=True).AndReturn(self.stack)
         self.m.ReplayAll()
 
         r = self.eng.describe_stack_resource(self.ctx, self.stack.identifier(),
@@ -2347,7 +2500,8 @@ class StackServiceTest(common.HeatTestCase):
         stack_not_found_exc = exception.StackNotFound(stack_name='test')
         self.m.StubOutWithMock(service.EngineService, '_get_stack')
         service.EngineService._get_stack(
-            self.ctx, non_exist_identifier).AndRaise(stack_not_found_exc)
+            self.ctx, non_exist_identifier,
+            use_slave=True).AndRaise(stack_not_found_exc)
         self.m.ReplayAll()
 
         ex = self.assertRaises(dispatcher.ExpectedException,
@@ -2361,7 +2515,8 @@ class StackServiceTest(common.HeatTestCase):
     def test_stack_resource_describe_nonexist_resource(self):
         self.m.StubOutWithMock(parser.Stack, 'load')
         parser.Stack.load(self.ctx,
-                          stack=mox.IgnoreArg()).AndReturn(self.stack)
+                          stack=mox.IgnoreArg(),
+                          use_slave=True).AndReturn(self.stack)
 
         self.m.ReplayAll()
         ex = self.assertRaises(dispatcher.ExpectedException,
@@ -3216,6 +3371,187 @@ class StackServiceTest(common.HeatTestCase):
             'mock_id',
             dict())
 
+    @mock.patch.object(service_objects.Service, 'update_by_id')
+    def test_service_manage_report_notification_stats(self,
+                                                      mock_service_update):
+        self.eng.service_id = 'mock_id'
+        get_stats = self.patchobject(
+            notification, 'get_stats',
+            return_value=dict(sent=5, queued=1, dropped=0, failed=2))
+        self.eng.service_manage_report()
+        get_stats.assert_called_once_with()
+
+    @mock.patch.object(service_objects.Service, 'get_all_by_args')
+    @mock.patch.object(service_objects.Service, 'update_by_id')
+    @mock.patch.object(service_objects.Service, 'create')
+    @mock.patch.object(context, 'get_admin_context')
+    def test_service_manage_report_multiple_workers(self,
+                                                    mock_admin_context,
+                                                    mock_service_create,
+                                                    mock_service_update,
+                                                    mock_get_all):
+        cfg.CONF.set_override('num_engine_workers', 4)
+        cfg.CONF.set_override('partition_stacks', True)
+        self.eng.service_id = None
+        mock_admin_context.return_value = self.ctx
+        now = timeutils.utcnow()
+        sibling = dict(id='sibling', deleted_at=None, updated_at=now,
+                       created_at=now, report_interval=60)
+        mock_get_all.return_value = [sibling]
+        mock_service_create.return_value = dict(id='mock_id')
+
+        self.eng.service_manage_report()
+
+        # The record of a running sibling worker is not taken over
+        self.assertFalse(mock_service_update.called)
+        self.assertTrue(mock_service_create.called)
+        self.assertEqual('mock_id', self.eng.service_id)
+
+    @mock.patch.object(service_objects.Service, 'get_all_by_args')
+    @mock.patch.object(service_objects.Service, 'update_by_id')
+    @mock.patch.object(context, 'get_admin_context')
+    def test_service_manage_report_multiple_workers_unpartitioned(
+            self,
+            mock_admin_context,
+            mock_service_update,
+            mock_get_all):
+        cfg.CONF.set_override('num_engine_workers', 4)
+        self.eng.service_id = None
+        mock_admin_context.return_value = self.ctx
+        now = timeutils.utcnow()
+        sibling = dict(id='sibling', deleted_at=None, updated_at=now,
+                       created_at=now, report_interval=60)
+        mock_get_all.return_value = [sibling]
+        mock_service_update.return_value = sibling
+
+        self.eng.service_manage_report()
+
+        # Without partitioning the workers of a host share one record
+        mock_service_update.assert_called_once_with(
+            self.ctx,
+            'sibling',
+            dict(engine_id=self.eng.engine_id,
+                 deleted_at=None,
+                 report_interval=cfg.CONF.periodic_interval))
+        self.assertEqual('sibling', self.eng.service_id)
+
+    @mock.patch.object(service_objects.Service, 'get_all_by_args')
+    @mock.patch.object(service_objects.Service, 'update_by_id')
+    @mock.patch.object(context, 'get_admin_context')
+    def test_service_manage_report_multiple_workers_stopped(
+            self,
+            mock_admin_context,
+            mock_service_update,
+            mock_get_all):
+        cfg.CONF.set_override('num_engine_workers', 4)
+        cfg.CONF.set_override('partition_stacks', True)
+        self.eng.service_id = None
+        mock_admin_context.return_value = self.ctx
+        now = timeutils.utcnow()
+        old = now - datetime.timedelta(seconds=600)
+        sibling = dict(id='sibling', deleted_at=None, updated_at=now,
+                       created_at=now, report_interval=60)
+        stopped = dict(id='stopped', deleted_at=None, updated_at=old,
+                       created_at=old, report_interval=60)
+        mock_get_all.return_value = [sibling, stopped]
+        mock_service_update.return_value = stopped
+
+        self.eng.service_manage_report()
+
+        mock_service_update.assert_called_once_with(
+            self.ctx,
+            'stopped',
+            dict(engine_id=self.eng.engine_id,
+                 deleted_at=None,
+                 report_interval=cfg.CONF.periodic_interval))
+        self.assertEqual('stopped', self.eng.service_id)
+
+    @mock.patch.object(service_objects.Service, 'get_all')
+    @mock.patch.object(service_objects.Service, 'update_by_id')
+    @mock.patch.object(context, 'get_admin_context')
+    def test_service_manage_report_updates_engine_ring(self,
+                                                       mock_admin_context,
+                                                       mock_service_update,
+                                                       mock_get_all):
+        cfg.CONF.set_override('partition_stacks', True)
+        self.eng.service_id = 'mock_id'
+        mock_admin_context.return_value = self.ctx
+        now = timeutils.utcnow()
+        old = now - datetime.timedelta(seconds=600)
+
+        def srv(engine_id, topic, updated_at):
+            return dict(engine_id=engine_id, topic=topic,
+                        updated_at=updated_at, created_at=old,
+                        report_interval=60)
+
+        mock_get_all.return_value = [srv('engine-1', self.eng.topic, now),
+                                     srv('engine-2', self.eng.topic, now),
+                                     srv('engine-3', self.eng.topic, old),
+                                     srv('engine-4', 'other-topic', now)]
+
+        self.eng.service_manage_report()
+
+        self.assertEqual(frozenset(['engine-1', 'engine-2']),
+                         self.eng.engine_ring.nodes)
+
+    @mock.patch.object(service_objects.Service, 'update_by_id')
+    @mock.patch.object(context, 'get_admin_context')
+    def test_service_manage_report_no_partitioning(self,
+                                                   mock_admin_context,
+                                                   mock_service_update):
+        self.eng.service_id = 'mock_id'
+        mock_admin_context.return_value = self.ctx
+        self.eng.service_manage_report()
+        self.assertIsNone(self.eng.engine_ring)
+
+    @mock.patch('heat.common.messaging.get_rpc_client')
+    def test_stack_action_forwarded_to_owner(self, mock_get_client):
+        self.eng.engine_ring = hash_ring.HashRing(['other-engine'])
+        identity = {'stack_id': 'a-stack-id', 'stack_name': 'a-stack',
+                    'tenant': 'a-tenant', 'path': ''}
+
+        result = self.eng.stack_check(self.ctx, identity)
+
+        mock_get_client.assert_called_once_with(
+            version='1.0', topic='heat-engine-listener',
+            server='other-engine')
+        mock_client = mock_get_client.return_value
+        mock_client.call.assert_called_once_with(
+            self.ctx, 'forward', method='stack_check',
+            kwargs={'stack_identity': identity})
+        self.assertEqual(mock_client.call.return_value, result)
+
+    @mock.patch('heat.common.messaging.get_rpc_client')
+    def test_stack_action_owned_runs_locally(self, mock_get_client):
+        self.eng.engine_ring = hash_ring.HashRing([self.eng.engine_id])
+        self.eng.thread_group_mgr = mock.Mock()
+        stack = get_wordpress_stack('service_check_owned_test_stack',
+                                    self.ctx)
+        stack.store()
+        self.patchobject(parser.Stack, 'load', return_value=stack)
+
+        self.eng.stack_check(self.ctx, stack.identifier())
+
+        self.assertFalse(mock_get_client.called)
+        self.eng.thread_group_mgr.start_with_lock.assert_called_once_with(
+            self.ctx, stack, self.eng.engine_id, stack.check)
+
+    def test_listener_forward(self):
+        engine = mock.Mock()
+        listener = service.EngineListener('a-host', 'engine-fake-uuid',
+                                          mock.Mock(), engine=engine)
+        identity = {'stack_id': 'a-stack-id'}
+
+        result = listener.forward(self.ctx, 'stack_check',
+                                  {'stack_identity': identity})
+
+        # The owner runs the action without routing it again
+        handler = engine.stack_check.owner_handler
+        handler.assert_called_once_with(engine, self.ctx,
+                                        stack_identity=identity)
+        self.assertEqual(handler.return_value, result)
+        self.assertFalse(engine.stack_check.called)
+
     def test_stop_rpc_server(self):
         with mock.patch.object(self.eng,
                                '_rpc_server') as mock_rpc_server:
@@ -3253,7 +3589,8 @@ class StackServiceTest(common.HeatTestCase):
         engine_listener_class.assert_called_once_with(
             self.eng.host,
             self.eng.engine_id,
-            self.eng.thread_group_mgr
+            self.eng.thread_group_mgr,
+            engine=self.eng
         )
         engine_lister = engine_listener_class.return_value
         engine_lister.start.assert_called_once_with()
@@ -3297,10 +3634,12 @@ class StackServiceTest(common.HeatTestCase):
         # Manage Thread group
         thread_group_class.assert_called_once_with()
         manage_thread_group = thread_group_class.return_value
-        manage_thread_group.add_timer.assert_called_once_with(
-            cfg.CONF.periodic_interval,
-            self.eng.service_manage_report
-        )
+        manage_thread_group.add_timer.assert_has_calls([
+            mock.call(cfg.CONF.periodic_interval,
+                      self.eng.service_manage_report),
+            mock.call(stack_lock.StackLock.renew_interval(),
+                      stack_lock.StackLock.renew_all,
+                      None, self.eng.engine_id)])
 
     @mock.patch('heat.common.messaging.get_rpc_server',
                 return_value=mock.Mock())
@@ -3385,6 +3724,7 @@ class StackServiceTest(common.HeatTestCase):
         # Add dummy thread group to test thread_group_mgr.stop() is executed?
         self.eng.thread_group_mgr.groups['sample-uuid'] = DummyThreadGroup()
         self.eng.service_id = 'sample-service-uuid'
+        flush = self.patchobject(notification, 'flush')
 
         self.eng.stop()
 
@@ -3400,6 +3740,9 @@ class StackServiceTest(common.HeatTestCase):
             'sample-uuid',
             True)
 
+        # Queued notifications
+        flush.assert_called_once_with(cfg.CONF.notification_drain_timeout)
+
         # # Manage Thread group
         self.eng.manage_thread_grp.stop.assert_called_with(False)
 
@@ -15,8 +15,17 @@
 
 import mock
 
+from heat.common import exception
+from heat.db import api as db_api
+from heat.engine import resource
+from heat.engine import stack
+from heat.engine import sync_point
+from heat.engine import template
 from heat.engine import worker
+from heat.objects import stack as stack_object
 from heat.tests import common
+from heat.tests import generic_resource as generic_rsrc
+from heat.tests import utils
 
 
 class WorkerServiceTest(common.HeatTestCase):
@@ -30,7 +39,7 @@ class WorkerServiceTest(common.HeatTestCase):
 
     def test_make_sure_rpc_version(self):
         self.assertEqual(
-            '1.0',
+            '1.1',
             worker.WorkerService.RPC_API_VERSION,
             ('RPC version is changed, please update this test to new version '
              'and make sure additional test cases are added for RPC APIs '
@@ -80,3 +89,202 @@ class WorkerServiceTest(common.HeatTestCase):
             self.worker.stop()
             mock_rpc_server.stop.assert_called_once_with()
             mock_rpc_server.wait.assert_called_once_with()
+
+
+class CheckResourceTest(common.HeatTestCase):
+    def setUp(self):
+        super(CheckResourceTest, self).setUp()
+        self.ctx = utils.dummy_context()
+        resource._register_class('GenericResourceType',
+                                 generic_rsrc.GenericResource)
+        tpl = {'HeatTemplateFormatVersion': '2012-12-12',
+               'Resources': {
+                   'A': {'Type': 'GenericResourceType'},
+                   'B': {'Type': 'GenericResourceType'},
+                   'C': {'Type': 'GenericResourceType',
+                         'DependsOn': ['A', 'B']}}}
+        self.stack = stack.Stack(self.ctx, 'check_resource_test',
+                                 template.Template(tpl),
+                                 stack_user_project_id='aproject',
+                                 convergence=True)
+        self.stack.store()
+        with mock.patch('heat.rpc.worker_client.WorkerClient'):
+            self.stack.converge_stack()
+        self.traversal = self.stack.current_traversal
+
+        self.thread_group_mgr = mock.Mock()
+        self.thread_group_mgr.start.side_effect = self._run_thread
+        self.worker = worker.WorkerService('host-1', 'topic-1', 'engine_id',
+                                           self.thread_group_mgr)
+        self.worker._rpc_client = mock.Mock()
+
+    @staticmethod
+    def _run_thread(stack_id, func, *args, **kwargs):
+        func(*args, **kwargs)
+
+    def _load_stack(self):
+        return stack.Stack.load(self.ctx, stack_id=self.stack.id)
+
+    def _output(self, rsrc):
+        # GenericResource never sets a resource_id
+        return {'resource_id': None, 'action': rsrc.CREATE,
+                'status': rsrc.COMPLETE}
+
+    def test_check_resource_waits_for_all_requirements(self):
+        rsrc_a = self.stack['A']
+        self.worker.check_resource(self.ctx, rsrc_a.id, self.traversal, {},
+                                   False)
+
+        self.assertEqual((rsrc_a.CREATE, rsrc_a.COMPLETE),
+                         self._load_stack()['A'].state)
+        # C still requires B, so nothing is propagated yet
+        self.assertFalse(self.worker._rpc_client.check_resource.called)
+        sp = sync_point.get(self.ctx, self.stack['C'].id, self.traversal,
+                            False)
+        self.assertEqual({str(rsrc_a.id): self._output(rsrc_a)},
+                         sp.input_data)
+
+    def test_check_resource_propagates(self):
+        rsrc_a = self.stack['A']
+        rsrc_b = self.stack['B']
+        rsrc_c = self.stack['C']
+        self.worker.check_resource(self.ctx, rsrc_a.id, self.traversal, {},
+                                   False)
+        self.worker.check_resource(self.ctx, rsrc_b.id, self.traversal, {},
+                                   False)
+
+        self.worker._rpc_client.check_resource.assert_called_once_with(
+            self.ctx, rsrc_c.id, self.traversal,
+            {str(rsrc_a.id): self._output(rsrc_a),
+             str(rsrc_b.id): self._output(rsrc_b)}, False)
+
+    def test_check_resource_completes_stack(self):
+        for name in ('A', 'B', 'C'):
+            self.worker.check_resource(self.ctx, self.stack[name].id,
+                                       self.traversal, {}, False)
+
+        stk = self._load_stack()
+        self.assertEqual((stk.CREATE, stk.COMPLETE), stk.state)
+        for name in ('A', 'B', 'C'):
+            self.assertEqual((stk.CREATE, stk.COMPLETE), stk[name].state)
+        self.assertRaises(exception.NotFound, sync_point.get, self.ctx,
+                          self.stack.id, self.traversal, False)
+
+    def test_check_resource_stale_traversal(self):
+        rsrc_a = self.stack['A']
+        self.worker.check_resource(self.ctx, rsrc_a.id, 'old-traversal', {},
+                                   False)
+
+        self.assertEqual((rsrc_a.INIT, rsrc_a.COMPLETE),
+                         self._load_stack()['A'].state)
+        self.assertFalse(self.worker._rpc_client.check_resource.called)
+
+    def test_check_resource_failure(self):
+        self.patchobject(generic_rsrc.GenericResource, 'handle_create',
+                         side_effect=Exception('boom'))
+        self.worker.check_resource(self.ctx, self.stack['A'].id,
+                                   self.traversal, {}, False)
+
+        stk = self._load_stack()
+        self.assertEqual((stk.CREATE, stk.FAILED), stk.state)
+        self.assertIsNone(stk.current_traversal)
+        self.assertFalse(self.worker._rpc_client.check_resource.called)
+
+        # The other branches are abandoned
+        self.worker.check_resource(self.ctx, self.stack['B'].id,
+                                   self.traversal, {}, False)
+        rsrc_b = self._load_stack()['B']
+        self.assertEqual((rsrc_b.INIT, rsrc_b.COMPLETE), rsrc_b.state)
+
+    def test_check_resource_unexpected_error(self):
+        self.patchobject(sync_point, 'sync', side_effect=KeyError('boom'))
+        self.worker.check_resource(self.ctx, self.stack['A'].id,
+                                   self.traversal, {}, False)
+
+        stk = self._load_stack()
+        self.assertEqual((stk.CREATE, stk.FAILED), stk.state)
+        self.assertIsNone(stk.current_traversal)
+
+    def test_check_resource_traversal_timed_out(self):
+        self.patchobject(stack.Stack, 'time_remaining', return_value=0)
+        self.worker.check_resource(self.ctx, self.stack['A'].id,
+                                   self.traversal, {}, False)
+
+        stk = self._load_stack()
+        self.assertEqual((stk.CREATE, stk.FAILED), stk.state)
+        db_stack = db_api.stack_get(self.ctx, self.stack.id)
+        self.assertIn('Timed out', db_stack.status_reason)
+        rsrc_a = stk['A']
+        self.assertEqual((rsrc_a.INIT, rsrc_a.COMPLETE), rsrc_a.state)
+
+    def test_check_resource_gets_remaining_time(self):
+        self.patchobject(stack.Stack, 'time_remaining', return_value=42)
+        mock_runner = self.patchobject(worker.scheduler, 'TaskRunner')
+        self.worker.check_resource(self.ctx, self.stack['A'].id,
+                                   self.traversal, {}, False)
+
+        mock_runner.return_value.assert_called_once_with(timeout=42)
+
+    def test_check_resource_cancelled_during_sync(self):
+        def cancel(*args):
+            # Another branch fails the traversal and removes its sync points
+            stack_object.Stack.update_by_id(self.ctx, self.stack.id,
+                                            {'current_traversal': None})
+            sync_point.delete_all(self.ctx, self.stack.id, self.traversal)
+            raise exception.NotFound()
+
+        self.patchobject(sync_point, 'sync', side_effect=cancel)
+        self.worker.check_resource(self.ctx, self.stack['A'].id,
+                                   self.traversal, {}, False)
+
+        stk = self._load_stack()
+        self.assertEqual((stk.CREATE, stk.IN_PROGRESS), stk.state)
+
+    def test_check_resource_in_thread(self):
+        self.thread_group_mgr.start.side_effect = None
+        rsrc_a = self.stack['A']
+        self.worker.check_resource(self.ctx, rsrc_a.id, self.traversal, {},
+                                   False)
+
+        self.thread_group_mgr.start.assert_called_once_with(
+            self.stack.id, self.worker._process_resource, self.ctx, mock.ANY,
+            mock.ANY, self.traversal, False)
+        self.assertEqual((rsrc_a.INIT, rsrc_a.COMPLETE),
+                         self._load_stack()['A'].state)
+
+    def test_check_resource_loads_stack_once(self):
+        mock_load = self.patchobject(stack.Stack, 'load',
+                                     side_effect=stack.Stack.load)
+        for name in ('A', 'B'):
+            self.worker.check_resource(self.ctx, self.stack[name].id,
+                                       self.traversal, {}, False)
+
+        self.assertEqual(1, mock_load.call_count)
+
+    def test_load_resource_applies_input_data(self):
+        rsrc_a = self.stack['A']
+        data = {str(rsrc_a.id): {'resource_id': 'phys-a',
+                                 'action': rsrc_a.CREATE,
+                                 'status': rsrc_a.COMPLETE}}
+
+        rsrc, stk = self.worker._load_resource(self.ctx, self.stack['C'].id,
+                                               self.traversal, data)
+        self.assertEqual('C', rsrc.name)
+        self.assertEqual('phys-a', stk['A'].resource_id)
+        self.assertEqual((rsrc_a.CREATE, rsrc_a.COMPLETE), stk['A'].state)
+
+    def test_converge_stack_is_not_update(self):
+        with mock.patch('heat.rpc.worker_client.WorkerClient') as client:
+            tpl = {'HeatTemplateFormatVersion': '2012-12-12',
+                   'Resources': {'A': {'Type': 'GenericResourceType'}}}
+            stk = stack.Stack(self.ctx, 'converge_create_test',
+                              template.Template(tpl),
+                              stack_user_project_id='aproject',
+                              convergence=True)
+            stk.store()
+            stk.converge_stack()
+
+        client.return_value.check_resource.assert_called_once_with(
+            self.ctx, stk['A'].id, stk.current_traversal, {}, False)
+        self.assertIsNotNone(sync_point.get(self.ctx, stk.id,
+                                            stk.current_traversal, False))
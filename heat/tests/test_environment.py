@@ -142,6 +142,25 @@ class EnvironmentTest(common.HeatTestCase):
                          env.get_resource_info('OS::Networking::FloatingIP',
                                                'my_fip').name)
 
+    def test_get_types_cached(self):
+        registry = environment.ResourceRegistry(None, {})
+        registry.register_class('CloudX::Nova::Server',
+                                generic_resource.GenericResource)
+        with mock.patch.object(registry, '_get_types',
+                               wraps=registry._get_types) as get_types:
+            self.assertEqual(['CloudX::Nova::Server'],
+                             registry.get_types(None))
+            self.assertEqual(['CloudX::Nova::Server'],
+                             registry.get_types(None))
+            self.assertEqual(1, get_types.call_count)
+
+            registry.register_class('CloudX::Nova::Port',
+                                    generic_resource.GenericResource)
+            self.assertEqual(set(['CloudX::Nova::Server',
+                                  'CloudX::Nova::Port']),
+                             set(registry.get_types(None)))
+            self.assertEqual(2, get_types.call_count)
+
     def test_resource_sort_order_len(self):
         new_env = {u'resource_registry': {u'resources': {u'my_fip': {
             u'OS::Networking::FloatingIP': 'ip.yaml'}}},
@@ -223,6 +242,21 @@ def constraint_mapping():
                          env.get_constraint("nova.flavor").__name__)
         self.assertIs(None, env.get_constraint("no_constraint"))
 
+    def test_constraint_plugins(self):
+        env = environment.Environment({})
+        plugins = mock.Mock()
+        plugins.get.side_effect = lambda name: {'plugin': 'lazy'}.get(name)
+        env.register_constraint_plugins(plugins)
+        env.register_constraint('plugin', 'registered')
+
+        self.assertEqual('registered', env.get_constraint('plugin'))
+        self.assertFalse(plugins.get.called)
+        self.assertIsNone(env.get_constraint('no_constraint'))
+        plugins.get.assert_called_once_with('no_constraint')
+
+        env.constraints.pop('plugin')
+        self.assertEqual('lazy', env.get_constraint('plugin'))
+
 
 class EnvironmentDuplicateTest(common.HeatTestCase):
 
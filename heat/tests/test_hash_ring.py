@@ -0,0 +1,56 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from heat.common import hash_ring
+from heat.tests import common
+
+
+class HashRingTest(common.HeatTestCase):
+
+    keys = ['stack-%d' % i for i in range(1000)]
+
+    def test_empty(self):
+        ring = hash_ring.HashRing([])
+        self.assertEqual(0, len(ring))
+        self.assertIsNone(ring.get_node('stack-1'))
+
+    def test_single_node(self):
+        ring = hash_ring.HashRing(['engine-1'])
+        self.assertEqual(set(['engine-1']),
+                         set(ring.get_node(k) for k in self.keys))
+
+    def test_deterministic(self):
+        nodes = ['engine-1', 'engine-2', 'engine-3']
+        ring1 = hash_ring.HashRing(nodes)
+        ring2 = hash_ring.HashRing(reversed(nodes))
+        self.assertEqual([ring1.get_node(k) for k in self.keys],
+                         [ring2.get_node(k) for k in self.keys])
+
+    def test_distribution(self):
+        nodes = ['engine-%d' % i for i in range(4)]
+        ring = hash_ring.HashRing(nodes)
+        counts = dict((n, 0) for n in nodes)
+        for k in self.keys:
+            counts[ring.get_node(k)] += 1
+        for n in nodes:
+            self.assertTrue(counts[n] > 100, counts)
+
+    def test_add_node_moves_few_keys(self):
+        nodes = ['engine-%d' % i for i in range(4)]
+        before = hash_ring.HashRing(nodes)
+        after = hash_ring.HashRing(nodes + ['engine-4'])
+        moved = [k for k in self.keys
+                 if before.get_node(k) != after.get_node(k)]
+        # Only keys taken over by the new node move
+        self.assertTrue(all(after.get_node(k) == 'engine-4' for k in moved))
+        self.assertTrue(len(moved) < len(self.keys) / 2)
@@ -104,10 +104,10 @@ class TestInstanceGroup(common.HeatTestCase):
     def test_update_in_failed(self):
         self.instance_group.state_set('CREATE', 'FAILED')
         # to update the failed instance_group
-        self.instance_group.resize = mock.Mock(return_value=None)
+        self.instance_group._resize = mock.Mock(return_value=None)
 
         self.instance_group.handle_update(self.defn, None, None)
-        self.instance_group.resize.assert_called_once_with(2)
+        self.instance_group._resize.assert_called_once_with(2)
 
     def test_handle_delete(self):
         self.instance_group.delete_nested = mock.Mock(return_value=None)
@@ -116,7 +116,7 @@ class TestInstanceGroup(common.HeatTestCase):
 
     def test_handle_update_size(self):
         self.instance_group._try_rolling_update = mock.Mock(return_value=None)
-        self.instance_group.resize = mock.Mock(return_value=None)
+        self.instance_group._resize = mock.Mock(return_value=None)
 
         props = {'Size': 5}
         defn = rsrc_defn.ResourceDefinition(
@@ -125,7 +125,73 @@ class TestInstanceGroup(common.HeatTestCase):
             props)
 
         self.instance_group.handle_update(defn, None, props)
-        self.instance_group.resize.assert_called_once_with(5)
+        self.instance_group._resize.assert_called_once_with(5)
+
+    def test_handle_update_rolling_task(self):
+        steps = []
+
+        def replace():
+            for i in range(2):
+                steps.append(i)
+                yield
+
+        self.instance_group._try_rolling_update = mock.Mock(
+            return_value=replace())
+        self.instance_group._resize = mock.Mock(return_value=None)
+
+        props = {'Size': 5}
+        defn = rsrc_defn.ResourceDefinition(
+            'nopayload',
+            'AWS::AutoScaling::AutoScalingGroup',
+            props)
+
+        updater = self.instance_group.handle_update(defn, None, props)
+        self.assertEqual([0], steps)
+        self.assertFalse(self.instance_group._resize.called)
+
+        while not updater.step():
+            pass
+        self.assertEqual([0, 1], steps)
+        self.instance_group._resize.assert_called_once_with(5)
+
+    def test_handle_update_cancel(self):
+        closed = []
+
+        def replace():
+            try:
+                while True:
+                    yield
+            except GeneratorExit:
+                closed.append(True)
+                raise
+
+        self.instance_group._try_rolling_update = mock.Mock(
+            return_value=replace())
+        self.instance_group._resize = mock.Mock(return_value=None)
+
+        props = {'Size': 5}
+        defn = rsrc_defn.ResourceDefinition(
+            'nopayload',
+            'AWS::AutoScaling::AutoScalingGroup',
+            props)
+
+        updater = self.instance_group.handle_update(defn, None, props)
+        self.instance_group.handle_update_cancel(updater)
+
+        self.assertTrue(updater.done())
+        self.assertEqual([True], closed)
+        self.assertFalse(self.instance_group._resize.called)
+
+    def test_check_for_completion_cancels_nested_update(self):
+        nested_updater = mock.Mock(spec=scheduler.TaskRunner)
+        self.patchobject(self.instance_group, 'check_update_complete',
+                         return_value=False)
+        checker = scheduler.TaskRunner(
+            self.instance_group._check_for_completion, nested_updater)
+        checker.start()
+        checker.cancel()
+
+        nested_updater.cancel.assert_called_once_with()
 
     def test_attributes(self):
         mock_members = self.patchobject(grouputils, 'get_members')
@@ -368,7 +434,8 @@ class ReplaceTest(common.HeatTestCase):
         return utils.parse_stack(template_format.parse(nested_t))
 
     def test_rolling_updates(self):
-        self.group._replace(self.min_in_service, self.batch_size, 0)
+        scheduler.TaskRunner(self.group._replace, self.min_in_service,
+                             self.batch_size, 0)()
         self.assertEqual(self.updates,
                          len(self.group.update_with_template.call_args_list))
         self.assertEqual(self.updates + 1,
@@ -20,6 +20,7 @@ from heat.common import template_format
 from heat.engine import function
 from heat.engine.resources.openstack.heat import instance_group as instgrp
 from heat.engine import rsrc_defn
+from heat.engine import scheduler
 from heat.tests import common
 from heat.tests import utils
 from heat.tests.v1_1 import fakes as fakes_v1_1
@@ -264,7 +265,7 @@ class InstanceGroupTest(common.HeatTestCase):
             properties=updated_grp.t['Properties'],
             update_policy=updated_policy)
         current_grp._try_rolling_update = mock.MagicMock()
-        current_grp.resize = mock.MagicMock()
+        current_grp._resize = mock.MagicMock(return_value=None)
         current_grp.handle_update(update_snippet, tmpl_diff, None)
         if updated_policy is None:
             self.assertEqual({}, current_grp.update_policy.data)
@@ -311,4 +312,4 @@ class InstanceGroupReplaceTest(common.HeatTestCase):
         group = instgrp.InstanceGroup('asg', defn, stack)
         group.nested = mock.MagicMock(return_value=range(12))
         self.assertRaises(ValueError,
-                          group._replace, 10, 1, 14 * 60)
+                          scheduler.TaskRunner(group._replace, 10, 1, 14 * 60))
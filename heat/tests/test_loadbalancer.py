@@ -12,6 +12,7 @@
 #    under the License.
 
 import copy
+import json
 
 import mock
 from oslo_config import cfg
@@ -360,3 +361,35 @@ backend servers
     server server1 192.168.1.1:1234 check inter 2s fall 5 rise 1
     server server2 192.168.1.2:1234 check inter 2s fall 5 rise 1'''
         self.assertEqual(exp.replace('\n', '', 1), actual)
+
+    def test_instance_addresses_cached(self):
+        self.lb.id = 42
+        known = {'1': '192.168.1.1', '3': '192.168.1.3'}
+        self.lb.data = mock.Mock(
+            return_value={'instance_addresses': json.dumps(known)})
+        self.lb.data_set = mock.Mock()
+        to_ip = self.lb.client_plugin.return_value.server_to_ipaddress
+        to_ip.side_effect = ['192.168.1.2', None]
+
+        actual = self.lb._instance_addresses(['1', '2', '4'])
+        self.assertEqual(['192.168.1.1', '192.168.1.2', '0.0.0.0'], actual)
+        self.assertEqual([mock.call('2'), mock.call('4')],
+                         to_ip.call_args_list)
+        self.assertEqual(1, self.lb.data_set.call_count)
+        key, value = self.lb.data_set.call_args[0]
+        self.assertEqual('instance_addresses', key)
+        self.assertEqual({'1': '192.168.1.1', '2': '192.168.1.2'},
+                         json.loads(value))
+
+    def test_instance_addresses_unchanged(self):
+        self.lb.id = 42
+        known = {'1': '192.168.1.1', '2': '192.168.1.2'}
+        self.lb.data = mock.Mock(
+            return_value={'instance_addresses': json.dumps(known)})
+        self.lb.data_set = mock.Mock()
+        to_ip = self.lb.client_plugin.return_value.server_to_ipaddress
+
+        actual = self.lb._instance_addresses(['1', '2'])
+        self.assertEqual(['192.168.1.1', '192.168.1.2'], actual)
+        self.assertFalse(to_ip.called)
+        self.assertFalse(self.lb.data_set.called)
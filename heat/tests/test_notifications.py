@@ -11,9 +11,14 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+
+import eventlet
 import mock
+from oslo_config import cfg
 from oslo_utils import timeutils
 
+from heat.common import messaging
 from heat.engine import notification
 from heat.tests import common
 from heat.tests import utils
@@ -118,3 +123,93 @@ class AutoScaleTest(common.HeatTestCase):
              'state': 'x_f', 'adjustment_type': 'y',
              'groupname': 'c', 'capacity': '5',
              'message': 'error', 'adjustment': 'x'})
+
+
+class NotifyTest(common.HeatTestCase):
+
+    def setUp(self):
+        super(NotifyTest, self).setUp()
+        self.ctx = utils.dummy_context()
+        self.patchobject(notification, '_queue', new=None)
+        self.patchobject(notification, '_stats',
+                         new=collections.Counter())
+        self.patchobject(notification, '_get_default_publisher',
+                         return_value='orchestration.test')
+        self.notifier = mock.Mock()
+        self.get_notifier = self.patchobject(messaging, 'get_notifier',
+                                             return_value=self.notifier)
+
+    def test_notify_synchronous(self):
+        cfg.CONF.set_override('notification_queue_size', 0)
+        notification.notify(self.ctx, 'stack.create.end', 'INFO', {'a': 1})
+
+        self.get_notifier.assert_called_once_with('orchestration.test')
+        self.notifier.info.assert_called_once_with(
+            self.ctx, 'orchestration.stack.create.end', {'a': 1})
+        self.assertEqual(1, notification.get_stats()['sent'])
+
+    def test_notify_background(self):
+        notification.notify(self.ctx, 'stack.create.end', 'INFO', {'a': 1})
+        self.assertFalse(self.notifier.info.called)
+        self.assertEqual(1, notification.get_stats()['queued'])
+
+        eventlet.sleep(0)
+        self.notifier.info.assert_called_once_with(
+            self.ctx, 'orchestration.stack.create.end', {'a': 1})
+        stats = notification.get_stats()
+        self.assertEqual(1, stats['sent'])
+        self.assertEqual(0, stats['queued'])
+
+    def test_notify_background_failure(self):
+        self.notifier.error.side_effect = Exception('broker down')
+        notification.notify(self.ctx, 'stack.create.error', 'ERROR', {})
+        notification.notify(self.ctx, 'stack.create.end', 'INFO', {})
+
+        eventlet.sleep(0)
+        stats = notification.get_stats()
+        self.assertEqual(1, stats['failed'])
+        self.assertEqual(1, stats['sent'])
+
+    def test_notify_queue_full_drops(self):
+        cfg.CONF.set_override('notification_queue_size', 1)
+        self.patchobject(eventlet, 'spawn_n')
+        notification.notify(self.ctx, 'stack.create.start', 'INFO', {})
+        notification.notify(self.ctx, 'stack.create.end', 'INFO', {})
+
+        stats = notification.get_stats()
+        self.assertEqual(1, stats['queued'])
+        self.assertEqual(1, stats['dropped'])
+        self.assertEqual(0, stats['sent'])
+
+    def test_flush(self):
+        notification.notify(self.ctx, 'stack.create.start', 'INFO', {})
+        notification.notify(self.ctx, 'stack.create.end', 'INFO', {})
+
+        self.assertEqual(0, notification.flush(1))
+        self.assertEqual(2, self.notifier.info.call_count)
+        self.assertEqual(2, notification.get_stats()['sent'])
+
+    def test_flush_timeout(self):
+        self.patchobject(eventlet, 'spawn_n')
+        notification.notify(self.ctx, 'stack.create.start', 'INFO', {})
+
+        self.assertEqual(1, notification.flush(0.01))
+        self.assertFalse(self.notifier.info.called)
+
+    def test_flush_nothing_queued(self):
+        self.assertEqual(0, notification.flush(1))
+
+
+class GetNotifierTest(common.HeatTestCase):
+
+    def test_get_notifier_cached(self):
+        prepare = self.patchobject(messaging.NOTIFIER, 'prepare')
+        first = messaging.get_notifier('orchestration.test')
+        second = messaging.get_notifier('orchestration.test')
+        other = messaging.get_notifier('orchestration.other')
+
+        self.assertIs(first, second)
+        self.assertEqual([mock.call(publisher_id='orchestration.test'),
+                          mock.call(publisher_id='orchestration.other')],
+                         prepare.call_args_list)
+        self.assertIs(prepare.return_value, other)
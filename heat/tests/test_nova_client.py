@@ -17,6 +17,7 @@ import uuid
 
 import mock
 from novaclient import exceptions as nova_exceptions
+from novaclient.v2 import servers
 from oslo_config import cfg
 import six
 
@@ -205,6 +206,94 @@ class NovaUtilsRefreshServerTests(NovaClientPluginTestCase):
         server.get.assert_called_once_with()
 
 
+class NovaServerListingRefreshTests(NovaClientPluginTestCase):
+
+    def setUp(self):
+        super(NovaServerListingRefreshTests, self).setUp()
+        self.manager = self.nova_client.servers
+        self.server_a = self._server('a', 'BUILD', '2015-01-01T00:00:02Z')
+        self.server_b = self._server('b', 'BUILD', '2015-01-01T00:00:01Z')
+        self.manager.get.side_effect = lambda server_id: {
+            'a': self.server_a, 'b': self.server_b}[server_id]
+        self.manager.list.side_effect = lambda **kwargs: [
+            self._server(s.id, s.status, s.updated)
+            for s in (self.server_a, self.server_b)]
+
+    def _server(self, server_id, status, updated):
+        return servers.Server(self.manager, {'id': server_id,
+                                             'name': server_id,
+                                             'status': status,
+                                             'updated': updated},
+                              loaded=True)
+
+    def _refresh_all(self):
+        for server in (self.server_a, self.server_b):
+            self.nova_plugin.refresh_server(server)
+
+    def test_refresh_from_listing(self):
+        self._refresh_all()
+        self.assertEqual(2, self.manager.get.call_count)
+        self.assertFalse(self.manager.list.called)
+
+        self.manager.list.side_effect = None
+        self.manager.list.return_value = [
+            self._server('a', 'ACTIVE', '2015-01-01T00:00:05Z'),
+            self._server('b', 'BUILD', '2015-01-01T00:00:05Z')]
+        self._refresh_all()
+        self.assertEqual('ACTIVE', self.server_a.status)
+        self.assertEqual('2015-01-01T00:00:05Z', self.server_b.updated)
+        self.assertEqual(2, self.manager.get.call_count)
+        self.manager.list.assert_called_once_with(
+            detailed=True,
+            search_opts={'changes-since': '2015-01-01T00:00:01Z'})
+
+        # Only server b is still pending, so it is refreshed on its own
+        self.nova_plugin.refresh_server(self.server_b)
+        self.assertEqual(3, self.manager.get.call_count)
+        self.assertEqual(1, self.manager.list.call_count)
+
+    def test_refresh_from_listing_once_per_round(self):
+        for i in range(4):
+            self._refresh_all()
+        self.assertEqual(3, self.manager.list.call_count)
+        self.assertEqual(2, self.manager.get.call_count)
+
+    def test_refresh_missing_from_listing(self):
+        self._refresh_all()
+        self.manager.list.side_effect = None
+        self.manager.list.return_value = [
+            self._server('a', 'DELETED', '2015-01-01T00:00:05Z')]
+        self._refresh_all()
+        self.assertEqual(4, self.manager.get.call_count)
+
+    def test_refresh_listing_over_limit(self):
+        self._refresh_all()
+        list_servers = self.manager.list.side_effect
+        self.manager.list.side_effect = nova_exceptions.OverLimit(413)
+        self._refresh_all()
+        self.assertEqual(1, self.manager.list.call_count)
+        self.assertEqual(2, self.manager.get.call_count)
+
+        self.manager.list.side_effect = list_servers
+        self._refresh_all()
+        self.assertEqual(2, self.manager.list.call_count)
+        self.assertEqual(2, self.manager.get.call_count)
+
+    def test_refresh_forgets_servers_not_polled(self):
+        self._refresh_all()
+        self.nova_plugin.refresh_server(self.server_a)
+        self.nova_plugin.refresh_server(self.server_a)
+        self.assertEqual(2, self.manager.list.call_count)
+        self.manager.list.assert_called_with(
+            detailed=True,
+            search_opts={'changes-since': '2015-01-01T00:00:02Z'})
+        self.assertNotIn('b', self.nova_plugin._server_batcher)
+
+        self.nova_plugin.refresh_server(self.server_a)
+        self.assertEqual(2, self.manager.list.call_count)
+        self.assertEqual(3, self.manager.get.call_count)
+
+
 class NovaUtilsUserdataTests(NovaClientPluginTestCase):
 
     def test_build_userdata(self):
@@ -252,6 +341,44 @@ class NovaUtilsUserdataTests(NovaClientPluginTestCase):
         self.assertNotIn('config_instance_user', data)
         self.assertIn("custominstanceuser", data)
 
+    def _patch_caches(self):
+        self.patchobject(nova, '_cloudinit_files', new={})
+        self.patchobject(nova, '_cloudinit_templates', new={})
+        self.patchobject(nova, '_userdata_cache',
+                         new=collections.OrderedDict())
+
+    def test_build_userdata_cached(self):
+        self._patch_caches()
+        get_data = self.patchobject(nova.pkgutil, 'get_data',
+                                    return_value='$add_custom_user')
+
+        data = self.nova_plugin.build_userdata({'a': 1}, 'script')
+        self.assertEqual(4, get_data.call_count)
+        self.assertIs(data, self.nova_plugin.build_userdata({'a': 1},
+                                                            'script'))
+
+        other = self.nova_plugin.build_userdata({'a': 1}, 'other script')
+        self.assertIn('other script', other)
+        self.assertNotEqual(data, other)
+        self.assertIn('useradd -m ec2-user',
+                      self.nova_plugin.build_userdata(
+                          {'a': 1}, 'script', instance_user='ec2-user'))
+        self.assertEqual(4, get_data.call_count)
+        self.assertEqual(3, len(nova._userdata_cache))
+
+    def test_build_userdata_cache_size(self):
+        self._patch_caches()
+        self.patchobject(nova, 'USERDATA_CACHE_SIZE', new=2)
+
+        first = self.nova_plugin.build_userdata({}, 'one')
+        self.nova_plugin.build_userdata({}, 'two')
+        self.assertIs(first, self.nova_plugin.build_userdata({}, 'one'))
+        self.nova_plugin.build_userdata({}, 'three')
+
+        self.assertEqual(2, len(nova._userdata_cache))
+        self.assertIs(first, self.nova_plugin.build_userdata({}, 'one'))
+        self.assertIsNot(first, self.nova_plugin.build_userdata({}, 'two'))
+
 
 class NovaUtilsMetadataTests(NovaClientPluginTestCase):
 
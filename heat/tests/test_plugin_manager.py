@@ -14,6 +14,7 @@
 import sys
 import types
 
+import mock
 import six
 
 from heat.engine import plugin_manager
@@ -114,3 +115,36 @@ class TestPluginManager(common.HeatTestCase):
 
         for item in six.iteritems(current_test_mapping()):
             self.assertIn(item, all_items)
+
+
+class TestEntryPointPlugins(common.HeatTestCase):
+
+    def setUp(self):
+        super(TestEntryPointPlugins, self).setUp()
+        self.good = mock.Mock()
+        self.good.name = 'good'
+        self.bad = mock.Mock()
+        self.bad.name = 'bad'
+        self.bad.resolve.side_effect = ImportError('no such module')
+        self.patchobject(plugin_manager.pkg_resources, 'iter_entry_points',
+                         return_value=[self.good, self.bad])
+        self.plugins = plugin_manager.EntryPointPlugins('heat.test')
+
+    def test_load_on_demand(self):
+        self.assertEqual(set(['good', 'bad']), set(self.plugins.names()))
+        self.assertFalse(self.good.resolve.called)
+
+        self.assertIs(self.good.resolve.return_value,
+                      self.plugins.get('good'))
+        self.assertIs(self.good.resolve.return_value,
+                      self.plugins.get('good'))
+        self.good.require.assert_called_once_with()
+        self.good.resolve.assert_called_once_with()
+        self.assertFalse(self.bad.resolve.called)
+
+    def test_load_failure(self):
+        self.assertIsNone(self.plugins.get('bad'))
+        self.assertEqual(['good'], self.plugins.names())
+
+    def test_load_non_existent(self):
+        self.assertIsNone(self.plugins.get('missing'))
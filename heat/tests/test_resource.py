@@ -16,6 +16,7 @@ import json
 import uuid
 
 import mock
+import mox
 from oslo_config import cfg
 import six
 
@@ -345,6 +346,112 @@ class ResourceTest(common.HeatTestCase):
         self.assertEqual(res.COMPLETE, db_res.status)
         self.assertEqual('test_update', db_res.status_reason)
 
+    def test_store_or_update_does_not_read(self):
+        tmpl = rsrc_defn.ResourceDefinition('test_resource', 'Foo')
+        res = generic_rsrc.GenericResource('test_res_upd', tmpl, self.stack)
+        res._store_or_update(res.CREATE, res.IN_PROGRESS, 'test_store')
+
+        self.m.StubOutWithMock(resource_objects.Resource, 'get_obj')
+        self.m.ReplayAll()
+        res._store_or_update(res.CREATE, res.COMPLETE, 'test_update')
+        res.resource_id_set('phys-id')
+        self.m.VerifyAll()
+        self.m.UnsetStubs()
+
+        db_res = resource_objects.Resource.get_obj(res.context, res.id)
+        self.assertEqual(res.COMPLETE, db_res.status)
+        self.assertEqual('phys-id', db_res.nova_instance)
+        self.assertEqual(2, db_res.atomic_key)
+
+    def test_store_or_update_concurrent_modification(self):
+        tmpl = rsrc_defn.ResourceDefinition('test_resource', 'Foo')
+        res = generic_rsrc.GenericResource('test_res_upd', tmpl, self.stack)
+        res._store_or_update(res.CREATE, res.IN_PROGRESS, 'test_store')
+        resource_objects.Resource.update_by_id(res.context, res.id,
+                                               {'status_reason': 'other'},
+                                               res._atomic_key)
+
+        res._store_or_update(res.CREATE, res.COMPLETE, 'test_update')
+        db_res = resource_objects.Resource.get_obj(res.context, res.id)
+        self.assertEqual(res.COMPLETE, db_res.status)
+        self.assertEqual('test_update', db_res.status_reason)
+        self.assertEqual(2, db_res.atomic_key)
+        self.assertEqual(2, res._atomic_key)
+
+    def test_update_stored_concurrent_modification_fails(self):
+        tmpl = rsrc_defn.ResourceDefinition('test_resource', 'Foo')
+        res = generic_rsrc.GenericResource('test_res_upd', tmpl, self.stack)
+        res._store_or_update(res.CREATE, res.IN_PROGRESS, 'test_store')
+        atomic_key = res._atomic_key
+        update = self.patchobject(resource_objects.Resource, 'update_by_id',
+                                  return_value=False)
+
+        self.assertRaises(exception.ConcurrentTransaction,
+                          res._update_stored, {'status': res.COMPLETE})
+        self.assertEqual(res.STORE_ATTEMPTS, update.call_count)
+        self.assertEqual(atomic_key, res._atomic_key)
+
+    def test_store_or_update_concurrent_modification_fails(self):
+        tmpl = rsrc_defn.ResourceDefinition('test_resource', 'Foo')
+        res = generic_rsrc.GenericResource('test_res_upd', tmpl, self.stack)
+        res._store_or_update(res.CREATE, res.IN_PROGRESS, 'test_store')
+        self.patchobject(resource_objects.Resource, 'update_by_id',
+                         return_value=False)
+
+        self.assertRaises(exception.ConcurrentTransaction,
+                          res._store_or_update, res.CREATE, res.COMPLETE,
+                          'test_update')
+
+    def test_metadata_set_checks_atomic_key(self):
+        tmpl = rsrc_defn.ResourceDefinition('test_resource', 'Foo')
+        res = generic_rsrc.GenericResource('test_res_md', tmpl, self.stack)
+        res._store_or_update(res.CREATE, res.IN_PROGRESS, 'test_store')
+        res._store_or_update(res.CREATE, res.COMPLETE, 'test_update')
+
+        res.metadata_set({'foo': 'bar'})
+        db_res = resource_objects.Resource.get_obj(res.context, res.id)
+        self.assertEqual({'foo': 'bar'}, db_res.rsrc_metadata)
+        self.assertEqual(2, db_res.atomic_key)
+        self.assertEqual(2, res._atomic_key)
+
+    def test_load_data_decrypts_lazily(self):
+        tmpl = rsrc_defn.ResourceDefinition('test_resource', 'Foo')
+        res = generic_rsrc.GenericResource('test_res_data', tmpl, self.stack)
+        res._store()
+        res.data_set('test-key', 'test-value', redact=True)
+
+        self.stack._db_resources = None
+        self.m.StubOutWithMock(resource_data_object.ResourceData, 'get_all')
+        self.m.ReplayAll()
+        loaded = generic_rsrc.GenericResource('test_res_data', tmpl,
+                                              self.stack)
+        self.m.VerifyAll()
+        self.m.UnsetStubs()
+
+        self.m.StubOutWithMock(db_api, 'resource_data_get_all')
+        db_api.resource_data_get_all(
+            loaded, mox.IgnoreArg()).AndReturn({'test-key': 'test-value'})
+        self.m.ReplayAll()
+        self.assertEqual({'test-key': 'test-value'}, loaded.data())
+        self.assertEqual({'test-key': 'test-value'}, loaded.data())
+        self.m.VerifyAll()
+
+    def test_data_without_rows_is_cached(self):
+        tmpl = rsrc_defn.ResourceDefinition('test_resource', 'Foo')
+        res = generic_rsrc.GenericResource('test_res_data', tmpl, self.stack)
+        res._store()
+
+        self.stack._db_resources = None
+        loaded = generic_rsrc.GenericResource('test_res_data', tmpl,
+                                              self.stack)
+        self.m.StubOutWithMock(db_api, 'resource_data_get_all')
+        db_api.resource_data_get_all(
+            loaded, []).AndRaise(exception.NotFound('no resource data found'))
+        self.m.ReplayAll()
+        self.assertEqual({}, loaded.data())
+        self.assertEqual({}, loaded.data())
+        self.m.VerifyAll()
+
     def test_parsed_template(self):
         join_func = cfn_funcs.Join(None,
                                    'Fn::Join', [' ', ['bar', 'baz', 'quux']])
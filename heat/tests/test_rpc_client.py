@@ -233,6 +233,20 @@ class EngineRpcAPITestCase(testtools.TestCase):
         self._test_engine_api('stack_resume', 'call',
                               stack_identity=self.identity)
 
+    def test_nested_stack_action(self):
+        self._test_engine_api('nested_stack_action', 'call',
+                              stack_identity=self.identity,
+                              action='UPDATE',
+                              parent_resource_name='nested',
+                              template_id=42,
+                              timeout_mins=5,
+                              version='1.7')
+
+    def test_stop_nested_stack_action(self):
+        self._test_engine_api('stop_nested_stack_action', 'call',
+                              stack_identity=self.identity,
+                              version='1.8')
+
     def test_stack_cancel_update(self):
         self._test_engine_api('stack_cancel_update', 'call',
                               stack_identity=self.identity)
@@ -70,3 +70,19 @@ class WorkerClientTest(common.HeatTestCase):
         mock_rpc_client.cast.assert_called_once_with(mock_cnxt,
                                                      method,
                                                      **kwargs)
+
+    @mock.patch('heat.common.messaging.get_rpc_client',
+                return_value=mock.Mock())
+    def test_check_resource(self, rpc_client_method):
+        mock_rpc_client = rpc_client_method.return_value
+        worker_client = rpc_client.WorkerClient()
+        mock_cnxt = mock.Mock()
+
+        worker_client.check_resource(mock_cnxt, 42, 'traversal-1',
+                                     {'41': 'ref'}, True)
+
+        mock_rpc_client.prepare.assert_called_once_with(version='1.1')
+        mock_rpc_client.prepare.return_value.cast.assert_called_once_with(
+            mock_cnxt, 'check_resource', resource_id=42,
+            current_traversal='traversal-1', data={'41': 'ref'},
+            is_update=True)
@@ -716,6 +716,50 @@ class TaskTest(common.HeatTestCase):
         self.assertFalse(runner)
         self.assertTrue(runner.step())
 
+    def test_as_task(self):
+        steps = []
+
+        def task():
+            for i in range(3):
+                steps.append(i)
+                yield
+
+        @scheduler.wrappertask
+        def parent_task():
+            yield scheduler.TaskRunner(task).as_task()
+            steps.append('parent')
+
+        runner = scheduler.TaskRunner(parent_task)
+        runner.start()
+        self.assertEqual([0], steps)
+        while not runner.step():
+            pass
+        self.assertEqual([0, 1, 2, 'parent'], steps)
+
+    def test_as_task_timeout(self):
+        st = scheduler.wallclock()
+
+        def task():
+            while True:
+                yield
+
+        self.m.StubOutWithMock(scheduler, 'wallclock')
+        scheduler.wallclock().AndReturn(st)
+        scheduler.wallclock().AndReturn(st + 0.5)
+        scheduler.wallclock().AndReturn(st + 1.5)
+        self.m.ReplayAll()
+
+        subtask = scheduler.TaskRunner(task).as_task(timeout=1)
+        next(subtask)
+        self.assertRaises(scheduler.Timeout, next, subtask)
+
+    def test_as_task_cancel(self):
+        runner = scheduler.TaskRunner(DummyTask())
+        subtask = runner.as_task()
+        next(subtask)
+        subtask.close()
+        self.assertTrue(runner.done())
+
     def test_cancel_not_started(self):
         task = DummyTask(1)
 
@@ -12,18 +12,23 @@
 #    under the License.
 
 import datetime
+import gc
 import json
 import uuid
 
 import mock
 import mox
+from oslo_config import cfg
 from oslo_utils import timeutils
 import six
+import sqlalchemy
+from sqlalchemy import orm
 
 from heat.common import context
 from heat.common import exception
 from heat.common import template_format
 from heat.db.sqlalchemy import api as db_api
+from heat.db.sqlalchemy import models
 from heat.engine.clients.os import glance
 from heat.engine.clients.os import nova
 from heat.engine import environment
@@ -232,18 +237,17 @@ class SqlAlchemyTest(common.HeatTestCase):
         self.assertIn(['name', 'id'], args)
 
     @mock.patch.object(db_api.utils, 'paginate_query')
-    @mock.patch.object(db_api, 'model_query')
-    def test_paginate_query_gets_model_marker(self, mock_query,
-                                              mock_paginate_query):
+    def test_paginate_query_gets_model_marker(self, mock_paginate_query):
         query = mock.Mock()
         model = mock.Mock()
         marker = mock.Mock()
 
         mock_query_object = mock.Mock()
         mock_query_object.get.return_value = 'real_marker'
-        mock_query.return_value = mock_query_object
+        query.session.query.return_value = mock_query_object
 
         db_api._paginate_query(self.ctx, query, model, marker=marker)
+        query.session.query.assert_called_once_with(model)
         mock_query_object.get.assert_called_once_with(marker)
         args, _ = mock_paginate_query.call_args
         self.assertIn('real_marker', args)
@@ -552,6 +556,100 @@ class SqlAlchemyTest(common.HeatTestCase):
         db_api.stack_get_all(self.ctx, sort_keys=sort_keys)
         self.assertEqual(['id'], sort_keys)
 
+    def _setup_replica(self):
+        cfg.CONF.set_override('slave_connection', 'sqlite://',
+                              group='database')
+        engine = sqlalchemy.create_engine('sqlite://')
+        models.BASE.metadata.create_all(engine)
+        replica_session = orm.sessionmaker(bind=engine, autocommit=True,
+                                           expire_on_commit=False)
+        primary_session = db_api.get_session
+
+        def get_session(use_slave=False):
+            if use_slave:
+                return replica_session()
+            return primary_session()
+
+        self.patchobject(db_api, 'get_session', side_effect=get_session)
+        return replica_session()
+
+    def _create_replica_stack(self, session, stack_id, name):
+        with session.begin():
+            raw_template = models.RawTemplate(template={'resources': {}})
+            session.add(raw_template)
+            session.flush()
+            stack = models.Stack(id=stack_id, name=name,
+                                 tenant=self.ctx.tenant_id,
+                                 raw_template_id=raw_template.id,
+                                 disable_rollback=True)
+            session.add(stack)
+
+    def test_stack_get_all_use_slave(self):
+        replica = self._setup_replica()
+        [self._setup_test_stack('stack', x) for x in UUIDs]
+        for x in UUIDs:
+            self._create_replica_stack(replica, x, 'replica_%s' % x)
+        replica.expunge_all()
+
+        st_db = db_api.stack_get_all(self.ctx, marker=UUID2,
+                                     use_slave=True)
+        self.assertEqual(1, len(st_db))
+        self.assertEqual('replica_%s' % UUID1, st_db[0].name)
+
+        # The replica session is kept by the context, so relationships can
+        # still be loaded once the query has returned
+        gc.collect()
+        self.assertEqual({'resources': {}}, st_db[0].raw_template.template)
+        self.assertIs(self.ctx.slave_session, orm.object_session(st_db[0]))
+
+    def test_stack_get_use_slave(self):
+        replica = self._setup_replica()
+        self._create_replica_stack(replica, UUID1, 'replica')
+
+        st_db = db_api.stack_get(self.ctx, UUID1, use_slave=True)
+        self.assertEqual('replica', st_db.name)
+        self.assertIsNone(db_api.stack_get(self.ctx, UUID1))
+
+    def test_stack_get_use_slave_not_replicated(self):
+        self._setup_replica()
+        stack = self._setup_test_stack('stack', UUID1)[1]
+
+        st_db = db_api.stack_get(self.ctx, UUID1, use_slave=True)
+        self.assertEqual(stack.name, st_db.name)
+        self.assertIs(self.ctx.session, orm.object_session(st_db))
+
+    def test_resource_get_all_by_stack_use_slave(self):
+        replica = self._setup_replica()
+        self._create_replica_stack(replica, UUID1, 'replica')
+        with replica.begin():
+            replica.add(models.Resource(name='replica_res',
+                                        stack_id=UUID1))
+
+        resources = db_api.resource_get_all_by_stack(self.ctx, UUID1,
+                                                     use_slave=True)
+        self.assertEqual(['replica_res'], list(resources))
+        self.assertIs(self.ctx.slave_session,
+                      orm.object_session(resources['replica_res']))
+
+    def test_resource_get_all_by_stack_use_slave_not_replicated(self):
+        self._setup_replica()
+        stack = self._setup_test_stack('stack', UUID1)[1]
+        create_resource(self.ctx, stack, name='res1')
+
+        resources = db_api.resource_get_all_by_stack(self.ctx, UUID1,
+                                                     use_slave=True)
+        self.assertEqual(['res1'], list(resources))
+        self.assertIs(self.ctx.session,
+                      orm.object_session(resources['res1']))
+
+    def test_stack_get_all_use_slave_without_replica(self):
+        [self._setup_test_stack('stack', x)[1] for x in UUIDs]
+
+        with mock.patch.object(db_api, 'get_session') as mock_session:
+            st_db = db_api.stack_get_all(self.ctx, use_slave=True)
+        self.assertFalse(mock_session.called)
+        self.assertEqual(3, len(st_db))
+
     def test_stack_count_all(self):
         stacks = [self._setup_test_stack('stack', x)[1] for x in UUIDs]
 
@@ -1472,6 +1570,27 @@ class DBAPIStackTest(common.HeatTestCase):
                                                            parent_stack2.id)
         self.assertEqual(2, len(stack2_children))
 
+    def test_stack_get_nested_templates(self):
+        root = create_stack(self.ctx, self.template, self.user_creds)
+        child = create_stack(self.ctx, self.template, self.user_creds,
+                             owner_id=root.id)
+        grandchild = create_stack(self.ctx, self.template, self.user_creds,
+                                  owner_id=child.id)
+        create_stack(self.ctx, self.template, self.user_creds,
+                     owner_id=root.id, backup=True)
+        deleted = create_stack(self.ctx, self.template, self.user_creds,
+                               owner_id=root.id)
+        db_api.stack_delete(self.ctx, deleted.id)
+
+        self.assertEqual(
+            [self.template.template] * 2,
+            db_api.stack_get_nested_templates(self.ctx, root.id))
+        self.assertEqual(
+            [self.template.template],
+            db_api.stack_get_nested_templates(self.ctx, child.id))
+        self.assertEqual(
+            [], db_api.stack_get_nested_templates(self.ctx, grandchild.id))
+
     def test_stack_get_all_with_regular_tenant(self):
         values = [
             {'tenant': UUID1},
@@ -1564,6 +1683,50 @@ class DBAPIStackTest(common.HeatTestCase):
         self._deleted_stack_existance(utils.dummy_context(), stacks,
                                       (), (0, 1, 2, 3, 4))
 
+    def test_purge_deleted_dependents(self):
+        deleted_at = datetime.datetime.now() - datetime.timedelta(days=2)
+        live = create_stack(self.ctx, self.template, self.user_creds)
+        stacks = [create_stack(self.ctx, create_raw_template(self.ctx),
+                               creds, deleted_at=deleted_at)
+                  for creds in (self.user_creds,
+                                create_user_creds(self.ctx),
+                                create_user_creds(self.ctx))]
+        for stack in stacks:
+            rsrc = create_resource(self.ctx, stack)
+            rsrc.context = self.ctx
+            create_resource_data(self.ctx, rsrc)
+            create_event(self.ctx, stack_id=stack.id)
+            create_watch_data(self.ctx, create_watch_rule(self.ctx, stack))
+            db_api.snapshot_create(self.ctx, {'tenant': self.ctx.tenant_id,
+                                              'stack_id': stack.id})
+
+        self.assertEqual(3, db_api.purge_deleted(age=1, batch_size=2))
+
+        ctx = utils.dummy_context()
+
+        self._deleted_stack_existance(ctx, stacks, (), (0, 1, 2))
+        self.assertIsNotNone(db_api.stack_get(ctx, live.id))
+        for stack in stacks:
+            self.assertRaises(exception.NotFound, db_api.raw_template_get,
+                              ctx, stack.raw_template_id)
+            self.assertEqual([], db_api.event_get_all_by_stack(ctx,
+                                                               stack.id))
+        # Credentials still used by a live stack are kept
+        self.assertIsNotNone(db_api.user_creds_get(self.user_creds.id))
+        self.assertIsNone(db_api.user_creds_get(stacks[1].user_creds_id))
+        self.assertEqual([], db_api.watch_rule_get_all(ctx))
+        self.assertEqual([], db_api.watch_data_get_all(ctx))
+        self.assertEqual(
+            0, ctx.session.query(models.Resource).count())
+        self.assertEqual(
+            0, ctx.session.query(models.ResourceData).count())
+        self.assertEqual(
+            0, ctx.session.query(models.Snapshot).count())
+
+    def test_purge_deleted_invalid_batch_size(self):
+        self.assertRaises(exception.Error, db_api.purge_deleted,
+                          age=1, batch_size=0)
+
     def _deleted_stack_existance(self, ctx, stacks, existing, deleted):
         for s in existing:
             self.assertIsNotNone(db_api.stack_get(ctx, stacks[s].id,
@@ -1729,6 +1892,60 @@ class DBAPIStackLockTest(common.HeatTestCase):
         observed = db_api.stack_lock_release(self.stack.id, UUID2)
         self.assertTrue(observed)
 
+    def test_stack_lock_steal_expired_success(self):
+        cfg.CONF.set_override('stack_lock_lease', -10)
+        db_api.stack_lock_create(self.stack.id, UUID1)
+        cfg.CONF.clear_override('stack_lock_lease')
+        observed = db_api.stack_lock_steal_expired(self.stack.id, UUID2)
+        self.assertIsNone(observed)
+        self.assertEqual(UUID2, db_api.stack_lock_create(self.stack.id,
+                                                         UUID3))
+
+    def test_stack_lock_steal_expired_fail_leased(self):
+        db_api.stack_lock_create(self.stack.id, UUID1)
+        observed = db_api.stack_lock_steal_expired(self.stack.id, UUID2)
+        self.assertEqual(UUID1, observed)
+
+    def test_stack_lock_steal_expired_fail_gone(self):
+        db_api.stack_lock_create(self.stack.id, UUID1)
+        db_api.stack_lock_release(self.stack.id, UUID1)
+        observed = db_api.stack_lock_steal_expired(self.stack.id, UUID2)
+        self.assertTrue(observed)
+
+    def test_stack_lock_steal_expired_no_expiry(self):
+        session = db_api.get_session()
+        with session.begin():
+            session.add(models.StackLock(stack_id=self.stack.id,
+                                         engine_id=UUID1))
+        observed = db_api.stack_lock_steal_expired(self.stack.id, UUID2)
+        self.assertEqual(UUID1, observed)
+        self.assertFalse(db_api.stack_lock_has_lease(self.stack.id))
+
+    def test_stack_lock_has_lease(self):
+        self.assertFalse(db_api.stack_lock_has_lease(self.stack.id))
+        db_api.stack_lock_create(self.stack.id, UUID1)
+        self.assertTrue(db_api.stack_lock_has_lease(self.stack.id))
+
+    def test_stack_lock_held(self):
+        self.assertFalse(db_api.stack_lock_held(self.stack.id))
+        db_api.stack_lock_create(self.stack.id, UUID1)
+        self.assertTrue(db_api.stack_lock_held(self.stack.id))
+
+    def test_stack_lock_held_expired(self):
+        cfg.CONF.set_override('stack_lock_lease', -10)
+        db_api.stack_lock_create(self.stack.id, UUID1)
+        self.assertFalse(db_api.stack_lock_held(self.stack.id))
+
+    def test_stack_lock_renew(self):
+        cfg.CONF.set_override('stack_lock_lease', -10)
+        db_api.stack_lock_create(self.stack.id, UUID1)
+        cfg.CONF.clear_override('stack_lock_lease')
+
+        self.assertEqual(1, db_api.stack_lock_renew(UUID1))
+        self.assertEqual(0, db_api.stack_lock_renew(UUID2))
+        observed = db_api.stack_lock_steal_expired(self.stack.id, UUID2)
+        self.assertEqual(UUID1, observed)
+
 
 class DBAPIResourceDataTest(common.HeatTestCase):
     def setUp(self):
@@ -2109,6 +2326,23 @@ class DBAPIResourceUpdateTest(common.HeatTestCase):
         self.assertEqual('IN_PROGRESS', db_res.status)
         self.assertEqual(1, db_res.atomic_key)
 
+    def test_resource_update_without_atomic_key(self):
+        template = create_raw_template(self.ctx)
+        user_creds = create_user_creds(self.ctx)
+        stack = create_stack(self.ctx, template, user_creds)
+        resource = create_resource(self.ctx, stack)
+        self.assertIsNone(resource.atomic_key)
+
+        ret = db_api.resource_update(self.ctx, resource.id,
+                                     {'status': 'COMPLETE'}, None)
+        self.assertTrue(ret)
+        db_res = db_api.resource_get(self.ctx, resource.id)
+        self.assertEqual('COMPLETE', db_res.status)
+        self.assertEqual(1, db_res.atomic_key)
+        ret = db_api.resource_update(self.ctx, resource.id,
+                                     {'status': 'FAILED'}, None)
+        self.assertFalse(ret)
+
     def test_locked_resource_update_by_same_engine(self):
         values = {'engine_id': 'engine-1',
                   'action': 'CREATE',
@@ -2150,6 +2384,22 @@ class DBAPIResourceUpdateTest(common.HeatTestCase):
                                      values, db_res.atomic_key, 'engine-2')
         self.assertFalse(ret)
 
+    def test_locked_resource_update_without_engine(self):
+        values = {'engine_id': 'engine-1',
+                  'action': 'CREATE',
+                  'status': 'IN_PROGRESS'}
+        db_res = db_api.resource_get(self.ctx, self.resource.id)
+        ret = db_api.resource_update(self.ctx, self.resource.id,
+                                     values, db_res.atomic_key, None)
+        self.assertTrue(ret)
+        ret = db_api.resource_update(self.ctx, self.resource.id,
+                                     {'status': 'COMPLETE'}, 1)
+        self.assertTrue(ret)
+        db_res = db_api.resource_get(self.ctx, self.resource.id)
+        self.assertEqual('engine-1', db_res.engine_id)
+        self.assertEqual('COMPLETE', db_res.status)
+        self.assertEqual(2, db_res.atomic_key)
+
     def test_release_resource_lock(self):
         values = {'engine_id': 'engine-1',
                   'action': 'CREATE',
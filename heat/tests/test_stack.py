@@ -13,9 +13,11 @@
 
 import collections
 import copy
+import datetime
 import json
 import time
 
+import eventlet
 import mock
 import mox
 from oslo_config import cfg
@@ -26,14 +28,18 @@ from heat.common import exception
 from heat.common import template_format
 import heat.db.api as db_api
 from heat.engine.clients.os import keystone
+from heat.engine.clients.os import neutron
 from heat.engine.clients.os import nova
 from heat.engine import environment
 from heat.engine import resource
 from heat.engine import scheduler
 from heat.engine import stack
+from heat.engine import sync_point
 from heat.engine import template
+from heat.objects import resource as resource_objects
 from heat.objects import stack as stack_object
 from heat.objects import user_creds as ucreds_object
+from heat.rpc import worker_client
 from heat.tests import common
 from heat.tests import fakes
 from heat.tests import generic_resource as generic_rsrc
@@ -102,6 +108,15 @@ class StackTest(common.HeatTestCase):
                                  timeout_mins=10)
         self.assertEqual(600, self.stack.timeout_secs())
 
+    def test_time_remaining(self):
+        start = datetime.datetime.utcnow() - datetime.timedelta(seconds=100)
+        self.stack = stack.Stack(self.ctx, 'test_stack', self.tmpl,
+                                 timeout_mins=10, created_time=start)
+        self.assertAlmostEqual(500, self.stack.time_remaining(), delta=5)
+
+        self.stack.updated_time = datetime.datetime.utcnow()
+        self.assertAlmostEqual(600, self.stack.time_remaining(), delta=5)
+
     def test_no_auth_token(self):
         ctx = utils.dummy_context()
         ctx.auth_token = None
@@ -188,12 +203,45 @@ class StackTest(common.HeatTestCase):
         self.stack = stack.Stack(self.ctx, 'test_stack',
                                  template.Template(tpl),
                                  status_reason='blarg')
+        self.stack.store()
+
+        cfn_tpl = {'HeatTemplateFormatVersion': '2012-12-12',
+                   'Resources': {'B': {'Type': 'GenericResourceType'},
+                                 'C': {'Type': 'GenericResourceType'}}}
+        hot_tpl = {'heat_template_version': '2013-05-23',
+                   'resources': {'D': {'type': 'GenericResourceType'}}}
+        empty_tpl = {'heat_template_version': '2013-05-23'}
+        self.m.StubOutWithMock(stack_object.Stack, 'get_nested_templates')
+        stack_object.Stack.get_nested_templates(
+            self.ctx, self.stack.id).AndReturn([cfn_tpl, hot_tpl, empty_tpl])
+        self.m.ReplayAll()
+
+        self.assertEqual(4, self.stack.total_resources())
+        self.m.VerifyAll()
+
+    def test_total_resources_nested_in_progress(self):
+        tpl = {'HeatTemplateFormatVersion': '2012-12-12',
+               'Resources':
+               {'A': {'Type': 'GenericResourceType'}}}
+        self.stack = stack.Stack(self.ctx, 'test_stack',
+                                 template.Template(tpl))
+        self.stack.store()
+
+        # A nested stack that is stored but none of whose resources have
+        # been created yet
+        nested_tpl = {'HeatTemplateFormatVersion': '2012-12-12',
+                      'Resources': {'B': {'Type': 'GenericResourceType'},
+                                    'C': {'Type': 'GenericResourceType'},
+                                    'D': {'Type': 'GenericResourceType'}}}
+        nested = stack.Stack(self.ctx, 'test_nested',
+                             template.Template(nested_tpl),
+                             owner_id=self.stack.id)
+        nested.store()
+        nested.state_set(nested.CREATE, nested.IN_PROGRESS, 'started')
 
-        self.stack['A'].nested = mock.Mock()
-        self.stack['A'].nested.return_value.total_resources.return_value = 3
         self.assertEqual(4, self.stack.total_resources())
 
-    def test_total_resources_nested_not_found(self):
+    def test_total_resources_not_stored(self):
         tpl = {'HeatTemplateFormatVersion': '2012-12-12',
                'Resources':
                {'A': {'Type': 'GenericResourceType'}}}
@@ -201,9 +249,11 @@ class StackTest(common.HeatTestCase):
                                  template.Template(tpl),
                                  status_reason='blarg')
 
-        self.stack['A'].nested = mock.Mock(
-            side_effect=exception.NotFound('gone'))
+        self.m.StubOutWithMock(stack_object.Stack, 'get_nested_templates')
+        self.m.ReplayAll()
+
         self.assertEqual(1, self.stack.total_resources())
+        self.m.VerifyAll()
 
     def test_iter_resources(self):
         tpl = {'HeatTemplateFormatVersion': '2012-12-12',
@@ -231,6 +281,26 @@ class StackTest(common.HeatTestCase):
         all_resources = list(self.stack.iter_resources(1))
         self.assertEqual(5, len(all_resources))
 
+    def test_parent_resource_from_cache(self):
+        tpl = {'HeatTemplateFormatVersion': '2012-12-12',
+               'Resources':
+               {'A': {'Type': 'GenericResourceType'}}}
+        self.stack = stack.Stack(self.ctx, 'test_stack',
+                                 template.Template(tpl))
+        self.stack.store()
+        child = stack.Stack(self.ctx, 'child_stack',
+                            template.Template(tpl),
+                            owner_id=self.stack.id, parent_resource='A',
+                            cache=self.stack.stack_cache)
+        child.store()
+        self.assertIs(child, self.stack.stack_cache.get(child.id))
+
+        self.m.StubOutWithMock(stack.Stack, 'load')
+        self.m.ReplayAll()
+        self.assertIs(self.stack['A'], child.parent_resource)
+        self.assertIs(self.stack, child.root_stack)
+        self.m.VerifyAll()
+
     def test_root_stack_no_parent(self):
         tpl = {'HeatTemplateFormatVersion': '2012-12-12',
                'Resources':
@@ -290,7 +360,10 @@ class StackTest(common.HeatTestCase):
                              use_stored_context=False,
                              username=mox.IgnoreArg(),
                              convergence=False,
-                             current_traversal=None)
+                             current_traversal=None,
+                             current_deps=None,
+                             cache=None,
+                             use_slave=False)
 
         self.m.ReplayAll()
         stack.Stack.load(self.ctx, stack_id=self.stack.id,
@@ -298,6 +371,18 @@ class StackTest(common.HeatTestCase):
 
         self.m.VerifyAll()
 
+    def test_load_use_slave(self):
+        self.stack = stack.Stack(self.ctx, 'load_use_slave', self.tmpl)
+        self.stack.store()
+        get_all = self.patchobject(resource_objects.Resource,
+                                   'get_all_by_stack', return_value={})
+
+        stk = stack.Stack.load(self.ctx, stack_id=self.stack.id,
+                               use_slave=True)
+        self.assertIsNone(stk.db_resource_get('foo'))
+        get_all.assert_called_once_with(self.ctx, self.stack.id,
+                                        use_slave=True)
+
     def test_identifier(self):
         self.stack = stack.Stack(self.ctx, 'identifier_test', self.tmpl)
         self.stack.store()
@@ -1502,6 +1587,64 @@ class StackTest(common.HeatTestCase):
         self.stack.delete_snapshot(fake_snapshot)
         self.assertEqual([data['resources']['AResource']], snapshots)
 
+    def test_validate_resources_error_order(self):
+        tmpl = {'HeatTemplateFormatVersion': '2012-12-12',
+                'Resources': {
+                    'AResource': {'Type': 'GenericResourceType'},
+                    'BResource': {'Type': 'GenericResourceType',
+                                  'DependsOn': 'AResource'},
+                    'CResource': {'Type': 'GenericResourceType',
+                                  'DependsOn': 'BResource'}}}
+        self.stack = stack.Stack(self.ctx, 'stack_validate_order',
+                                 template.Template(tmpl))
+
+        def validate(res):
+            if res.name == 'BResource':
+                # let CResource finish validating first
+                eventlet.sleep(0)
+            if res.name != 'AResource':
+                return '%s is invalid' % res.name
+
+        self.patchobject(generic_rsrc.GenericResource, 'validate',
+                         autospec=True, side_effect=validate)
+
+        ex = self.assertRaises(exception.StackValidationFailed,
+                               self.stack.validate)
+        self.assertEqual('BResource is invalid', six.text_type(ex))
+        self.assertEqual(3, generic_rsrc.GenericResource.validate.call_count)
+
+    def test_validate_resources_sequential(self):
+        cfg.CONF.set_override('max_concurrent_validations', 1)
+        tmpl = {'HeatTemplateFormatVersion': '2012-12-12',
+                'Resources': {
+                    'AResource': {'Type': 'GenericResourceType'},
+                    'BResource': {'Type': 'GenericResourceType',
+                                  'DependsOn': 'AResource'}}}
+        self.stack = stack.Stack(self.ctx, 'stack_validate_sequential',
+                                 template.Template(tmpl))
+        self.m.StubOutWithMock(stack.greenpool, 'GreenPool')
+        self.m.ReplayAll()
+
+        self.assertIsNone(self.stack.validate())
+        self.m.VerifyAll()
+
+    def test_validate_custom_constraints_shared(self):
+        resource._register_class('ResourceWithCustomConstraint',
+                                 generic_rsrc.ResourceWithCustomConstraint)
+        tmpl = {'HeatTemplateFormatVersion': '2012-12-12',
+                'Resources': {
+                    'AResource': {'Type': 'ResourceWithCustomConstraint',
+                                  'Properties': {'Foo': 'net'}},
+                    'BResource': {'Type': 'ResourceWithCustomConstraint',
+                                  'Properties': {'Foo': 'net'}}}}
+        self.stack = stack.Stack(self.ctx, 'stack_validate_constraints',
+                                 template.Template(tmpl))
+        validate = self.patchobject(neutron.NetworkConstraint,
+                                    'validate_with_client')
+
+        self.assertIsNone(self.stack.validate())
+        validate.assert_called_once_with(self.ctx.clients, 'net')
+
     def test_incorrect_outputs_cfn_get_attr(self):
         tmpl = {'HeatTemplateFormatVersion': '2012-12-12',
                 'Resources': {
@@ -1743,3 +1886,55 @@ class StackTest(common.HeatTestCase):
 
         self.assertEqual(
             'foo', self.stack.resources['A'].properties['a_string'])
+
+    @mock.patch.object(worker_client.WorkerClient, 'check_resource')
+    def test_converge_stack(self, mock_check):
+        tpl = {'HeatTemplateFormatVersion': '2012-12-12',
+               'Resources': {
+                   'A': {'Type': 'GenericResourceType'},
+                   'B': {'Type': 'GenericResourceType',
+                         'DependsOn': 'A'}}}
+        self.stack = stack.Stack(self.ctx, 'converge_test',
+                                 template.Template(tpl),
+                                 stack_user_project_id='aproject',
+                                 convergence=True)
+        self.stack.store()
+        self.stack.converge_stack()
+
+        rsrc_a = self.stack['A']
+        rsrc_b = self.stack['B']
+        self.assertIsNotNone(rsrc_a.id)
+        self.assertIsNotNone(rsrc_b.id)
+        self.assertEqual((stack.Stack.CREATE, stack.Stack.IN_PROGRESS),
+                         self.stack.state)
+        traversal = self.stack.current_traversal
+        self.assertIsNotNone(traversal)
+
+        deps = self.stack.convergence_dependencies()
+        self.assertEqual([rsrc_b.id], list(deps.required_by(rsrc_a.id)))
+
+        for entity_id in (rsrc_a.id, rsrc_b.id, self.stack.id):
+            self.assertIsNotNone(sync_point.get(self.ctx, entity_id,
+                                                traversal, False))
+
+        # Only the resource without dependencies is started
+        mock_check.assert_called_once_with(self.ctx, rsrc_a.id, traversal,
+                                           {}, False)
+
+        db_stack = stack_object.Stack.get_by_id(self.ctx, self.stack.id)
+        self.assertEqual(traversal, db_stack.current_traversal)
+        self.assertEqual(self.stack.current_deps, db_stack.current_deps)
+
+    @mock.patch.object(worker_client.WorkerClient, 'check_resource')
+    def test_converge_stack_empty(self, mock_check):
+        self.stack = stack.Stack(self.ctx, 'converge_empty_test', self.tmpl,
+                                 stack_user_project_id='aproject',
+                                 convergence=True)
+        self.stack.store()
+        self.stack.converge_stack()
+
+        self.assertEqual((stack.Stack.CREATE, stack.Stack.COMPLETE),
+                         self.stack.state)
+        self.assertFalse(mock_check.called)
+        self.assertRaises(exception.NotFound, sync_point.get, self.ctx,
+                          self.stack.id, self.stack.current_traversal, False)
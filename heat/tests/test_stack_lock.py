@@ -12,6 +12,7 @@
 #    under the License.
 
 import mock
+from oslo_config import cfg
 import oslo_messaging as messaging
 
 from heat.common import exception
@@ -52,73 +53,120 @@ class StackLockTest(common.HeatTestCase):
         self.assertRaises(exception.ActionInProgress, slock.acquire)
         mock_create.assert_called_once_with(self.stack.id, self.engine_id)
 
-    def test_successful_acquire_existing_lock_engine_dead(self):
+    def test_successful_acquire_existing_lock_expired(self):
         mock_create = self.patchobject(db_api, 'stack_lock_create',
                                        return_value='fake-engine-id')
-        mock_steal = self.patchobject(db_api, 'stack_lock_steal',
+        mock_steal = self.patchobject(db_api, 'stack_lock_steal_expired',
                                       return_value=None)
 
         slock = stack_lock.StackLock(self.context, self.stack, self.engine_id)
-        self.patchobject(slock, 'engine_alive', return_value=False)
+        mock_alive = self.patchobject(slock, 'engine_alive')
         slock.acquire()
 
         mock_create.assert_called_once_with(self.stack.id, self.engine_id)
-        mock_steal.assert_called_once_with(self.stack.id, 'fake-engine-id',
-                                           self.engine_id)
+        mock_steal.assert_called_once_with(self.stack.id, self.engine_id)
+        self.assertFalse(mock_alive.called)
 
-    def test_failed_acquire_existing_lock_engine_alive(self):
+    def test_failed_acquire_existing_lock_leased(self):
         mock_create = self.patchobject(db_api, 'stack_lock_create',
                                        return_value='fake-engine-id')
+        mock_steal = self.patchobject(db_api, 'stack_lock_steal_expired',
+                                      return_value='fake-engine-id')
+        self.patchobject(db_api, 'stack_lock_has_lease', return_value=True)
 
         slock = stack_lock.StackLock(self.context, self.stack, self.engine_id)
-        self.patchobject(slock, 'engine_alive', return_value=True)
+        mock_alive = self.patchobject(slock, 'engine_alive')
         self.assertRaises(exception.ActionInProgress, slock.acquire)
 
         mock_create.assert_called_once_with(self.stack.id, self.engine_id)
+        mock_steal.assert_called_once_with(self.stack.id, self.engine_id)
+        self.assertFalse(mock_alive.called)
 
-    def test_failed_acquire_existing_lock_engine_dead(self):
-        mock_create = self.patchobject(db_api, 'stack_lock_create',
-                                       return_value='fake-engine-id')
+    def test_failed_acquire_existing_lock_no_lease_engine_alive(self):
+        self.patchobject(db_api, 'stack_lock_create',
+                         return_value='fake-engine-id')
+        self.patchobject(db_api, 'stack_lock_steal_expired',
+                         return_value='fake-engine-id')
+        self.patchobject(db_api, 'stack_lock_has_lease', return_value=False)
+        mock_steal = self.patchobject(db_api, 'stack_lock_steal')
+
+        slock = stack_lock.StackLock(self.context, self.stack, self.engine_id)
+        mock_alive = self.patchobject(slock, 'engine_alive',
+                                      return_value=True)
+        self.assertRaises(exception.ActionInProgress, slock.acquire)
+
+        mock_alive.assert_called_once_with(self.context, 'fake-engine-id')
+        self.assertFalse(mock_steal.called)
+
+    def test_successful_acquire_existing_lock_no_lease_engine_dead(self):
+        self.patchobject(db_api, 'stack_lock_create',
+                         return_value='fake-engine-id')
+        self.patchobject(db_api, 'stack_lock_steal_expired',
+                         return_value='fake-engine-id')
+        self.patchobject(db_api, 'stack_lock_has_lease', return_value=False)
         mock_steal = self.patchobject(db_api, 'stack_lock_steal',
-                                      return_value='fake-engine-id2')
+                                      return_value=None)
 
         slock = stack_lock.StackLock(self.context, self.stack, self.engine_id)
         self.patchobject(slock, 'engine_alive', return_value=False)
-        self.assertRaises(exception.ActionInProgress, slock.acquire)
+        slock.acquire()
 
-        mock_create.assert_called_once_with(self.stack.id, self.engine_id)
         mock_steal.assert_called_once_with(self.stack.id, 'fake-engine-id',
                                            self.engine_id)
 
+    def test_failed_acquire_existing_lock_current_engine_no_steal(self):
+        self.patchobject(db_api, 'stack_lock_create',
+                         return_value=self.engine_id)
+        mock_steal = self.patchobject(db_api, 'stack_lock_steal_expired')
+
+        slock = stack_lock.StackLock(self.context, self.stack, self.engine_id)
+        self.assertRaises(exception.ActionInProgress, slock.acquire)
+        self.assertFalse(mock_steal.called)
+
     def test_successful_acquire_with_retry(self):
         mock_create = self.patchobject(db_api, 'stack_lock_create',
                                        return_value='fake-engine-id')
-        mock_steal = self.patchobject(db_api, 'stack_lock_steal',
+        mock_steal = self.patchobject(db_api, 'stack_lock_steal_expired',
                                       side_effect=[True, None])
 
         slock = stack_lock.StackLock(self.context, self.stack, self.engine_id)
-        self.patchobject(slock, 'engine_alive', return_value=False)
         slock.acquire()
 
         mock_create.assert_has_calls(
             [mock.call(self.stack.id, self.engine_id)] * 2)
         mock_steal.assert_has_calls(
-            [mock.call(self.stack.id, 'fake-engine-id', self.engine_id)] * 2)
+            [mock.call(self.stack.id, self.engine_id)] * 2)
 
     def test_failed_acquire_one_retry_only(self):
         mock_create = self.patchobject(db_api, 'stack_lock_create',
                                        return_value='fake-engine-id')
-        mock_steal = self.patchobject(db_api, 'stack_lock_steal',
+        mock_steal = self.patchobject(db_api, 'stack_lock_steal_expired',
                                       return_value=True)
 
         slock = stack_lock.StackLock(self.context, self.stack, self.engine_id)
-        self.patchobject(slock, 'engine_alive', return_value=False)
         self.assertRaises(exception.ActionInProgress, slock.acquire)
 
         mock_create.assert_has_calls(
             [mock.call(self.stack.id, self.engine_id)] * 2)
         mock_steal.assert_has_calls(
-            [mock.call(self.stack.id, 'fake-engine-id', self.engine_id)] * 2)
+            [mock.call(self.stack.id, self.engine_id)] * 2)
+
+    def test_renew_all(self):
+        mock_renew = self.patchobject(db_api, 'stack_lock_renew',
+                                      return_value=3)
+        stack_lock.StackLock.renew_all(self.engine_id)
+        mock_renew.assert_called_once_with(self.engine_id)
+
+    def test_renew_all_db_error(self):
+        self.patchobject(db_api, 'stack_lock_renew',
+                         side_effect=Exception('db error'))
+        # A failed renewal is retried on the next interval
+        stack_lock.StackLock.renew_all(self.engine_id)
+
+    def test_renew_interval(self):
+        self.assertEqual(20, stack_lock.StackLock.renew_interval())
+        cfg.CONF.set_override('stack_lock_lease', 2)
+        self.assertEqual(1, stack_lock.StackLock.renew_interval())
 
     def test_thread_lock_context_mgr_exception_acquire_success(self):
         db_api.stack_lock_create = mock.Mock(return_value=None)
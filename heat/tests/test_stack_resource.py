@@ -23,7 +23,9 @@ from heat.engine import resource
 from heat.engine.resources import stack_resource
 from heat.engine import scheduler
 from heat.engine import stack as parser
+from heat.engine import stack_lock
 from heat.engine import template as templatem
+from heat.objects import stack as stack_object
 from heat.tests import common
 from heat.tests import generic_resource as generic_rsrc
 from heat.tests import utils
@@ -252,7 +254,8 @@ class StackResourceTest(common.HeatTestCase):
             user_creds_id=self.parent_stack.user_creds_id,
             stack_user_project_id=self.parent_stack.stack_user_project_id,
             adopt_stack_data=None,
-            nested_depth=1
+            nested_depth=1,
+            cache=self.parent_stack.stack_cache
         )
 
     @mock.patch('heat.engine.environment.get_child_environment')
@@ -291,7 +294,8 @@ class StackResourceTest(common.HeatTestCase):
             user_creds_id=self.parent_stack.user_creds_id,
             stack_user_project_id=self.parent_stack.stack_user_project_id,
             adopt_stack_data=None,
-            nested_depth=1
+            nested_depth=1,
+            cache=self.parent_stack.stack_cache
         )
 
     def test_preview_propagates_files(self):
@@ -444,6 +448,158 @@ class StackResourceTest(common.HeatTestCase):
             self.parent_resource.update_with_template,
             template, {'WebServer': 'foo'})
 
+    def test_create_with_template_distributed(self):
+        cfg.CONF.set_override('distribute_nested_stacks', True)
+        self.parent_resource.rpc_client = mock.Mock()
+
+        task = self.parent_resource.create_with_template(self.templ,
+                                                         {"KeyName": "key"})
+        self.assertIsInstance(task, stack_resource.RemoteStackAction)
+        self.assertEqual('CREATE', task.action)
+
+        nested = self.parent_resource.nested()
+        self.assertEqual(nested.id, self.parent_resource.resource_id)
+        rpc = self.parent_resource.rpc_client.return_value
+        rpc.nested_stack_action.assert_called_once_with(
+            self.parent_resource.context, dict(nested.identifier()),
+            'CREATE', 'test', template_id=None, timeout_mins=None)
+
+    def test_update_with_template_distributed(self):
+        self.parent_resource.create_with_template(self.templ,
+                                                  {"KeyName": "key"})
+        nested = self.parent_resource.nested()
+        cfg.CONF.set_override('distribute_nested_stacks', True)
+        self.parent_resource.rpc_client = mock.Mock()
+
+        task = self.parent_resource.update_with_template(self.templ,
+                                                         {"KeyName": "key2"},
+                                                         timeout_mins=42)
+        self.assertIsInstance(task, stack_resource.RemoteStackAction)
+        self.assertEqual('UPDATE', task.action)
+
+        rpc = self.parent_resource.rpc_client.return_value
+        rpc.nested_stack_action.assert_called_once_with(
+            self.parent_resource.context, dict(nested.identifier()),
+            'UPDATE', 'test', template_id=mock.ANY, timeout_mins=42)
+        template_id = rpc.nested_stack_action.call_args[1]['template_id']
+        tmpl = templatem.Template.load(self.parent_resource.context,
+                                       template_id)
+        self.assertEqual(self.templ, tmpl.t)
+        self.assertEqual('key2', tmpl.env.params['KeyName'])
+
+    def test_update_with_template_distributed_failure(self):
+        self.parent_resource.create_with_template(self.templ,
+                                                  {"KeyName": "key"})
+        cfg.CONF.set_override('distribute_nested_stacks', True)
+        self.parent_resource.rpc_client = mock.Mock()
+        rpc = self.parent_resource.rpc_client.return_value
+        rpc.nested_stack_action.side_effect = exception.ActionInProgress(
+            stack_name='test', action='CREATE')
+
+        self.assertRaises(exception.ActionInProgress,
+                          self.parent_resource.update_with_template,
+                          self.templ, {"KeyName": "key2"})
+        template_id = rpc.nested_stack_action.call_args[1]['template_id']
+        self.assertRaises(exception.NotFound, templatem.Template.load,
+                          self.parent_resource.context, template_id)
+
+    @mock.patch.object(stack_lock.StackLock, 'is_held', return_value=True)
+    @mock.patch.object(stack_object.Stack, 'get_by_id')
+    def test_remote_stack_action_step(self, mock_get, mock_held):
+        self.parent_resource.resource_id = 'nested-id'
+        self.parent_resource.nested = mock.Mock()
+        task = stack_resource.RemoteStackAction(self.parent_resource,
+                                                'UPDATE')
+
+        mock_get.return_value = mock.Mock(action='UPDATE',
+                                          status='IN_PROGRESS')
+        self.assertFalse(task.step())
+        self.assertFalse(self.parent_resource.nested.called)
+
+        mock_get.return_value = mock.Mock(action='UPDATE', status='FAILED')
+        self.assertTrue(task.step())
+        self.parent_resource.nested.assert_called_once_with(
+            force_reload=True)
+        mock_get.assert_called_with(self.parent_resource.context,
+                                    'nested-id')
+
+        mock_get.return_value = None
+        self.assertRaises(exception.NotFound, task.step)
+
+    @mock.patch.object(stack_lock.StackLock, 'is_held', return_value=False)
+    @mock.patch.object(stack_object.Stack, 'get_by_id')
+    def test_remote_stack_action_step_engine_stopped(self, mock_get,
+                                                     mock_held):
+        self.parent_resource.resource_id = 'nested-id'
+        self.parent_resource.nested = mock.Mock()
+        task = stack_resource.RemoteStackAction(self.parent_resource,
+                                                'UPDATE')
+
+        mock_get.return_value = mock.Mock(id='nested-id', action='UPDATE',
+                                          status='IN_PROGRESS')
+        self.assertRaises(exception.Error, task.step)
+        mock_held.assert_called_once_with('nested-id')
+        self.assertFalse(self.parent_resource.nested.called)
+
+    @mock.patch.object(stack_lock.StackLock, 'is_held', return_value=False)
+    @mock.patch.object(stack_object.Stack, 'get_by_id')
+    def test_remote_stack_action_step_finished_unlocked(self, mock_get,
+                                                        mock_held):
+        self.parent_resource.resource_id = 'nested-id'
+        self.parent_resource.nested = mock.Mock()
+        task = stack_resource.RemoteStackAction(self.parent_resource,
+                                                'UPDATE')
+
+        mock_get.side_effect = [
+            mock.Mock(id='nested-id', action='UPDATE', status='IN_PROGRESS'),
+            mock.Mock(id='nested-id', action='UPDATE', status='COMPLETE')]
+        self.assertTrue(task.step())
+        self.parent_resource.nested.assert_called_once_with(
+            force_reload=True)
+
+    def test_remote_stack_action_cancel(self):
+        self.parent_resource.rpc_client = mock.Mock()
+        nested = mock.Mock()
+        nested.identifier.return_value = {'stack_id': 'nested-id'}
+        self.parent_resource.nested = mock.Mock(return_value=nested)
+        task = stack_resource.RemoteStackAction(self.parent_resource,
+                                                'CREATE')
+
+        task.cancel()
+        rpc = self.parent_resource.rpc_client.return_value
+        rpc.stop_nested_stack_action.assert_called_once_with(
+            self.parent_resource.context, {'stack_id': 'nested-id'})
+
+    def test_remote_stack_action_cancel_timeout(self):
+        task = stack_resource.RemoteStackAction(self.parent_resource,
+                                                'CREATE')
+        self.patchobject(task, 'cancel')
+        self.patchobject(self.parent_resource, 'handle_create',
+                         return_value=task)
+        self.patchobject(self.parent_resource, 'check_create_complete',
+                         return_value=False)
+
+        runner = scheduler.TaskRunner(
+            self.parent_resource.action_handler_task, 'CREATE')
+        runner.start(timeout=60)
+        self.patchobject(scheduler.Timeout, 'expired', return_value=True)
+        self.assertRaises(scheduler.Timeout, runner.step)
+        task.cancel.assert_called_once_with()
+
+    def test_local_stack_action_cancel(self):
+        creator = mock.Mock()
+        self.patchobject(self.parent_resource, 'handle_create',
+                         return_value=creator)
+        self.patchobject(self.parent_resource, 'check_create_complete',
+                         return_value=False)
+
+        runner = scheduler.TaskRunner(
+            self.parent_resource.action_handler_task, 'CREATE')
+        runner.start()
+        runner.step()
+        runner.cancel()
+        self.assertFalse(creator.cancel.called)
+
     def test_load_nested_ok(self):
         self.parent_resource.create_with_template(self.templ,
                                                   {"KeyName": "key"})
@@ -456,12 +612,45 @@ class StackResourceTest(common.HeatTestCase):
                           self.parent_resource.resource_id,
                           parent_resource=self.parent_resource.name,
                           show_deleted=False,
-                          force_reload=False).AndReturn('s')
+                          force_reload=False,
+                          cache=self.parent_resource.stack.stack_cache
+                          ).AndReturn('s')
         self.m.ReplayAll()
 
         self.parent_resource.nested()
         self.m.VerifyAll()
 
+    def test_load_nested_from_cache(self):
+        create_creator = self.parent_resource.create_with_template(
+            self.templ, {"KeyName": "key"})
+        create_creator.run_to_completion()
+        nested = self.parent_resource.nested()
+
+        self.parent_resource._nested = None
+        self.m.StubOutWithMock(parser.Stack, 'load')
+        self.m.ReplayAll()
+
+        self.assertIs(nested, self.parent_resource.nested())
+        self.assertIs(self.parent_resource.stack.stack_cache,
+                      nested.stack_cache)
+        self.m.VerifyAll()
+
+    def test_load_nested_prefetches_siblings(self):
+        create_creator = self.parent_resource.create_with_template(
+            self.templ, {"KeyName": "key"})
+        create_creator.run_to_completion()
+
+        self.parent_resource._nested = None
+        self.parent_resource.stack.stack_cache = parser.StackCache()
+        self.m.StubOutWithMock(stack_object.Stack, 'get_by_id')
+        self.m.ReplayAll()
+
+        nested = self.parent_resource.nested()
+        self.assertEqual(self.parent_resource.resource_id, nested.id)
+        self.assertIs(nested, self.parent_resource.stack.stack_cache.get(
+            self.parent_resource.resource_id))
+        self.m.VerifyAll()
+
     def test_load_nested_force_reload(self):
         create_creator = self.parent_resource.create_with_template(
             self.templ, {"KeyName": "key"})
@@ -500,12 +689,14 @@ class StackResourceTest(common.HeatTestCase):
         self.stack = self.parent_resource.nested()
 
         self.parent_resource._nested = None
+        self.parent_resource.stack.stack_cache = parser.StackCache()
         self.m.StubOutWithMock(parser.Stack, 'load')
         parser.Stack.load(self.parent_resource.context,
                           self.parent_resource.resource_id,
                           parent_resource=self.parent_resource.name,
                           show_deleted=False,
-                          force_reload=False)
+                          force_reload=False,
+                          cache=self.parent_resource.stack.stack_cache)
         self.m.ReplayAll()
 
         self.assertRaises(exception.NotFound, self.parent_resource.nested)
@@ -519,7 +710,9 @@ class StackResourceTest(common.HeatTestCase):
                           self.parent_resource.resource_id,
                           parent_resource=self.parent_resource.name,
                           show_deleted=False,
-                          force_reload=True).AndReturn(None)
+                          force_reload=True,
+                          cache=self.parent_resource.stack.stack_cache
+                          ).AndReturn(None)
         self.m.ReplayAll()
         self.assertRaises(exception.NotFound, self.parent_resource.nested,
                           force_reload=True)
@@ -531,12 +724,14 @@ class StackResourceTest(common.HeatTestCase):
         self.stack = self.parent_resource.nested()
 
         self.parent_resource._nested = None
+        self.parent_resource.stack.stack_cache = parser.StackCache()
         self.m.StubOutWithMock(parser.Stack, 'load')
         parser.Stack.load(
             self.parent_resource.context,
             self.parent_resource.resource_id,
             parent_resource=self.parent_resource.name,
-            show_deleted=False, force_reload=False
+            show_deleted=False, force_reload=False,
+            cache=self.parent_resource.stack.stack_cache
         ).AndRaise(exception.NotFound(''))
         self.m.ReplayAll()
 
@@ -0,0 +1,68 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from heat.engine import stack
+from heat.engine import sync_point
+from heat.engine import template
+from heat.objects import sync_point as sync_point_object
+from heat.tests import common
+from heat.tests import utils
+
+
+class SyncPointTest(common.HeatTestCase):
+    def setUp(self):
+        super(SyncPointTest, self).setUp()
+        self.ctx = utils.dummy_context()
+        tpl = template.Template({'HeatTemplateFormatVersion': '2012-12-12'})
+        self.stack = stack.Stack(self.ctx, 'sync_point_test', tpl)
+        self.stack.store()
+        sync_point.create(self.ctx, 1, 'traversal', True, self.stack.id)
+
+    def test_sync_waiting(self):
+        propagate = mock.Mock()
+        sync_point.sync(self.ctx, 1, 'traversal', True, propagate,
+                        [2, 3], {'2': 'two'})
+
+        self.assertFalse(propagate.called)
+        sp = sync_point.get(self.ctx, 1, 'traversal', True)
+        self.assertEqual({'2': 'two'}, sp.input_data)
+        self.assertEqual(1, sp.atomic_key)
+
+    def test_sync_propagates(self):
+        propagate = mock.Mock()
+        sync_point.sync(self.ctx, 1, 'traversal', True, propagate,
+                        [2, 3], {'2': 'two'})
+        sync_point.sync(self.ctx, 1, 'traversal', True, propagate,
+                        [2, 3], {'3': 'three'})
+
+        propagate.assert_called_once_with(1, {'2': 'two', '3': 'three'})
+
+    def test_sync_retries_concurrent_update(self):
+        propagate = mock.Mock()
+        real_update = sync_point_object.SyncPoint.update_input_data
+
+        def concurrent_update(*args):
+            # Another engine records its input first
+            real_update(self.ctx, '1', 'traversal', True, 0, {'3': 'three'})
+            return real_update(*args)
+
+        with mock.patch.object(sync_point_object.SyncPoint,
+                               'update_input_data',
+                               side_effect=concurrent_update) as mock_update:
+            sync_point.sync(self.ctx, 1, 'traversal', True, propagate,
+                            [2, 3], {'2': 'two'})
+
+        self.assertEqual(2, mock_update.call_count)
+        propagate.assert_called_once_with(1, {'2': 'two', '3': 'three'})
@@ -875,6 +875,32 @@ Mappings:
 
         self.assertEqual(cfn_tpl['Resources'], empty.t['Resources'])
 
+    def test_copy(self):
+        cfn_tpl = template_format.parse('''
+        AWSTemplateFormatVersion: 2010-09-09
+        Resources:
+          resource1:
+            Type: AWS::EC2::Instance
+            Properties:
+              property1: value1
+        ''')
+        source = template.Template(cfn_tpl, template_id=42,
+                                   files={'foo': 'bar'})
+        stk = stack.Stack(self.ctx, 'test_stack', source)
+        defn = source.resource_definitions(stk)['resource1']
+
+        tmpl = copy.copy(source)
+        self.assertIsNone(tmpl.id)
+        self.assertIs(source.files, tmpl.files)
+        self.assertIs(source.env, tmpl.env)
+        self.assertIs(cfn_tpl['Resources']['resource1'],
+                      tmpl.t['Resources']['resource1'])
+
+        tmpl.add_resource(defn, 'resource2')
+        tmpl.remove_resource('resource1')
+        self.assertEqual(['resource1'], list(source.t['Resources']))
+        self.assertEqual(['resource2'], list(tmpl.t['Resources']))
+
 
 class TemplateFnErrorTest(common.HeatTestCase):
     scenarios = [
@@ -11,6 +11,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import os
 
 import mock
@@ -133,6 +134,42 @@ Outputs: {}
         self.assertEqual(expected, template_format.parse(tmpl_str))
 
 
+class ParseCacheTest(common.HeatTestCase):
+
+    def setUp(self):
+        super(ParseCacheTest, self).setUp()
+        self.patchobject(template_format, '_yaml_cache',
+                         new=collections.OrderedDict())
+
+    def test_yaml_cached(self):
+        tmpl_str = 'heat_template_version: 2013-05-23\nresources: {}\n'
+        with mock.patch.object(yaml, 'load', wraps=yaml.load) as yaml_load:
+            first = template_format.parse(tmpl_str)
+            second = template_format.parse(tmpl_str)
+
+        self.assertEqual(1, yaml_load.call_count)
+        self.assertEqual(first, second)
+        self.assertIsNot(first, second)
+        first['resources']['foo'] = {'type': 'Foo'}
+        self.assertEqual({}, template_format.parse(tmpl_str)['resources'])
+
+    def test_yaml_not_parsed_as_json(self):
+        loads = self.patchobject(template_format.jsonutils, 'loads')
+        template_format.parse('heat_template_version: 2013-05-23')
+        self.assertFalse(loads.called)
+
+    def test_json_not_cached(self):
+        template_format.parse('{"heat_template_version": "2013-05-23"}')
+        self.assertEqual(0, len(template_format._yaml_cache))
+
+    def test_cache_size(self):
+        self.patchobject(template_format, 'YAML_CACHE_SIZE', new=2)
+        for version in ('2013-05-23', '2014-10-16', '2015-04-30'):
+            template_format.parse('heat_template_version: %s' % version)
+
+        self.assertEqual(2, len(template_format._yaml_cache))
+
+
 class YamlParseExceptions(common.HeatTestCase):
 
     scenarios = [
@@ -11,6 +11,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+
 from oslo_config import cfg
 import requests
 from requests import exceptions
@@ -21,8 +23,11 @@ from heat.tests import common
 
 
 class Response(object):
-    def __init__(self, buf=''):
+    def __init__(self, buf='', status_code=200, headers=None):
         self.buf = buf
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.closed = False
 
     def iter_content(self, chunk_size=1):
         while self.buf:
@@ -32,11 +37,15 @@ class Response(object):
     def raise_for_status(self):
         pass
 
+    def close(self):
+        self.closed = True
+
 
 class UrlFetchTest(common.HeatTestCase):
     def setUp(self):
         super(UrlFetchTest, self).setUp()
-        self.m.StubOutWithMock(requests, 'get')
+        self.m.StubOutWithMock(requests.Session, 'get')
+        self.patchobject(urlfetch, '_cache', new=collections.OrderedDict())
 
     def test_file_scheme_default_behaviour(self):
         self.m.ReplayAll()
@@ -72,16 +81,17 @@ class UrlFetchTest(common.HeatTestCase):
         url = 'http://example.com/template'
         data = '{ "foo": "bar" }'
         response = Response(data)
-        requests.get(url, stream=True).AndReturn(response)
+        requests.Session.get(url, stream=True, headers={}).AndReturn(response)
         self.m.ReplayAll()
         self.assertEqual(data, urlfetch.get(url))
+        self.assertTrue(response.closed)
         self.m.VerifyAll()
 
     def test_https_scheme(self):
         url = 'https://example.com/template'
         data = '{ "foo": "bar" }'
         response = Response(data)
-        requests.get(url, stream=True).AndReturn(response)
+        requests.Session.get(url, stream=True, headers={}).AndReturn(response)
         self.m.ReplayAll()
         self.assertEqual(data, urlfetch.get(url))
         self.m.VerifyAll()
@@ -89,7 +99,8 @@ class UrlFetchTest(common.HeatTestCase):
     def test_http_error(self):
         url = 'http://example.com/template'
 
-        requests.get(url, stream=True).AndRaise(exceptions.HTTPError())
+        requests.Session.get(url, stream=True, headers={}).AndRaise(
+            exceptions.HTTPError())
         self.m.ReplayAll()
 
         self.assertRaises(urlfetch.URLFetchError, urlfetch.get, url)
@@ -98,7 +109,8 @@ class UrlFetchTest(common.HeatTestCase):
     def test_non_exist_url(self):
         url = 'http://non-exist.com/template'
 
-        requests.get(url, stream=True).AndRaise(exceptions.Timeout())
+        requests.Session.get(url, stream=True, headers={}).AndRaise(
+            exceptions.Timeout())
         self.m.ReplayAll()
 
         self.assertRaises(urlfetch.URLFetchError, urlfetch.get, url)
@@ -114,7 +126,7 @@ class UrlFetchTest(common.HeatTestCase):
         data = '{ "foo": "bar" }'
         response = Response(data)
         cfg.CONF.set_override('max_template_size', 500)
-        requests.get(url, stream=True).AndReturn(response)
+        requests.Session.get(url, stream=True, headers={}).AndReturn(response)
         self.m.ReplayAll()
         urlfetch.get(url)
         self.m.VerifyAll()
@@ -124,9 +136,69 @@ class UrlFetchTest(common.HeatTestCase):
         data = '{ "foo": "bar" }'
         response = Response(data)
         cfg.CONF.set_override('max_template_size', 5)
-        requests.get(url, stream=True).AndReturn(response)
+        requests.Session.get(url, stream=True, headers={}).AndReturn(response)
         self.m.ReplayAll()
         exception = self.assertRaises(urlfetch.URLFetchError,
                                       urlfetch.get, url)
         self.assertIn("Template exceeds", six.text_type(exception))
+        self.assertTrue(response.closed)
+        self.m.VerifyAll()
+
+    def test_not_modified(self):
+        url = 'http://example.com/template'
+        data = '{ "foo": "bar" }'
+        etag = '"abc"'
+        response = Response(data, headers={'ETag': etag})
+        requests.Session.get(url, stream=True, headers={}).AndReturn(response)
+        not_modified = Response(status_code=304)
+        requests.Session.get(url, stream=True,
+                             headers={'If-None-Match': etag}
+                             ).AndReturn(not_modified)
+        self.m.ReplayAll()
+        self.assertEqual(data, urlfetch.get(url))
+        self.assertEqual(data, urlfetch.get(url))
         self.m.VerifyAll()
+
+    def test_not_modified_without_cache(self):
+        url = 'http://example.com/template'
+        response = Response(status_code=304)
+        requests.Session.get(url, stream=True, headers={}).AndReturn(response)
+        self.m.ReplayAll()
+        self.assertRaises(urlfetch.URLFetchError, urlfetch.get, url)
+        self.assertTrue(response.closed)
+        self.m.VerifyAll()
+
+    def test_modified(self):
+        url = 'http://example.com/template'
+        last_modified = 'Wed, 21 Oct 2015 07:28:00 GMT'
+        response = Response('{ "foo": "bar" }',
+                            headers={'Last-Modified': last_modified})
+        requests.Session.get(url, stream=True, headers={}).AndReturn(response)
+        modified = Response('{ "foo": "baz" }')
+        requests.Session.get(url, stream=True,
+                             headers={'If-Modified-Since': last_modified}
+                             ).AndReturn(modified)
+        requests.Session.get(url, stream=True, headers={}).AndReturn(
+            Response('{ "foo": "qux" }'))
+        self.m.ReplayAll()
+        urlfetch.get(url)
+        self.assertEqual('{ "foo": "baz" }', urlfetch.get(url))
+        self.assertEqual('{ "foo": "qux" }', urlfetch.get(url))
+        self.m.VerifyAll()
+
+    def test_cache_size(self):
+        self.patchobject(urlfetch, 'CACHE_SIZE', new=1)
+        for url in ('http://example.com/a', 'http://example.com/b'):
+            requests.Session.get(url, stream=True, headers={}).AndReturn(
+                Response('{}', headers={'ETag': '"x"'}))
+        self.m.ReplayAll()
+        urlfetch.get('http://example.com/a')
+        urlfetch.get('http://example.com/b')
+        self.assertEqual(['http://example.com/b'], list(urlfetch._cache))
+        self.m.VerifyAll()
+
+    def test_session_shared_without_cookies(self):
+        self.patchobject(urlfetch, '_session', new=None)
+        session = urlfetch._get_session()
+        self.assertIs(session, urlfetch._get_session())
+        self.assertEqual((), session.cookies._policy.allowed_domains())